@@ -0,0 +1,73 @@
+"""Стоимость сериализации LinkUpdate и построения ответов из строк хранилища.
+
+Запуск: make bench (или PYTHONPATH=. python benchmarks/serialization.py).
+"""
+
+import json
+import timeit
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from src.models import LinkUpdate
+from src.scrapper.models import LinkRecord, LinkResponse, LinksPage, ListLinksResponse
+
+NUMBER = 2000
+
+update = LinkUpdate(
+    id=1,
+    url="https://github.com/owner/repo",
+    tgChatIds=list(range(100)),
+    description="🔔 Новый PR\nFix race in scheduler\nАвтор: someone\n" + "x" * 200,
+)
+payload = update.model_dump_json(by_alias=True).encode()
+links = ListLinksResponse(
+    links=[
+        LinkResponse(id=i, url=f"https://github.com/owner/repo{i}", tags=["a", "b"], filters=[])
+        for i in range(100)
+    ],
+    size=100,
+)
+links_payload = links.model_dump_json().encode()
+rows = [
+    {"id": i, "url": f"https://github.com/owner/repo{i}", "tags": ["a", "b"], "filters": []}
+    for i in range(100)
+]
+
+CASES = {
+    "sender: jsonable_encoder + json.dumps": lambda: json.dumps(jsonable_encoder(update)),
+    "sender: model_dump_json": lambda: update.model_dump_json(by_alias=True),
+    "bot: json.loads + model_validate": lambda: LinkUpdate.model_validate(json.loads(payload)),
+    "bot: orjson.loads + model_validate": lambda: LinkUpdate.model_validate(orjson.loads(payload)),
+    "bot: model_validate_json": lambda: LinkUpdate.model_validate_json(payload),
+    "client: json.loads + model_validate (100 links)": lambda: ListLinksResponse.model_validate(
+        json.loads(links_payload),
+    ),
+    "client: model_validate_json (100 links)": lambda: ListLinksResponse.model_validate_json(
+        links_payload,
+    ),
+    "listing: LinkResponse per row + model_dump_json (100 rows)": lambda: ListLinksResponse(
+        links=[LinkResponse(**row) for row in rows],
+        size=len(rows),
+    ).model_dump_json(),
+    "listing: model_construct per row + model_dump_json (100 rows)": lambda: (
+        ListLinksResponse.model_construct(
+            links=[LinkResponse.model_construct(**row) for row in rows],
+            size=len(rows),
+            next_cursor=None,
+        ).model_dump_json(warnings=False)
+    ),
+    "listing: LinkRecord per row + orjson.dumps (100 rows)": lambda: orjson.dumps(
+        LinksPage(links=[LinkRecord(**row) for row in rows], size=len(rows)),
+    ),
+}
+
+
+def main() -> None:
+    for name, case in CASES.items():
+        seconds = min(timeit.repeat(case, number=NUMBER, repeat=3))
+        print(f"{name:<62} {seconds / NUMBER * 1e6:8.2f} us/op")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+--liquibase formatted sql
+
+--changeset kakashi-hatake3:7
+DELETE FROM link_tags
+WHERE link_id IN (
+    SELECT id FROM (
+        SELECT id, row_number() OVER (PARTITION BY chat_id, url ORDER BY id) AS rn
+        FROM links
+    ) ranked
+    WHERE rn > 1
+);
+DELETE FROM link_filters
+WHERE link_id IN (
+    SELECT id FROM (
+        SELECT id, row_number() OVER (PARTITION BY chat_id, url ORDER BY id) AS rn
+        FROM links
+    ) ranked
+    WHERE rn > 1
+);
+DELETE FROM links
+WHERE id IN (
+    SELECT id FROM (
+        SELECT id, row_number() OVER (PARTITION BY chat_id, url ORDER BY id) AS rn
+        FROM links
+    ) ranked
+    WHERE rn > 1
+);
+
+--changeset kakashi-hatake3:8 runInTransaction:false
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_links_chat_id_url ON links (chat_id, url);
+
+--changeset kakashi-hatake3:9 runInTransaction:false
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_links_url ON links (url) INCLUDE (chat_id);
+
+--changeset kakashi-hatake3:10 runInTransaction:false
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_link_tags_tag_id ON link_tags (tag_id, link_id);
+
+--changeset kakashi-hatake3:11 runInTransaction:false
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_link_filters_filter_id ON link_filters (filter_id, link_id);
@@ -0,0 +1,83 @@
+--liquibase formatted sql
+
+--changeset kakashi-hatake3:12
+CREATE TABLE resources (
+    id SERIAL PRIMARY KEY,
+    url VARCHAR(255) NOT NULL UNIQUE,
+    platform VARCHAR(32),
+    subscribers_count INT NOT NULL DEFAULT 0
+);
+
+--changeset kakashi-hatake3:13
+CREATE TEMPORARY TABLE link_resource_urls ON COMMIT DROP AS
+SELECT
+    id,
+    CASE
+        WHEN url ~* '^https?://(www\.)?github\.com/[^/?#]+/[^/?#]+'
+            THEN lower(regexp_replace(
+                url, '^https?://(www\.)?github\.com/([^/?#]+)/([^/?#]+).*$',
+                'https://github.com/\2/\3', 'i'
+            ))
+        WHEN url ~* '^https?://(www\.)?stackoverflow\.com/questions/[0-9]+'
+            THEN regexp_replace(
+                url, '^https?://(www\.)?stackoverflow\.com/questions/([0-9]+).*$',
+                'https://stackoverflow.com/questions/\2', 'i'
+            )
+        ELSE url
+    END AS resource_url
+FROM links;
+INSERT INTO resources (url, platform, subscribers_count)
+SELECT
+    resource_url,
+    CASE
+        WHEN resource_url LIKE 'https://github.com/%' THEN 'github'
+        WHEN resource_url LIKE 'https://stackoverflow.com/%' THEN 'stackoverflow'
+    END,
+    count(*)
+FROM link_resource_urls
+GROUP BY resource_url;
+ALTER TABLE links ADD COLUMN resource_id INT;
+UPDATE links SET resource_id = r.id
+FROM link_resource_urls lru
+JOIN resources r ON r.url = lru.resource_url
+WHERE lru.id = links.id;
+ALTER TABLE links ALTER COLUMN resource_id SET NOT NULL;
+ALTER TABLE links ADD CONSTRAINT fk_links_resource FOREIGN KEY (resource_id) REFERENCES resources(id);
+
+--changeset kakashi-hatake3:14 splitStatements:false
+CREATE OR REPLACE FUNCTION resources_add_subscribers() RETURNS trigger AS $$
+BEGIN
+    UPDATE resources r
+    SET subscribers_count = r.subscribers_count + added.cnt
+    FROM (SELECT resource_id, count(*) AS cnt FROM new_links GROUP BY resource_id) added
+    WHERE r.id = added.resource_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+--changeset kakashi-hatake3:15 splitStatements:false
+CREATE OR REPLACE FUNCTION resources_remove_subscribers() RETURNS trigger AS $$
+BEGIN
+    UPDATE resources r
+    SET subscribers_count = r.subscribers_count - removed.cnt
+    FROM (SELECT resource_id, count(*) AS cnt FROM old_links GROUP BY resource_id) removed
+    WHERE r.id = removed.resource_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+--changeset kakashi-hatake3:16
+CREATE TRIGGER links_add_subscribers
+AFTER INSERT ON links
+REFERENCING NEW TABLE AS new_links
+FOR EACH STATEMENT EXECUTE FUNCTION resources_add_subscribers();
+CREATE TRIGGER links_remove_subscribers
+AFTER DELETE ON links
+REFERENCING OLD TABLE AS old_links
+FOR EACH STATEMENT EXECUTE FUNCTION resources_remove_subscribers();
+
+--changeset kakashi-hatake3:17 runInTransaction:false
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_links_resource_id ON links (resource_id) INCLUDE (chat_id);
+
+--changeset kakashi-hatake3:18 runInTransaction:false
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_resources_active ON resources (id) WHERE subscribers_count > 0;
@@ -0,0 +1,17 @@
+--liquibase formatted sql
+
+--changeset kakashi-hatake3:19
+ALTER TABLE links DROP CONSTRAINT fk_links_chat;
+ALTER TABLE links ADD CONSTRAINT fk_links_chat
+    FOREIGN KEY (chat_id) REFERENCES chats(chat_id) ON DELETE CASCADE NOT VALID;
+ALTER TABLE link_tags DROP CONSTRAINT fk_link_tags_link;
+ALTER TABLE link_tags ADD CONSTRAINT fk_link_tags_link
+    FOREIGN KEY (link_id) REFERENCES links(id) ON DELETE CASCADE NOT VALID;
+ALTER TABLE link_filters DROP CONSTRAINT fk_link_filters_link;
+ALTER TABLE link_filters ADD CONSTRAINT fk_link_filters_link
+    FOREIGN KEY (link_id) REFERENCES links(id) ON DELETE CASCADE NOT VALID;
+
+--changeset kakashi-hatake3:20
+ALTER TABLE links VALIDATE CONSTRAINT fk_links_chat;
+ALTER TABLE link_tags VALIDATE CONSTRAINT fk_link_tags_link;
+ALTER TABLE link_filters VALIDATE CONSTRAINT fk_link_filters_link;
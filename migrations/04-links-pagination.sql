@@ -0,0 +1,4 @@
+--liquibase formatted sql
+
+--changeset kakashi-hatake3:21 runInTransaction:false
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_links_chat_id_id ON links (chat_id, id);
@@ -0,0 +1,9 @@
+--liquibase formatted sql
+
+--changeset kakashi-hatake3:22
+CREATE TABLE conversations (
+    chat_id BIGINT PRIMARY KEY,
+    state JSONB NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+CREATE INDEX ix_conversations_expires_at ON conversations (expires_at);
@@ -0,0 +1,7 @@
+--liquibase formatted sql
+
+--changeset kakashi-hatake3:23
+ALTER TABLE resources
+    ADD COLUMN watermark_at TIMESTAMPTZ,
+    ADD COLUMN watermark_id TEXT,
+    ADD COLUMN seen_event_ids TEXT[] NOT NULL DEFAULT '{}';
@@ -0,0 +1,4 @@
+--liquibase formatted sql
+
+--changeset kakashi-hatake3:24
+CREATE SEQUENCE link_update_ids START WITH 1 INCREMENT BY 100;
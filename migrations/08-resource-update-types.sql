@@ -0,0 +1,55 @@
+--liquibase formatted sql
+
+--changeset kakashi-hatake3:25
+-- Типы обновлений, которые пропускают фильтры ссылки; вычисляются приложением при вставке.
+-- Для уже существующих ссылок берутся все типы: лишние эндпоинты опрашиваются, пока ссылку
+-- не добавят заново, но ни одно обновление не теряется.
+ALTER TABLE links ADD COLUMN update_types TEXT[] NOT NULL DEFAULT '{PR,Issue,Answer,Comment}';
+CREATE TABLE resource_update_types (
+    resource_id INT NOT NULL REFERENCES resources(id) ON DELETE CASCADE,
+    update_type VARCHAR(32) NOT NULL,
+    subscribers_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (resource_id, update_type)
+);
+INSERT INTO resource_update_types (resource_id, update_type, subscribers_count)
+SELECT links.resource_id, t.update_type, count(*)
+FROM links, unnest(links.update_types) AS t(update_type)
+GROUP BY links.resource_id, t.update_type;
+
+--changeset kakashi-hatake3:26 splitStatements:false
+CREATE OR REPLACE FUNCTION resource_update_types_add() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO resource_update_types AS rut (resource_id, update_type, subscribers_count)
+    SELECT new_links.resource_id, t.update_type, count(*)
+    FROM new_links, unnest(new_links.update_types) AS t(update_type)
+    GROUP BY new_links.resource_id, t.update_type
+    ON CONFLICT (resource_id, update_type)
+    DO UPDATE SET subscribers_count = rut.subscribers_count + EXCLUDED.subscribers_count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+--changeset kakashi-hatake3:27 splitStatements:false
+CREATE OR REPLACE FUNCTION resource_update_types_remove() RETURNS trigger AS $$
+BEGIN
+    UPDATE resource_update_types rut
+    SET subscribers_count = rut.subscribers_count - removed.cnt
+    FROM (
+        SELECT old_links.resource_id, t.update_type, count(*) AS cnt
+        FROM old_links, unnest(old_links.update_types) AS t(update_type)
+        GROUP BY old_links.resource_id, t.update_type
+    ) removed
+    WHERE rut.resource_id = removed.resource_id AND rut.update_type = removed.update_type;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+--changeset kakashi-hatake3:28
+CREATE TRIGGER links_add_update_types
+AFTER INSERT ON links
+REFERENCING NEW TABLE AS new_links
+FOR EACH STATEMENT EXECUTE FUNCTION resource_update_types_add();
+CREATE TRIGGER links_remove_update_types
+AFTER DELETE ON links
+REFERENCING OLD TABLE AS old_links
+FOR EACH STATEMENT EXECUTE FUNCTION resource_update_types_remove();
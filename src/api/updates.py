@@ -1,30 +1,130 @@
-from fastapi import APIRouter, HTTPException, Request
+import logging
+import time
+from datetime import UTC, datetime
+from typing import Optional
 
+from fastapi import APIRouter, FastAPI, HTTPException, Request
+from telethon.errors import BadRequestError, FloodWaitError, ForbiddenError
+
+from src.metrics import Histogram
 from src.models import ApiErrorResponse, LinkUpdate
+from src.telegram_metrics import record_flood_wait
+from src.tracing import TRACER, extract
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
+# Ошибки Telegram, которые не исчезнут при повторе: бот заблокирован, чат удалён или закрыт.
+PERMANENT_SEND_ERRORS = (BadRequestError, ForbiddenError)
+
+UPDATES_REQUEST_SECONDS = Histogram(
+    "bot_updates_request_seconds",
+    "Latency of /api/v1/updates requests by outcome",
+    ["status"],
+)
+SEND_MESSAGE_SECONDS = Histogram(
+    "bot_send_message_seconds",
+    "Latency of sending an update to a single chat by outcome (ok, rejected, flood_wait, error)",
+    ["result"],
+)
+
+UPDATE_FRESHNESS_SECONDS = Histogram(
+    "bot_update_freshness_seconds",
+    "Time from update creation on the platform to its delivery to a chat",
+    ["platform"],
+    buckets=(1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0, 7200.0),
+)
+
+
+def _record_delivery(update: LinkUpdate) -> None:
+    if update.created_at is None:
+        # Scrapper старой версии не передаёт отметки свежести.
+        return
+    created_at = update.created_at
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=UTC)
+    lag = (datetime.now(UTC) - created_at).total_seconds()
+    UPDATE_FRESHNESS_SECONDS.observe(max(lag, 0.0), platform=update.platform or "unknown")
+
+
+async def _send(
+    app: FastAPI,
+    update: LinkUpdate,
+    chat_id: int,
+    message: str,
+) -> Optional[Exception]:
+    """Отправить обновление в чат; вернуть ошибку, после которой отправку нужно повторить."""
+    started = time.perf_counter()
+    result = "error"
+    try:
+        with TRACER.span("bot.send_message", chat_id=chat_id):
+            await app.tg_client.send_message(chat_id, message)  # type: ignore[attr-defined]
+    except PERMANENT_SEND_ERRORS as e:
+        # Повтор не поможет: отметка o доставке остаётся, чат больше не пробуем.
+        result = "rejected"
+        logger.warning("Update %d is not deliverable to chat %d: %s", update.id, chat_id, e)
+        return None
+    except Exception as e:
+        if isinstance(e, FloodWaitError):
+            result = "flood_wait"
+            record_flood_wait(e, "updates")
+        logger.exception("Failed to send update %d to chat %d", update.id, chat_id)
+        # Повторная доставка обновления должна дойти до этого чата.
+        app.delivered_updates.release(update.id, chat_id)  # type: ignore[attr-defined]
+        return e
+    else:
+        result = "ok"
+        _record_delivery(update)
+        return None
+    finally:
+        SEND_MESSAGE_SECONDS.observe(time.perf_counter() - started, result=result)
+
+
+async def _deliver(app: FastAPI, update: LinkUpdate) -> None:
+    """Разослать обновление по всем чатам; ошибка одного чата не останавливает остальные."""
+    chats, delivered = app.chats, app.delivered_updates  # type: ignore[attr-defined]
+    with TRACER.span("bot.resolve_chats"):
+        registered = await chats.resolve(update.tg_chat_ids, app.storage)  # type: ignore[attr-defined]
+    message = f"Обновление для ссылки {update.url}"
+    if update.description:
+        message += f"\nОписание: {update.description}"
+    errors: dict[int, Exception] = {}
+    for chat_id in update.tg_chat_ids:
+        if chat_id in registered and delivered.claim(update.id, chat_id):
+            error = await _send(app, update, chat_id, message)
+            if error is not None:
+                errors[chat_id] = error
+    if errors:
+        error = next(iter(errors.values()))
+        raise HTTPException(
+            status_code=503,
+            detail=ApiErrorResponse(
+                description=f"Обновление не доставлено в чаты {sorted(errors)}, повторите запрос",
+                code="UPDATE_DELIVERY_RETRY",
+                exceptionName=error.__class__.__name__,
+                exceptionMessage=str(error),
+            ).model_dump(),
+        )
+
 
 @router.post(
     "/updates",
     responses={
         200: {"description": "Обновление обработано"},
         400: {"model": ApiErrorResponse, "description": "Некорректные параметры запроса"},
+        503: {"model": ApiErrorResponse, "description": "Часть чатов недоступна, повторите"},
     },
 )
 async def process_update(update: LinkUpdate, request: Request) -> dict[str, str] | None:
+    started = time.perf_counter()
+    status = "error"
     try:
-        app = request.app
-        for chat_id in update.tg_chat_ids:
-            user = app.storage.get_user(chat_id)
-            if user:
-                message = f"Обновление для ссылки {update.url}"
-                if update.description:
-                    message += f"\nОписание: {update.description}"
-                await app.tg_client.send_message(chat_id, message)
-                return {"status": "ok"}
-            else:
-                return {"status": "ok"}
+        # Спан продолжает трассу scrapper, если в запросе пришёл заголовок traceparent.
+        parent = extract(request.headers)
+        with TRACER.span("bot.process_update", parent, update_id=update.id):
+            await _deliver(request.app, update)
+        status = "ok"
     except HTTPException:
         raise
     except Exception as e:
@@ -37,5 +137,6 @@ async def process_update(update: LinkUpdate, request: Request) -> dict[str, str]
                 exceptionMessage=str(e),
             ).model_dump(),
         ) from e
-    else:
-        return None
+    finally:
+        UPDATES_REQUEST_SECONDS.observe(time.perf_counter() - started, status=status)
+    return {"status": "ok"}
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import threading
+from collections.abc import Iterable
+
+from src.storage import AsyncStorage, StorageInterface
+
+__all__ = ("ChatRegistry",)
+
+logger = logging.getLogger(__name__)
+
+
+class ChatRegistry:
+    """Множество зарегистрированных чатов в памяти бота.
+
+    Заполняется из БД при старте, пополняется на /start и периодически сверяется c БД:
+    чаты удаляются только через scrapper, поэтому бот узнаёт o них при сверке. Чаты,
+    которых нет в множестве, проверяются по БД в resolve: их могли зарегистрировать
+    на другой реплике бота.
+    """
+
+    def __init__(self, chat_ids: Iterable[int] = ()) -> None:
+        self._chat_ids: set[int] = set(chat_ids)
+        # Чаты, добавленные во время перечитывания из БД: снимок может их ещё не содержать.
+        self._added: set[int] = set()
+        self._lock = threading.Lock()
+
+    def __contains__(self, chat_id: object) -> bool:
+        return chat_id in self._chat_ids
+
+    def __len__(self) -> int:
+        return len(self._chat_ids)
+
+    def add(self, chat_id: int) -> None:
+        with self._lock:
+            self._chat_ids.add(chat_id)
+            self._added.add(chat_id)
+
+    def filter_registered(self, chat_ids: Iterable[int]) -> set[int]:
+        registered = self._chat_ids
+        return {chat_id for chat_id in chat_ids if chat_id in registered}
+
+    async def resolve(self, chat_ids: Iterable[int], storage: StorageInterface) -> set[int]:
+        """Зарегистрированные чаты из chat_ids; промахи множества проверяются по БД."""
+        chat_ids = list(chat_ids)
+        registered = self.filter_registered(chat_ids)
+        missing = {chat_id for chat_id in chat_ids if chat_id not in registered}
+        if not missing:
+            return registered
+        # AsyncStorage переносит contextvars: запрос к БД остаётся в трассе process_update.
+        found = await AsyncStorage(storage).filter_registered(missing)
+        for chat_id in found:
+            self.add(chat_id)
+        return registered | found
+
+    async def refresh(self, storage: StorageInterface) -> None:
+        """Заменить множество снимком из БД, не теряя чаты, добавленные во время чтения."""
+        with self._lock:
+            self._added = set()
+        chat_ids = await AsyncStorage(storage).registered_chat_ids()
+        with self._lock:
+            self._chat_ids = chat_ids | self._added
+            self._added = set()
+
+    async def reconcile(self, storage: StorageInterface, interval: float) -> None:
+        """Сверять множество c БД каждые interval секунд до отмены задачи."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh(storage)
+            except Exception:
+                logger.exception("Failed to reconcile registered chats")
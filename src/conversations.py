@@ -0,0 +1,287 @@
+import asyncio
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any, Optional
+
+import orjson
+from sqlalchemy import text
+
+from src.engine import get_engine
+from src.metrics import Gauge
+from src.settings import ConversationSettings
+
+__all__ = (
+    "ConversationState",
+    "ConversationStore",
+    "InMemoryConversationStore",
+    "PostgresConversationStore",
+    "create_conversation_store",
+    "evict_periodically",
+)
+
+logger = logging.getLogger(__name__)
+
+CONVERSATIONS = Gauge("bot_conversations", "Active conversations in the conversation store")
+
+ConversationState = dict[str, Any]
+
+
+class ConversationStore(ABC):
+    """Состояние незавершённых диалогов (/track) по chat_id c TTL и ограничением размера.
+
+    Хендлеры бота используют асинхронные aget/aset/adelete: по умолчанию они выполняют
+    синхронные методы в executor, чтобы обращения к общему хранилищу не блокировали цикл.
+    """
+
+    @abstractmethod
+    def get(self, chat_id: int) -> Optional[ConversationState]:
+        """Получить состояние диалога; None, если диалога нет или он истёк."""
+
+    @abstractmethod
+    def set(self, chat_id: int, state: ConversationState) -> None:
+        """Сохранить состояние диалога, продлив TTL."""
+
+    @abstractmethod
+    def delete(self, chat_id: int) -> None:
+        """Завершить диалог."""
+
+    @abstractmethod
+    def evict(self) -> int:
+        """Удалить истёкшие и лишние сверх max_size диалоги; вернуть их количество."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Количество активных (не истёкших) диалогов."""
+
+    async def aget(self, chat_id: int) -> Optional[ConversationState]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, chat_id)
+
+    async def aset(self, chat_id: int, state: ConversationState) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.set, chat_id, state)
+
+    async def adelete(self, chat_id: int) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.delete, chat_id)
+
+    def __contains__(self, chat_id: object) -> bool:
+        return isinstance(chat_id, int) and self.get(chat_id) is not None
+
+    def __getitem__(self, chat_id: int) -> ConversationState:
+        state = self.get(chat_id)
+        if state is None:
+            raise KeyError(chat_id)
+        return state
+
+    def __setitem__(self, chat_id: int, state: ConversationState) -> None:
+        self.set(chat_id, state)
+
+    def __delitem__(self, chat_id: int) -> None:
+        self.delete(chat_id)
+
+
+class InMemoryConversationStore(ConversationStore):
+    """Хранилище в памяти процесса: подходит для одной реплики бота."""
+
+    def __init__(
+        self,
+        ttl: float = 900.0,
+        max_size: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._items: OrderedDict[int, tuple[float, ConversationState]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chat_id: int) -> Optional[ConversationState]:
+        with self._lock:
+            item = self._items.get(chat_id)
+            if item is None:
+                return None
+            expires_at, state = item
+            if expires_at <= self._clock():
+                del self._items[chat_id]
+                return None
+            return state
+
+    def set(self, chat_id: int, state: ConversationState) -> None:
+        with self._lock:
+            self._items[chat_id] = (self._clock() + self.ttl, state)
+            self._items.move_to_end(chat_id)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def delete(self, chat_id: int) -> None:
+        with self._lock:
+            self._items.pop(chat_id, None)
+
+    def evict(self) -> int:
+        now = self._clock()
+        with self._lock:
+            # Порядок вставки совпадает c порядком истечения: TTL одинаковый для всех диалогов.
+            expired = 0
+            while self._items and next(iter(self._items.values()))[0] <= now:
+                self._items.popitem(last=False)
+                expired += 1
+            return expired
+
+    # Операции в памяти не блокируют цикл событий: executor им не нужен.
+    async def aget(self, chat_id: int) -> Optional[ConversationState]:
+        return self.get(chat_id)
+
+    async def aset(self, chat_id: int, state: ConversationState) -> None:
+        self.set(chat_id, state)
+
+    async def adelete(self, chat_id: int) -> None:
+        self.delete(chat_id)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class PostgresConversationStore(ConversationStore):
+    """Общее для всех реплик бота хранилище в таблице conversations; время берётся из БД.
+
+    Большинство сообщений приходит вне диалога, поэтому отсутствие диалога запоминается
+    в памяти процесса на negative_ttl секунд и повторно в БД не проверяется. Диалог, начатый
+    на другой реплике, становится виден здесь не позже чем через negative_ttl.
+    """
+
+    def __init__(
+        self,
+        db_url: str,
+        ttl: float = 900.0,
+        max_size: int = 10000,
+        negative_ttl: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.engine = get_engine(db_url)
+        self.ttl = ttl
+        self.max_size = max_size
+        self.negative_ttl = negative_ttl
+        self._clock = clock
+        self._absent: OrderedDict[int, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _known_absent(self, chat_id: int) -> bool:
+        with self._lock:
+            expires_at = self._absent.get(chat_id)
+            if expires_at is None:
+                return False
+            if expires_at <= self._clock():
+                del self._absent[chat_id]
+                return False
+            return True
+
+    def _mark_absent(self, chat_id: int) -> None:
+        if self.negative_ttl <= 0:
+            return
+        with self._lock:
+            self._absent[chat_id] = self._clock() + self.negative_ttl
+            self._absent.move_to_end(chat_id)
+            while len(self._absent) > self.max_size:
+                self._absent.popitem(last=False)
+
+    def get(self, chat_id: int) -> Optional[ConversationState]:
+        if self._known_absent(chat_id):
+            return None
+        query = text(
+            "SELECT state FROM conversations WHERE chat_id = :chat_id AND expires_at > now()",
+        )
+        with self.engine.connect() as conn:
+            state = conn.execute(query, {"chat_id": chat_id}).scalar()
+        if state is None:
+            self._mark_absent(chat_id)
+            return None
+        return dict(state)
+
+    def set(self, chat_id: int, state: ConversationState) -> None:
+        query = text(
+            """
+            INSERT INTO conversations (chat_id, state, expires_at)
+            VALUES (:chat_id, CAST(:state AS jsonb), now() + make_interval(secs => :ttl))
+            ON CONFLICT (chat_id) DO UPDATE
+            SET state = EXCLUDED.state, expires_at = EXCLUDED.expires_at
+            """,
+        )
+        with self.engine.connect() as conn:
+            conn.execute(
+                query,
+                {"chat_id": chat_id, "state": orjson.dumps(state).decode(), "ttl": self.ttl},
+            )
+            conn.commit()
+        with self._lock:
+            self._absent.pop(chat_id, None)
+
+    def delete(self, chat_id: int) -> None:
+        with self.engine.connect() as conn:
+            conn.execute(
+                text("DELETE FROM conversations WHERE chat_id = :chat_id"),
+                {"chat_id": chat_id},
+            )
+            conn.commit()
+        self._mark_absent(chat_id)
+
+    def evict(self) -> int:
+        query = text(
+            """
+            DELETE FROM conversations
+            WHERE expires_at <= now()
+               OR chat_id IN (
+                   SELECT chat_id FROM conversations
+                   ORDER BY expires_at DESC
+                   OFFSET :max_size
+               )
+            """,
+        )
+        with self.engine.connect() as conn:
+            evicted = conn.execute(query, {"max_size": self.max_size}).rowcount
+            conn.commit()
+            return evicted
+
+    def __len__(self) -> int:
+        query = text("SELECT count(*) FROM conversations WHERE expires_at > now()")
+        with self.engine.connect() as conn:
+            return int(conn.execute(query).scalar_one())
+
+    async def aget(self, chat_id: int) -> Optional[ConversationState]:
+        # Известное отсутствие диалога проверяется без executor и обращения к БД.
+        if self._known_absent(chat_id):
+            return None
+        return await super().aget(chat_id)
+
+
+def create_conversation_store(
+    settings: ConversationSettings,
+    db_url: Optional[str] = None,
+) -> ConversationStore:
+    if settings.backend.lower() == "postgres":
+        if not db_url:
+            raise ValueError("DB_URL is required for the postgres conversations backend")
+        return PostgresConversationStore(
+            db_url,
+            settings.ttl_seconds,
+            settings.max_size,
+            settings.negative_ttl_seconds,
+        )
+    return InMemoryConversationStore(settings.ttl_seconds, settings.max_size)
+
+
+def _evict_and_measure(store: ConversationStore) -> None:
+    store.evict()
+    CONVERSATIONS.set(len(store))
+
+
+async def evict_periodically(store: ConversationStore, interval: float) -> None:
+    """Чистить хранилище диалогов каждые interval секунд до отмены задачи."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await loop.run_in_executor(None, _evict_and_measure, store)
+        except Exception:
+            logger.exception("Failed to evict conversations")
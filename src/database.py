@@ -1,40 +1,126 @@
 from typing import Type
 
-from sqlalchemy import Column, ForeignKey, Integer, String, Table
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    Sequence,
+    String,
+    Table,
+    event,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import DeclarativeBase, declarative_base, relationship
 
 Base: Type[DeclarativeBase] = declarative_base()
 
+# Идентификаторы LinkUpdate выдаются блоками: nextval возвращает начало блока из
+# UPDATE_ID_BLOCK значений, которые scrapper расходует без обращений к БД.
+UPDATE_ID_BLOCK = 100
+
+link_update_ids = Sequence(
+    "link_update_ids",
+    increment=UPDATE_ID_BLOCK,
+    start=1,
+    metadata=Base.metadata,
+)
+
 
 link_tags = Table(
     "link_tags",
     Base.metadata,
-    Column("link_id", Integer, ForeignKey("links.id"), primary_key=True),
+    Column("link_id", Integer, ForeignKey("links.id", ondelete="CASCADE"), primary_key=True),
     Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+    Index("ix_link_tags_tag_id", "tag_id", "link_id"),
 )
 
 link_filters = Table(
     "link_filters",
     Base.metadata,
-    Column("link_id", Integer, ForeignKey("links.id"), primary_key=True),
+    Column("link_id", Integer, ForeignKey("links.id", ondelete="CASCADE"), primary_key=True),
     Column("filter_id", Integer, ForeignKey("filters.id"), primary_key=True),
+    Index("ix_link_filters_filter_id", "filter_id", "link_id"),
 )
 
 
 class Link(Base):  # type: ignore[valid-type]
     __tablename__ = "links"
+    __table_args__ = (
+        Index("ux_links_chat_id_url", "chat_id", "url", unique=True),
+        Index("ix_links_url", "url", postgresql_include=["chat_id"]),
+        Index("ix_links_resource_id", "resource_id", postgresql_include=["chat_id"]),
+        Index("ix_links_chat_id_id", "chat_id", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    chat_id = Column(Integer, ForeignKey("chats.chat_id"), nullable=False)
+    chat_id = Column(Integer, ForeignKey("chats.chat_id", ondelete="CASCADE"), nullable=False)
     url = Column(String, nullable=False)
+    resource_id = Column(Integer, ForeignKey("resources.id"), nullable=False)
+    # Типы обновлений, которые пропускают фильтры ссылки (migrations/08-resource-update-types.sql).
+    update_types: Column[list[str]] = Column(
+        ARRAY(String),
+        nullable=False,
+        server_default="{PR,Issue,Answer,Comment}",
+    )
     chat = relationship("Chat", back_populates="links")
-    tags = relationship("Tag", secondary=link_tags, back_populates="links")
-    filters = relationship("Filter", secondary=link_filters, back_populates="links")
+    resource = relationship("Resource", back_populates="links")
+    tags = relationship("Tag", secondary=link_tags, back_populates="links", passive_deletes=True)
+    filters = relationship(
+        "Filter",
+        secondary=link_filters,
+        back_populates="links",
+        passive_deletes=True,
+    )
+
+
+class Resource(Base):  # type: ignore[valid-type]
+    __tablename__ = "resources"
+    __table_args__ = (
+        Index("ix_resources_active", "id", postgresql_where=text("subscribers_count > 0")),
+    )
+    id = Column(Integer, primary_key=True)
+    url = Column(String, unique=True, nullable=False)
+    platform = Column(String)
+    subscribers_count = Column(Integer, nullable=False, default=0, server_default="0")
+    watermark_at = Column(DateTime(timezone=True))
+    watermark_id = Column(String)
+    seen_event_ids: Column[list[str]] = Column(
+        ARRAY(String),
+        nullable=False,
+        default=list,
+        server_default="{}",
+    )
+    links = relationship("Link", back_populates="resource")
+
+
+# Сколько ссылок на адрес хотят получать каждый тип обновлений; ведётся триггерами ниже.
+resource_update_types = Table(
+    "resource_update_types",
+    Base.metadata,
+    Column(
+        "resource_id",
+        Integer,
+        ForeignKey("resources.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column("update_type", String(32), primary_key=True),
+    Column("subscribers_count", Integer, nullable=False, server_default="0"),
+)
 
 
 class Chat(Base):  # type: ignore[valid-type]
     __tablename__ = "chats"
     chat_id = Column(Integer, primary_key=True, index=True)
-    links = relationship("Link", back_populates="chat", cascade="all, delete-orphan")
+    links = relationship(
+        "Link",
+        back_populates="chat",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
 
 
 class Tag(Base):  # type: ignore[valid-type]
@@ -49,3 +135,93 @@ class Filter(Base):  # type: ignore[valid-type]
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, nullable=False)
     links = relationship("Link", secondary=link_filters, back_populates="filters")
+
+
+class Conversation(Base):  # type: ignore[valid-type]
+    __tablename__ = "conversations"
+    chat_id = Column(BigInteger, primary_key=True)
+    state = Column(JSONB, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+# Счётчики подписчиков и типов обновлений ведёт сама база, как и в migrations/02-resources.sql
+# и 08-resource-update-types.sql: тогда они точны при любом способе вставки и удаления ссылок.
+SUBSCRIBERS_TRIGGERS_DDL = (
+    """
+    CREATE OR REPLACE FUNCTION resources_add_subscribers() RETURNS trigger AS $$
+    BEGIN
+        UPDATE resources r
+        SET subscribers_count = r.subscribers_count + added.cnt
+        FROM (SELECT resource_id, count(*) AS cnt FROM new_links GROUP BY resource_id) added
+        WHERE r.id = added.resource_id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION resources_remove_subscribers() RETURNS trigger AS $$
+    BEGIN
+        UPDATE resources r
+        SET subscribers_count = r.subscribers_count - removed.cnt
+        FROM (SELECT resource_id, count(*) AS cnt FROM old_links GROUP BY resource_id) removed
+        WHERE r.id = removed.resource_id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER links_add_subscribers
+    AFTER INSERT ON links
+    REFERENCING NEW TABLE AS new_links
+    FOR EACH STATEMENT EXECUTE FUNCTION resources_add_subscribers()
+    """,
+    """
+    CREATE TRIGGER links_remove_subscribers
+    AFTER DELETE ON links
+    REFERENCING OLD TABLE AS old_links
+    FOR EACH STATEMENT EXECUTE FUNCTION resources_remove_subscribers()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION resource_update_types_add() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO resource_update_types AS rut (resource_id, update_type, subscribers_count)
+        SELECT new_links.resource_id, t.update_type, count(*)
+        FROM new_links, unnest(new_links.update_types) AS t(update_type)
+        GROUP BY new_links.resource_id, t.update_type
+        ON CONFLICT (resource_id, update_type)
+        DO UPDATE SET subscribers_count = rut.subscribers_count + EXCLUDED.subscribers_count;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION resource_update_types_remove() RETURNS trigger AS $$
+    BEGIN
+        UPDATE resource_update_types rut
+        SET subscribers_count = rut.subscribers_count - removed.cnt
+        FROM (
+            SELECT old_links.resource_id, t.update_type, count(*) AS cnt
+            FROM old_links, unnest(old_links.update_types) AS t(update_type)
+            GROUP BY old_links.resource_id, t.update_type
+        ) removed
+        WHERE rut.resource_id = removed.resource_id AND rut.update_type = removed.update_type;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER links_add_update_types
+    AFTER INSERT ON links
+    REFERENCING NEW TABLE AS new_links
+    FOR EACH STATEMENT EXECUTE FUNCTION resource_update_types_add()
+    """,
+    """
+    CREATE TRIGGER links_remove_update_types
+    AFTER DELETE ON links
+    REFERENCING OLD TABLE AS old_links
+    FOR EACH STATEMENT EXECUTE FUNCTION resource_update_types_remove()
+    """,
+)
+
+for statement in SUBSCRIBERS_TRIGGERS_DDL:
+    event.listen(Link.__table__, "after_create", DDL(statement))  # type: ignore[no-untyped-call]
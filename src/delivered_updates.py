@@ -0,0 +1,42 @@
+import threading
+from collections import OrderedDict
+
+__all__ = ("DeliveredUpdates",)
+
+
+class DeliveredUpdates:
+    """Чаты, которым уже отправлено обновление, по id LinkUpdate (LRU на max_size обновлений).
+
+    Scrapper повторяет доставку при ошибках; повтор c тем же id не отправляет сообщение
+    в чаты, куда оно уже доставлено.
+    """
+
+    def __init__(self, max_size: int = 10000) -> None:
+        self.max_size = max_size
+        self._items: OrderedDict[int, set[int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, update_id: int, chat_id: int) -> bool:
+        """Отметить отправку обновления в чат; False, если она уже была."""
+        with self._lock:
+            chats = self._items.get(update_id)
+            if chats is None:
+                chats = self._items[update_id] = set()
+                while len(self._items) > self.max_size:
+                    self._items.popitem(last=False)
+            else:
+                self._items.move_to_end(update_id)
+            if chat_id in chats:
+                return False
+            chats.add(chat_id)
+            return True
+
+    def release(self, update_id: int, chat_id: int) -> None:
+        """Снять отметку, если отправить сообщение не удалось."""
+        with self._lock:
+            chats = self._items.get(update_id)
+            if chats is not None:
+                chats.discard(chat_id)
+
+    def __len__(self) -> int:
+        return len(self._items)
@@ -0,0 +1,58 @@
+import asyncio
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable
+
+__all__ = ("ChatDispatcher",)
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+
+
+class ChatDispatcher:
+    """Обработка входящих сообщений: параллельно между чатами, строго по порядку внутри чата.
+
+    Одновременно выполняется не больше max_workers обработчиков; когда в очередях набирается
+    max_pending сообщений, submit ждёт освобождения места (backpressure).
+    """
+
+    def __init__(self, max_workers: int = 16, max_pending: int = 1000) -> None:
+        self._workers = asyncio.Semaphore(max_workers)
+        self._pending = asyncio.Semaphore(max_pending)
+        self._queues: dict[int, deque[Job]] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    @property
+    def queued(self) -> int:
+        """Количество принятых, но ещё не начатых сообщений."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def submit(self, chat_id: int, job: Job) -> None:
+        await self._pending.acquire()
+        queue = self._queues.get(chat_id)
+        if queue is not None:
+            queue.append(job)
+            return
+        self._queues[chat_id] = deque([job])
+        task = asyncio.create_task(self._drain(chat_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self, chat_id: int) -> None:
+        queue = self._queues[chat_id]
+        while queue:
+            job = queue.popleft()
+            try:
+                async with self._workers:
+                    await job()
+            except Exception:
+                logger.exception("Unhandled error while processing message for chat %s", chat_id)
+            finally:
+                self._pending.release()
+        del self._queues[chat_id]
+
+    async def join(self) -> None:
+        """Дождаться обработки всех принятых сообщений."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks)
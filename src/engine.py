@@ -0,0 +1,116 @@
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.pool import ConnectionPoolEntry, QueuePool
+
+from src.metrics import Counter, Gauge, Histogram, LabelValues
+from src.settings import DatabaseSettings
+
+__all__ = ("InstrumentedQueuePool", "get_engine")
+
+_engines: dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+
+POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a connection from the pool",
+    ["database"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+DB_QUERIES = Counter(
+    "db_queries",
+    "SQL statements executed",
+    ["database"],
+)
+
+
+def _pool_stats(stat: str) -> dict[LabelValues, float]:
+    stats: dict[LabelValues, float] = {}
+    for engine in list(_engines.values()):
+        pool = engine.pool
+        if not isinstance(pool, InstrumentedQueuePool):
+            continue
+        capacity = pool.size() + pool.overflow_limit
+        values = {
+            "checked_out": pool.checkedout(),
+            "utilization": pool.checkedout() / capacity if capacity else 0.0,
+        }
+        stats[(pool.database,)] = values[stat]
+    return stats
+
+
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool",
+    ["database"],
+    function=lambda: _pool_stats("checked_out"),
+)
+POOL_UTILIZATION = Gauge(
+    "db_pool_utilization",
+    "Share of pool capacity (size + max_overflow) in use",
+    ["database"],
+    function=lambda: _pool_stats("utilization"),
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool, замеряющий время ожидания свободного соединения."""
+
+    database = "default"
+
+    @property
+    def overflow_limit(self) -> int:
+        return max(self._max_overflow, 0)
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started, database=self.database)
+
+    def recreate(self) -> QueuePool:
+        pool = super().recreate()
+        if isinstance(pool, InstrumentedQueuePool):
+            pool.database = self.database
+        return pool
+
+
+def create_engine_from_settings(db_url: str, settings: DatabaseSettings) -> Engine:
+    engine = create_engine(
+        db_url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_recycle=settings.pool_recycle,
+        pool_pre_ping=settings.pool_pre_ping,
+        connect_args={
+            "options": (
+                f"-c statement_timeout={settings.statement_timeout_ms} "
+                f"-c lock_timeout={settings.lock_timeout_ms}"
+            ),
+        },
+    )
+    database = engine.url.database or "default"
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        engine.pool.database = database
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_query(*_: object) -> None:
+        DB_QUERIES.inc(database=database)
+
+    return engine
+
+
+def get_engine(db_url: str, settings: Optional[DatabaseSettings] = None) -> Engine:
+    """Общий Engine (и пул соединений) на процесс для каждого db_url."""
+    with _engines_lock:
+        engine = _engines.get(db_url)
+        if engine is None:
+            engine = create_engine_from_settings(db_url, settings or DatabaseSettings())
+            _engines[db_url] = engine
+        return engine
@@ -1,13 +1,34 @@
+import functools
 import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Optional
 from urllib.parse import urlparse
 
 from fastapi import HTTPException
-from telethon import TelegramClient, events
+from telethon import Button, TelegramClient, events
+from telethon.errors import FloodWaitError
 from telethon.tl.functions.bots import SetBotCommandsRequest
 from telethon.tl.types import BotCommand, BotCommandScopeDefault
 
+from src.chat_registry import ChatRegistry
+from src.conversations import ConversationState, ConversationStore, InMemoryConversationStore
+from src.dispatcher import ChatDispatcher
+from src.handlers.chat_id import chat_id_cmd_handler
+from src.handlers.rendering import (
+    LIST_CALLBACK_PREFIX,
+    MESSAGE_LIMIT,
+    parse_list_callback,
+    render_links,
+    to_list_callback,
+)
+from src.metrics import Histogram
+from src.resilience import CircuitOpenError
+from src.scrapper.filters import validate_filters
+from src.scrapper.models import ListLinksResponse
 from src.scrapper_client import ScrapperClient
-from src.storage import Storage
+from src.storage import AsyncStorage, Storage
+from src.telegram_metrics import record_flood_wait
 
 HELP_MESSAGE = """
 Доступные команды:
@@ -15,23 +36,56 @@ HELP_MESSAGE = """
 /help - вывод списка доступных команд
 /track <url> [tags] [filters] - начать отслеживание ссылки
 /untrack <url> - прекратить отслеживание ссылки
-/list - показать список отслеживаемых ссылок
+/list [тег] - показать список отслеживаемых ссылок (можно только c тегом)
 """
+UNAVAILABLE_MESSAGE = "Сервис временно недоступен. Пожалуйста, попробуйте позже."
+LIST_PAGE_SIZE = 50
+PARTIAL_LIST_NOTE = "\n\nПоказаны не все ссылки: уточните тег."
 
 logger = logging.getLogger(__name__)
 
+HANDLER_SECONDS = Histogram(
+    "bot_handler_seconds",
+    "Time to handle an incoming message by command",
+    ["command"],
+)
+
+CommandHandler = Callable[[events.NewMessage.Event], Awaitable[None]]
+SendMessage = Callable[..., Awaitable[object]]
+
 
 class BotHandler:
-    def __init__(self, client: TelegramClient, storage: Storage) -> None:
+    def __init__(
+        self,
+        client: TelegramClient,
+        storage: Storage,
+        scrapper: Optional[ScrapperClient] = None,
+        chats: Optional[ChatRegistry] = None,
+        conversations: Optional[ConversationStore] = None,
+        dispatcher: Optional[ChatDispatcher] = None,
+    ) -> None:
         self.client = client
         self.storage = storage
-        self.scrapper = ScrapperClient()
-        self.conversations = {}  # type: ignore[var-annotated]
+        self.async_storage = AsyncStorage(storage)
+        self.scrapper = scrapper or ScrapperClient()
+        self.chats = chats if chats is not None else ChatRegistry()
+        self.conversations = (
+            conversations if conversations is not None else InMemoryConversationStore()
+        )
+        self.dispatcher = dispatcher or ChatDispatcher()
         self._setup_handlers()
 
     @classmethod
-    async def create(cls, client: TelegramClient, storage: Storage) -> "BotHandler":
-        handler = cls(client, storage)
+    async def create(
+        cls,
+        client: TelegramClient,
+        storage: Storage,
+        scrapper: Optional[ScrapperClient] = None,
+        chats: Optional[ChatRegistry] = None,
+        conversations: Optional[ConversationStore] = None,
+        dispatcher: Optional[ChatDispatcher] = None,
+    ) -> "BotHandler":
+        handler = cls(client, storage, scrapper, chats, conversations, dispatcher)
         await handler.register_commands()
         return handler
 
@@ -52,24 +106,69 @@ class BotHandler:
         )
 
     def _setup_handlers(self) -> None:
-        self.client.add_event_handler(self._start_handler, events.NewMessage(pattern="/start"))
-        self.client.add_event_handler(self._help_handler, events.NewMessage(pattern="/help"))
-        self.client.add_event_handler(self._track_handler, events.NewMessage(pattern="/track"))
-        self.client.add_event_handler(self._untrack_handler, events.NewMessage(pattern="/untrack"))
-        self.client.add_event_handler(self._list_handler, events.NewMessage(pattern="/list"))
+        self._commands: dict[str, CommandHandler] = {
+            "/start": self._start_handler,
+            "/help": self._help_handler,
+            "/track": self._track_handler,
+            "/untrack": self._untrack_handler,
+            "/list": self._list_handler,
+            "/chat_id": chat_id_cmd_handler,
+        }
+        self.client.add_event_handler(self._on_message, events.NewMessage())
         self.client.add_event_handler(
-            self._conversation_handler,
-            events.NewMessage(func=lambda e: e.message.text and not e.message.text.startswith("/")),
+            self._on_list_callback,
+            events.CallbackQuery(pattern=LIST_CALLBACK_PREFIX.encode()),
         )
-        self.client.add_event_handler(
-            self._unknown_command_handler,
-            events.NewMessage(pattern="/[a-zA-Z]+"),
+
+    async def _on_message(self, event: events.NewMessage.Event) -> None:
+        await self.dispatcher.submit(event.chat_id, functools.partial(self._message_handler, event))
+
+    async def _on_list_callback(self, event: events.CallbackQuery.Event) -> None:
+        await self.dispatcher.submit(
+            event.chat_id,
+            functools.partial(self._timed, "list_page", self._list_page_callback, event),
         )
 
+    async def _message_handler(self, event: events.NewMessage.Event) -> None:
+        """Единая точка входа: команда разбирается один раз и диспетчеризуется по словарю."""
+        text = event.message.text
+        if not text:
+            return
+        if text.startswith("/"):
+            command = text.split(maxsplit=1)[0].partition("@")[0]
+            handler = self._commands.get(command)
+            if handler is None:
+                command, handler = "unknown", self._unknown_command_handler
+        else:
+            command, handler = "conversation", self._conversation_handler
+        await self._timed(command, handler, event)
+
+    @staticmethod
+    async def _timed(
+        command: str,
+        handler: Callable[[events.common.EventCommon], Awaitable[None]],
+        event: events.common.EventCommon,
+    ) -> None:
+        """Выполнить обработчик, замерив время; метка command ограничена известными командами."""
+        started = time.perf_counter()
+        try:
+            await handler(event)
+        except FloodWaitError as e:
+            record_flood_wait(e, "handlers")
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - started, command=command)
+
     async def _start_handler(self, event: events.NewMessage.Event) -> None:
         chat_id = event.chat_id
-        self.storage.add_user(chat_id)
-        if await self.scrapper.register_chat(chat_id):
+        await self.async_storage.add_user(chat_id)
+        self.chats.add(chat_id)
+        try:
+            registered = await self.scrapper.register_chat(chat_id)
+        except CircuitOpenError:
+            await event.reply(UNAVAILABLE_MESSAGE)
+            return
+        if registered:
             await event.reply("Добро пожаловать! Используйте /help для просмотра доступных команд.")
         else:
             await event.reply("Произошла ошибка при регистрации. Пожалуйста, попробуйте позже.")
@@ -95,10 +194,13 @@ class BotHandler:
         url = parts[1]
         try:
             self._validate_url(url)
-            self.conversations[event.chat_id] = {
-                "url": url,
-                "stage": "await_tags",
-            }
+            await self.conversations.aset(
+                event.chat_id,
+                {
+                    "url": url,
+                    "stage": "await_tags",
+                },
+            )
             await event.reply("Введите тэги (опционально):")
         except ValueError as e:
             await event.reply(f"Некорректный URL: {e}")
@@ -108,40 +210,59 @@ class BotHandler:
 
     async def _conversation_handler(self, event: events.NewMessage.Event) -> None:
         chat_id = event.chat_id
-        if chat_id not in self.conversations:
+        conv = await self.conversations.aget(chat_id)
+        if conv is None:
             return
 
-        conv = self.conversations[chat_id]
         stage = conv.get("stage")
 
         if stage == "await_tags":
             tags_text = event.message.text.strip()
             conv["tags"] = tags_text.split() if tags_text else []
             conv["stage"] = "await_filters"
+            await self.conversations.aset(chat_id, conv)
             await event.reply("Настройте фильтры (опционально):")
         elif stage == "await_filters":
             filters_text = event.message.text.strip()
-            conv["filters"] = filters_text.split() if filters_text else []
+            filters = filters_text.split() if filters_text else []
             try:
-                link_response = await self.scrapper.add_link(
-                    chat_id,
-                    conv["url"],
-                    conv.get("tags"),
-                    conv.get("filters"),
-                )
-                if link_response:
-                    await event.reply(f"Ссылка {conv['url']} добавлена для отслеживания.")
-                else:
-                    await event.reply(
-                        "Эта ссылка уже отслеживается или произошла ошибка при добавлении.",
-                    )
-            except HTTPException as e:
-                await event.reply(f"Ошибка API: {e}")
-            except Exception:
-                logger.exception("Unexpected error in conversation handler")
-                await event.reply("Произошла непредвиденная ошибка при добавлении ссылки.")
+                validate_filters(filters)
+            except ValueError as e:
+                # Диалог продолжается: пользователь может прислать исправленные фильтры.
+                await event.reply(f"{e}. Исправьте фильтры и отправьте их ещё раз:")
+                return
+            conv["filters"] = filters
+            try:
+                await self._add_link_from_conversation(event, chat_id, conv)
             finally:
-                del self.conversations[chat_id]
+                await self.conversations.adelete(chat_id)
+
+    async def _add_link_from_conversation(
+        self,
+        event: events.NewMessage.Event,
+        chat_id: int,
+        conv: ConversationState,
+    ) -> None:
+        try:
+            link_response = await self.scrapper.add_link(
+                chat_id,
+                conv["url"],
+                conv.get("tags", []),
+                conv.get("filters", []),
+            )
+            if link_response:
+                await event.reply(f"Ссылка {conv['url']} добавлена для отслеживания.")
+            else:
+                await event.reply(
+                    "Эта ссылка уже отслеживается или произошла ошибка при добавлении.",
+                )
+        except HTTPException as e:
+            await event.reply(f"Ошибка API: {e}")
+        except CircuitOpenError:
+            await event.reply(UNAVAILABLE_MESSAGE)
+        except Exception:
+            logger.exception("Unexpected error in conversation handler")
+            await event.reply("Произошла непредвиденная ошибка при добавлении ссылки.")
 
     async def _untrack_handler(self, event: events.NewMessage.Event) -> None:
         maxsplit = 2
@@ -159,35 +280,75 @@ class BotHandler:
                 await event.reply("Указанная ссылка не отслеживается.")
         except HTTPException as e:
             await event.reply(f"Ошибка API: {e}")
+        except CircuitOpenError:
+            await event.reply(UNAVAILABLE_MESSAGE)
         except Exception:
             logger.exception("Unexpected error in untrack handler")
             await event.reply("Произошла непредвиденная ошибка при удалении ссылки.")
 
     async def _list_handler(self, event: events.NewMessage.Event) -> None:
         try:
-            links = await self.scrapper.get_links(event.chat_id)
-            if not links:
-                await event.reply("Список отслеживаемых ссылок пуст.")
+            parts = event.message.text.split(maxsplit=1)
+            tag = parts[1].strip() if len(parts) > 1 else None
+            page = await self.scrapper.get_links_page(event.chat_id, tag=tag, limit=LIST_PAGE_SIZE)
+            if page is None or not page.links:
+                if tag:
+                    await event.reply(f"Нет отслеживаемых ссылок c тегом {tag}.")
+                else:
+                    await event.reply("Список отслеживаемых ссылок пуст.")
                 return
 
-            message = "Отслеживаемые ссылки:\n\n"
-            for link in links:
-                message += f"🔗 {link.url}"
-                if link.tags:
-                    message += f" - {', '.join(link.tags)}"
-                message += "\n"
-            await event.reply(message)
+            await self._send_links_page(event.reply, page, tag)
         except HTTPException as e:
             await event.reply(f"Ошибка API: {e}")
+        except CircuitOpenError:
+            await event.reply(UNAVAILABLE_MESSAGE)
         except Exception:
             logger.exception("Unexpected error in list handler")
             await event.reply("Произошла непредвиденная ошибка при получении списка ссылок.")
 
+    async def _list_page_callback(self, event: events.CallbackQuery.Event) -> None:
+        cursor, tag = parse_list_callback(event.data)
+        try:
+            page = await self.scrapper.get_links_page(
+                event.chat_id,
+                cursor=cursor,
+                tag=tag,
+                limit=LIST_PAGE_SIZE,
+            )
+            if page is None or not page.links:
+                await event.answer("Список ссылок изменился, запросите /list заново.", alert=True)
+                return
+            await event.answer()
+            await self._send_links_page(event.respond, page, tag)
+        except CircuitOpenError:
+            await event.answer(UNAVAILABLE_MESSAGE, alert=True)
+        except Exception:
+            logger.exception("Unexpected error in list callback")
+            await event.answer(
+                "Произошла непредвиденная ошибка при получении списка ссылок.",
+                alert=True,
+            )
+
+    async def _send_links_page(
+        self,
+        send: SendMessage,
+        page: ListLinksResponse,
+        tag: Optional[str],
+    ) -> None:
+        """Отправить страницу ссылок частями до 4096 символов; кнопка - в последней части."""
+        chunks = render_links(page.links, MESSAGE_LIMIT - len(PARTIAL_LIST_NOTE))
+        buttons = None
+        if page.next_cursor:
+            data = to_list_callback(page.next_cursor, tag)
+            if data is None:
+                chunks[-1] += PARTIAL_LIST_NOTE
+            else:
+                buttons = [[Button.inline("Дальше ▶", data)]]
+        for chunk in chunks[:-1]:
+            await send(chunk)
+        await send(chunks[-1], buttons=buttons)
+
     async def _unknown_command_handler(self, event: events.NewMessage.Event) -> None:
-        if event.message.text and event.message.text.startswith("/"):
-            known_commands = {"/start", "/help", "/track", "/untrack", "/list", "chat_id"}
-            command = event.message.text.split()[0]
-            if command not in known_commands:
-                await event.reply(
-                    "Неизвестная команда. Используйте /help для просмотра доступных команд.",
-                )
+        """Вызывается из _message_handler только для команд, которых нет в _commands."""
+        await event.reply("Неизвестная команда. Используйте /help для просмотра доступных команд.")
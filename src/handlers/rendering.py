@@ -0,0 +1,65 @@
+from collections.abc import Iterable
+from typing import Optional
+
+from src.scrapper.models import LinkResponse
+
+__all__ = (
+    "LIST_CALLBACK_PREFIX",
+    "MESSAGE_LIMIT",
+    "format_link",
+    "parse_list_callback",
+    "render_links",
+    "split_message",
+    "to_list_callback",
+)
+
+MESSAGE_LIMIT = 4096
+# Telegram ограничивает данные inline-кнопки 64 байтами.
+CALLBACK_DATA_LIMIT = 64
+LIST_CALLBACK_PREFIX = "list:"
+
+
+def format_link(link: LinkResponse) -> str:
+    line = f"🔗 {link.url}"
+    if link.tags:
+        line += f" - {', '.join(link.tags)}"
+    return line
+
+
+def split_message(lines: Iterable[str], limit: int = MESSAGE_LIMIT) -> list[str]:
+    """Склеить строки в сообщения не длиннее limit, не разрывая строки без необходимости."""
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+    for line in lines:
+        if len(line) > limit:
+            line = line[: limit - 1] + "…"  # noqa: PLW2901
+        extra = len(line) + 1 if current else len(line)
+        if current and size + extra > limit:
+            chunks.append("\n".join(current))
+            current = []
+            extra = len(line)
+            size = 0
+        current.append(line)
+        size += extra
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def render_links(links: Iterable[LinkResponse], limit: int = MESSAGE_LIMIT) -> list[str]:
+    return split_message(
+        ["Отслеживаемые ссылки:", "", *(format_link(link) for link in links)],
+        limit,
+    )
+
+
+def to_list_callback(cursor: str, tag: Optional[str]) -> Optional[bytes]:
+    """Данные кнопки перехода к странице cursor; None, если они не помещаются в лимит."""
+    data = f"{LIST_CALLBACK_PREFIX}{cursor}:{tag or ''}".encode()
+    return data if len(data) <= CALLBACK_DATA_LIMIT else None
+
+
+def parse_list_callback(data: bytes) -> tuple[str, Optional[str]]:
+    cursor, _, tag = data.decode().removeprefix(LIST_CALLBACK_PREFIX).partition(":")
+    return cursor, tag or None
@@ -0,0 +1,260 @@
+"""Метрики в текстовом формате Prometheus без внешних зависимостей."""
+
+import bisect
+import math
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from typing import Generic, Optional, TypeVar
+
+__all__ = (
+    "DEFAULT_BUCKETS",
+    "REGISTRY",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+)
+
+LabelValues = tuple[str, ...]
+Sample = tuple[str, LabelValues, LabelValues, float]
+T = TypeVar("T")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "Metric") -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, labelnames, labelvalues, value in metric.samples():
+                if labelnames:
+                    labels = ",".join(
+                        f'{label}="{_escape(str(label_value))}"'
+                        for label, label_value in zip(labelnames, labelvalues, strict=True)
+                    )
+                    lines.append(f"{name}{{{labels}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class _Shards(Generic[T]):
+    """Значения метрики, разбитые по потокам: каждый поток пишет только в свой шард.
+
+    Запись обходится без блокировок; чтение при экспорте суммирует копии шардов.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._shards: list[dict[LabelValues, T]] = []
+        self._lock = threading.Lock()
+
+    def local(self) -> dict[LabelValues, T]:
+        shard: Optional[dict[LabelValues, T]] = getattr(self._local, "values", None)
+        if shard is None:
+            shard = {}
+            self._local.values = shard
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def snapshot(self) -> list[dict[LabelValues, T]]:
+        with self._lock:
+            shards = list(self._shards)
+        # dict.copy атомарна под GIL, поэтому читать шард другого потока безопасно.
+        return [shard.copy() for shard in shards]
+
+
+class Metric(ABC):
+    type_name = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[MetricsRegistry] = REGISTRY,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _label_values(self, labels: Mapping[str, object]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterator[Sample]:
+        """Строки экспозиции: имя, имена и значения меток, значение."""
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[MetricsRegistry] = REGISTRY,
+    ) -> None:
+        super().__init__(name, documentation, labelnames, registry)
+        self._values: _Shards[float] = _Shards()
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = self._label_values(labels)
+        shard = self._values.local()
+        shard[key] = shard.get(key, 0.0) + amount
+
+    def _collect(self) -> dict[LabelValues, float]:
+        totals: dict[LabelValues, float] = {}
+        for shard in self._values.snapshot():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def value(self, **labels: object) -> float:
+        return self._collect().get(self._label_values(labels), 0.0)
+
+    def samples(self) -> Iterator[Sample]:
+        for key, value in self._collect().items():
+            yield f"{self.name}_total", self.labelnames, key, value
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[MetricsRegistry] = REGISTRY,
+        function: Optional[Callable[[], Mapping[LabelValues, float]]] = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames, registry)
+        self._values: dict[LabelValues, float] = {}
+        self._function = function
+
+    def set(self, value: float, **labels: object) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: object) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: object) -> float:
+        return self._collect().get(self._label_values(labels), 0.0)
+
+    def _collect(self) -> Mapping[LabelValues, float]:
+        if self._function is not None:
+            return self._function()
+        return dict(self._values)
+
+    def samples(self) -> Iterator[Sample]:
+        for key, value in self._collect().items():
+            yield self.name, self.labelnames, key, value
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[MetricsRegistry] = REGISTRY,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        # Для каждого набора меток: счётчики по бакетам (последний - +Inf), сумма и количество.
+        self._values: _Shards[tuple[list[int], list[float]]] = _Shards()
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._label_values(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        shard = self._values.local()
+        state = shard.get(key)
+        if state is None:
+            state = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+            shard[key] = state
+        state[0][index] += 1
+        state[1][0] += value
+        state[1][1] += 1
+
+    def _collect(self) -> dict[LabelValues, tuple[list[int], list[float]]]:
+        totals: dict[LabelValues, tuple[list[int], list[float]]] = {}
+        for shard in self._values.snapshot():
+            for key, (bucket_counts, (total, count)) in shard.items():
+                merged = totals.get(key)
+                if merged is None:
+                    totals[key] = (list(bucket_counts), [total, count])
+                    continue
+                for index, bucket_count in enumerate(bucket_counts):
+                    merged[0][index] += bucket_count
+                merged[1][0] += total
+                merged[1][1] += count
+        return totals
+
+    def count(self, **labels: object) -> int:
+        state = self._collect().get(self._label_values(labels))
+        return int(state[1][1]) if state else 0
+
+    def samples(self) -> Iterator[Sample]:
+        bucket_labelnames = (*self.labelnames, "le")
+        for key, (bucket_counts, (total, count)) in self._collect().items():
+            cumulative = 0
+            for bound, bucket_count in zip(
+                (*self.buckets, math.inf),
+                bucket_counts,
+                strict=True,
+            ):
+                cumulative += bucket_count
+                yield (
+                    f"{self.name}_bucket",
+                    bucket_labelnames,
+                    (*key, _format_value(bound)),
+                    cumulative,
+                )
+            yield f"{self.name}_sum", self.labelnames, key, total
+            yield f"{self.name}_count", self.labelnames, key, count
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Optional
 
 from pydantic import BaseModel, Field, HttpUrl
@@ -13,6 +14,11 @@ class LinkUpdate(BaseModel):
     url: HttpUrl
     description: Optional[str] = None
     tg_chat_ids: list[int] = Field(alias="tgChatIds")
+    # Отметки свежести: создание на платформе, обнаружение и отправка боту в scrapper.
+    platform: Optional[str] = None
+    created_at: Optional[datetime] = Field(None, alias="createdAt")
+    detected_at: Optional[datetime] = Field(None, alias="detectedAt")
+    sent_to_bot_at: Optional[datetime] = Field(None, alias="sentToBotAt")
 
 
 class ApiErrorResponse(BaseModel):
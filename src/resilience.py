@@ -0,0 +1,66 @@
+import random
+import time
+from collections.abc import Callable
+from typing import Optional
+
+__all__ = ("CircuitBreaker", "CircuitOpenError", "backoff_delay")
+
+
+class CircuitOpenError(Exception):
+    """Вызов отклонён без обращения к сервису: circuit breaker разомкнут."""
+
+
+class CircuitBreaker:
+    """Размыкается после failure_threshold ошибок подряд.
+
+    Через reset_timeout пропускает один пробный вызов (half-open): успех замыкает цепь,
+    ошибка снова размыкает её ещё на reset_timeout.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if self._trial_in_flight or self._clock() - self._opened_at < self.reset_timeout:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Вызов прерван без ответа сервиса (отмена, ошибка клиента): исход не учитывается.
+
+        Слот пробного вызова освобождается, иначе разомкнутая цепь не замкнётся никогда.
+        """
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._trial_in_flight or self._failures >= self.failure_threshold:
+            self._opened_at = self._clock()
+        self._trial_in_flight = False
+
+
+def backoff_delay(attempt: int, base: float, cap: float = 5.0) -> float:
+    """Экспоненциальная задержка c полным jitter для попытки attempt (c нуля)."""
+    return random.uniform(0, min(cap, base * 2**attempt))  # noqa: S311
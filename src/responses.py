@@ -0,0 +1,13 @@
+from typing import Any
+
+import orjson
+from starlette.responses import JSONResponse
+
+__all__ = ("ORJSONResponse",)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON-ответ, сериализуемый orjson вместо стандартного json."""
+
+    def render(self, content: Any) -> bytes:  # noqa: ANN401
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
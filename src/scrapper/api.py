@@ -1,20 +1,29 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
-from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
 
+from src.scrapper.filters import validate_filters
 from src.scrapper.models import (
     AddLinkRequest,
     ApiErrorResponse,
     LinkResponse,
     ListLinksResponse,
     RemoveLinkRequest,
+    ResourceFreshness,
 )
+from src.utils import decode_cursor
 
 if TYPE_CHECKING:
+    from src.scrapper.cache import LinksCache
+    from src.scrapper.freshness import FreshnessTracker
     from src.scrapper.storage import ScrapperStorage
 
 router = APIRouter()
 
+LINKS_PAGE_SIZE = 100
+MAX_LINKS_PAGE_SIZE = 500
+FRESHNESS_LIMIT = 20
+
 
 def raise_http_exception(description: str, code: str, status_code: int) -> None:
     raise HTTPException(
@@ -36,8 +45,7 @@ def raise_http_exception(description: str, code: str, status_code: int) -> None:
 async def register_chat(chat_id: int, request: Request) -> dict[str, str]:
     try:
         storage: ScrapperStorage = request.app.state.storage
-        storage.add_chat(chat_id)
-        if storage.get_chat(chat_id):
+        if storage.add_chat(chat_id):
             return {"status": "ok"}
         else:
             return {"status": "error"}
@@ -64,7 +72,10 @@ async def register_chat(chat_id: int, request: Request) -> dict[str, str]:
 async def remove_chat(chat_id: int, request: Request) -> dict[str, str] | None:
     try:
         storage: ScrapperStorage = request.app.state.storage
-        if storage.remove_chat(chat_id):
+        links_cache: LinksCache = request.app.state.links_cache
+        removed = storage.remove_chat(chat_id)
+        links_cache.invalidate(chat_id)
+        if removed:
             return {"status": "ok"}
         raise_http_exception("Чат не найден", "CHAT_NOT_FOUND", 404)
     except HTTPException:
@@ -94,10 +105,29 @@ async def remove_chat(chat_id: int, request: Request) -> dict[str, str] | None:
 async def get_links(
     request: Request,
     tg_chat_id: int = Header(..., alias="Tg-Chat-Id"),
-) -> ListLinksResponse:
+    limit: int = Query(default=LINKS_PAGE_SIZE, ge=1, le=MAX_LINKS_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    tag: Optional[str] = None,
+) -> Response:
     try:
-        storage: ScrapperStorage = request.app.state.storage
-        return storage.get_links(tg_chat_id)
+        after_id = 0
+        if cursor:
+            try:
+                after_id = decode_cursor(cursor)
+            except ValueError:
+                raise_http_exception("Некорректный курсор", "INVALID_CURSOR", 400)
+
+        links_cache: LinksCache = request.app.state.links_cache
+        page = f"{limit}:{cursor or ''}:{tag or ''}"
+        version = links_cache.version(tg_chat_id)
+        payload = links_cache.get(tg_chat_id, version, page)
+        if payload is None:
+            storage: ScrapperStorage = request.app.state.storage
+            links = storage.get_links(tg_chat_id, limit, after_id, tag)
+            payload = links_cache.set(tg_chat_id, version, links, page)
+        return Response(content=payload, media_type="application/json")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=400,
@@ -125,6 +155,12 @@ async def add_link(
 ) -> LinkResponse | None:
     try:
         storage: ScrapperStorage = request.app.state.storage
+        links_cache: LinksCache = request.app.state.links_cache
+
+        try:
+            validate_filters(link_request.filters)
+        except ValueError as e:
+            raise_http_exception(str(e), "INVALID_FILTER", 400)
 
         def add_link_to_storage() -> LinkResponse | None:
             link = storage.add_link(
@@ -133,6 +169,7 @@ async def add_link(
                 link_request.tags,
                 link_request.filters,
             )
+            links_cache.invalidate(tg_chat_id)
             if not link:
                 raise_http_exception("Ссылка уже отслеживается", "LINK_ALREADY_EXISTS", 400)
             return link
@@ -168,9 +205,11 @@ async def remove_link(
 ) -> LinkResponse | None:
     try:
         storage: ScrapperStorage = request.app.state.storage
+        links_cache: LinksCache = request.app.state.links_cache
 
         def remove_link_from_storage() -> LinkResponse | None:
             link = storage.remove_link(tg_chat_id, link_request.link)
+            links_cache.invalidate(tg_chat_id)
             if not link:
                 raise_http_exception("Ссылка не найдена", "LINK_NOT_FOUND", 404)
             return link
@@ -188,3 +227,28 @@ async def remove_link(
                 exceptionMessage=str(e),
             ).model_dump(),
         ) from e
+
+
+@router.get("/admin/freshness", response_model=list[ResourceFreshness])
+async def get_freshness(
+    request: Request,
+    limit: int = Query(default=FRESHNESS_LIMIT, ge=1, le=MAX_LINKS_PAGE_SIZE),
+) -> list[ResourceFreshness]:
+    """Ссылки c наибольшей задержкой от создания события до доставки в бот."""
+    freshness: FreshnessTracker = request.app.state.freshness
+    return [
+        ResourceFreshness(
+            resource_id=sample.resource_id,
+            url=sample.url,
+            platform=sample.platform,
+            update_type=sample.update_type,
+            event_id=sample.event_id,
+            created_at=sample.created_at,
+            detected_at=sample.detected_at,
+            sent_to_bot_at=sample.sent_to_bot_at,
+            delivered_at=sample.delivered_at,
+            lag_seconds=sample.lag_seconds,
+            stages=sample.stages,
+        )
+        for sample in freshness.worst(limit)
+    ]
@@ -5,11 +5,16 @@ from contextlib import asynccontextmanager
 import aiohttp
 from fastapi import FastAPI
 
+from src.api.metrics import router as metrics_router
+from src.responses import ORJSONResponse
 from src.scrapper.api import router
+from src.scrapper.cache import create_links_cache
+from src.scrapper.freshness import FreshnessTracker
 from src.scrapper.scheduler import UpdateScheduler
 from src.scrapper.storage import ScrapperStorage
 from src.scrapper.update_checker import UpdateChecker
-from src.settings import TGBotSettings
+from src.settings import CacheSettings, TGBotSettings, TracingSettings
+from src.tracing import TRACER, configure_tracing
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +24,10 @@ settings = TGBotSettings()  # type: ignore[call-arg]
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    configure_tracing(TracingSettings())
     app.state.storage = ScrapperStorage()
+    app.state.links_cache = create_links_cache(CacheSettings())
+    app.state.freshness = FreshnessTracker()
 
     async with aiohttp.ClientSession() as session:
         app.state.session = session
@@ -29,6 +37,7 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
             storage=app.state.storage,
             update_checker=app.state.update_checker,
             bot_base_url=BOT_BASE_URL,
+            freshness=app.state.freshness,
         )
         await scheduler.start(check_interval=settings.check_interval)
         app.state.scheduler = scheduler
@@ -37,6 +46,7 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
         yield
 
         await scheduler.stop()
+        TRACER.shutdown()
         logger.info("Application shutdown complete")
 
 
@@ -44,9 +54,11 @@ app = FastAPI(
     title="Scrapper API",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 app.include_router(router)
+app.include_router(metrics_router)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,173 @@
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Optional, Protocol
+
+import orjson
+
+from src.scrapper.models import LinksPage
+from src.settings import CacheSettings
+
+__all__ = (
+    "CacheBackend",
+    "InMemoryCacheBackend",
+    "KeyValueCacheBackend",
+    "LinksCache",
+    "create_links_cache",
+)
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Получить значение по ключу; None, если ключа нет или срок хранения истёк."""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Сохранить значение на ttl секунд."""
+
+    @abstractmethod
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        """Сохранить значение, только если ключа нет; True, если значение записано."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Удалить значение по ключу."""
+
+
+class InMemoryCacheBackend(CacheBackend):
+    def __init__(self, max_size: int, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_size = max_size
+        self._clock = clock
+        self._items: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= self._clock():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] > self._clock():
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def _store(self, key: str, value: bytes, ttl: float) -> None:
+        self._items[key] = (self._clock() + ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class KeyValueClient(Protocol):
+    def get(self, key: str) -> Optional[bytes]: ...
+
+    def set(self, key: str, value: bytes, px: int, nx: bool = False) -> object: ...
+
+    def delete(self, key: str) -> object: ...
+
+
+class KeyValueCacheBackend(CacheBackend):
+    """Внешнее KV-хранилище c Redis-совместимым клиентом (get/set c px/delete)."""
+
+    def __init__(self, client: KeyValueClient) -> None:
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "KeyValueCacheBackend":
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("Для LINKS_CACHE_BACKEND=redis нужен пакет redis") from e
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self.client.get(key)
+        return bytes(value) if value is not None else None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.client.set(key, value, px=max(int(ttl * 1000), 1))
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        return bool(self.client.set(key, value, px=max(int(ttl * 1000), 1), nx=True))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+
+class LinksCache:
+    """Кэш сериализованных (в формате ListLinksResponse) страниц ссылок по chat_id.
+
+    Ключи страниц включают версию чата: инвалидация заменяет версию новой, и все страницы
+    чата разом становятся недостижимыми до истечения TTL. Версию читают до запроса к БД
+    и пишут страницу только под ней: страница, прочитанная до инвалидации, попадёт
+    под старую версию и не будет отдана.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float) -> None:
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def _version_key(chat_id: int) -> str:
+        return f"links:{chat_id}:version"
+
+    @staticmethod
+    def _key(chat_id: int, version: bytes, page: str) -> str:
+        return f"links:{chat_id}:{version.decode()}:{page}"
+
+    def version(self, chat_id: int) -> bytes:
+        """Текущая версия кэша чата; если её нет, создаётся без перезаписи чужой."""
+        version_key = self._version_key(chat_id)
+        version = self.backend.get(version_key)
+        if version is None:
+            candidate = uuid.uuid4().hex.encode()
+            self.backend.add(version_key, candidate, self.ttl)
+            version = self.backend.get(version_key) or candidate
+        return version
+
+    def get(self, chat_id: int, version: bytes, page: str = "") -> Optional[bytes]:
+        return self.backend.get(self._key(chat_id, version, page))
+
+    def set(self, chat_id: int, version: bytes, links: LinksPage, page: str = "") -> bytes:
+        payload = orjson.dumps(links)
+        self.backend.set(self._key(chat_id, version, page), payload, self.ttl)
+        return payload
+
+    def invalidate(self, chat_id: int) -> None:
+        self.backend.set(self._version_key(chat_id), uuid.uuid4().hex.encode(), self.ttl)
+
+
+def create_links_cache(settings: CacheSettings) -> LinksCache:
+    backend: CacheBackend
+    if settings.backend.lower() == "redis":
+        if not settings.url:
+            raise ValueError("LINKS_CACHE_URL is required for the redis backend")
+        backend = KeyValueCacheBackend.from_url(settings.url)
+    else:
+        backend = InMemoryCacheBackend(settings.max_size)
+    return LinksCache(backend, settings.ttl_seconds)
@@ -1,21 +1,65 @@
+import contextlib
 import logging
+import time
+from collections.abc import AsyncIterator, Collection
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import Any, List, Optional
 from urllib.parse import urlparse
 
 import aiohttp
 from pydantic import HttpUrl
 from starlette.status import HTTP_200_OK
 
+from src.metrics import Gauge, Histogram
 from src.scrapper.models import UpdateDetail
+from src.tracing import TRACER
 
 logger = logging.getLogger(__name__)
 
+CLIENT_REQUEST_SECONDS = Histogram(
+    "scrapper_client_request_seconds",
+    "Platform API request latency by host and response status",
+    ["host", "status"],
+)
+RATE_LIMIT_REMAINING = Gauge(
+    "scrapper_client_rate_limit_remaining",
+    "Requests left in the current platform API rate-limit window",
+    ["host"],
+)
+
 
 class BaseClient:
+    HOST = ""
+
     def __init__(self, session: aiohttp.ClientSession) -> None:
         self.session = session
 
+    @contextlib.asynccontextmanager
+    async def _get(self, url: str, params: dict[str, Any]) -> AsyncIterator[aiohttp.ClientResponse]:
+        """GET c замером задержки по хосту и статусу ответа."""
+        started = time.perf_counter()
+        status = "error"
+        try:
+            with TRACER.span("client.get", host=self.HOST, url=url) as span:
+                async with self.session.get(url, params=params) as response:
+                    status = str(response.status)
+                    span.set_attribute("status", status)
+                    remaining = response.headers.get("X-RateLimit-Remaining")
+                    if remaining is not None:
+                        RATE_LIMIT_REMAINING.set(float(remaining), host=self.HOST)
+                    yield response
+        finally:
+            CLIENT_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                host=self.HOST,
+                status=status,
+            )
+
+    @staticmethod
+    def _wants(update_types: Optional[Collection[str]], update_type: str) -> bool:
+        """None означает, что нужны обновления всех типов."""
+        return update_types is None or update_type in update_types
+
     @staticmethod
     def _parse_github_url(url: str) -> tuple[Optional[str], Optional[str]]:
         parse_parts_count = 2
@@ -36,7 +80,8 @@ class BaseClient:
 
 
 class GitHubClient(BaseClient):
-    BASE_URL = "https://api.github.com"
+    HOST = "api.github.com"
+    BASE_URL = f"https://{HOST}"
 
     async def make_api_request(
         self,
@@ -51,14 +96,15 @@ class GitHubClient(BaseClient):
             "direction": "asc",
             "since": last_check.isoformat(),  # type: ignore[union-attr]
         }
-        async with self.session.get(url, params=params) as response:
+        async with self._get(url, params) as response:
             if response.status == HTTP_200_OK:
                 events = await response.json()
                 for event in events:
                     if is_issue and "pull_request" in event:
                         continue
                     created_at = datetime.fromisoformat(event["created_at"].replace("Z", "+00:00"))
-                    if created_at > last_check:  # type: ignore[operator]
+                    # Включительно: события c тем же временем отсекает водяной знак по id.
+                    if created_at >= last_check:  # type: ignore[operator]
                         new_updates.append(
                             UpdateDetail(
                                 platform="GitHub",
@@ -67,6 +113,7 @@ class GitHubClient(BaseClient):
                                 username=event.get("user", {}).get("login", "Unknown"),
                                 created_at=created_at,
                                 preview=(event.get("body") or "")[:200],
+                                event_id=f"{'issue' if is_issue else 'pr'}:{event['id']}",
                             ),
                         )
 
@@ -74,6 +121,7 @@ class GitHubClient(BaseClient):
         self,
         url: HttpUrl,
         last_check: Optional[datetime],
+        update_types: Optional[Collection[str]] = None,
     ) -> List[UpdateDetail]:
         owner, repo = self._parse_github_url(str(url))
         if not owner or not repo:
@@ -83,19 +131,27 @@ class GitHubClient(BaseClient):
         if last_check is None:
             return new_updates
 
-        pr_api_url = f"{self.BASE_URL}/repos/{owner}/{repo}/pulls"
+        if self._wants(update_types, "PR"):
+            pr_api_url = f"{self.BASE_URL}/repos/{owner}/{repo}/pulls"
 
-        await self.make_api_request(pr_api_url, last_check, new_updates, False)
+            await self.make_api_request(pr_api_url, last_check, new_updates, False)
 
-        issues_api_url = f"{self.BASE_URL}/repos/{owner}/{repo}/issues"
+        if self._wants(update_types, "Issue"):
+            issues_api_url = f"{self.BASE_URL}/repos/{owner}/{repo}/issues"
 
-        await self.make_api_request(issues_api_url, last_check, new_updates, True)
+            await self.make_api_request(issues_api_url, last_check, new_updates, True)
 
         return new_updates
 
 
 class StackOverflowClient(BaseClient):
-    BASE_URL = "https://api.stackexchange.com/2.3"
+    HOST = "api.stackexchange.com"
+    BASE_URL = f"https://{HOST}/2.3"
+
+    def _record_quota(self, data: dict[str, Any]) -> None:
+        # StackExchange сообщает остаток квоты в теле ответа, заголовков для этого нет.
+        if "quota_remaining" in data:
+            RATE_LIMIT_REMAINING.set(float(data["quota_remaining"]), host=self.HOST)
 
     async def make_api_request(
         self,
@@ -111,14 +167,16 @@ class StackOverflowClient(BaseClient):
             "order": "asc",
             "filter": "withbody",
         }
-        async with self.session.get(url, params=params) as response:
+        async with self._get(url, params) as response:
             if response.status == HTTP_200_OK:
                 data = await response.json()
+                self._record_quota(data)
                 for event in data.get("items", []):
                     creation_date = event.get("creation_date")
                     if creation_date:
                         created_at = datetime.fromtimestamp(creation_date, tz=timezone.utc)
-                        if created_at > last_check:  # type: ignore[operator]
+                        if created_at >= last_check:  # type: ignore[operator]
+                            kind = "answer" if is_answer else "comment"
                             new_updates.append(
                                 UpdateDetail(
                                     platform="StackOverflow",
@@ -127,6 +185,7 @@ class StackOverflowClient(BaseClient):
                                     username=event.get("owner", {}).get("display_name", "Unknown"),
                                     created_at=created_at,
                                     preview=(event.get("body") or "")[:200],
+                                    event_id=f"{kind}:{event.get(f'{kind}_id')}",
                                 ),
                             )
 
@@ -134,6 +193,7 @@ class StackOverflowClient(BaseClient):
         self,
         url: HttpUrl,
         last_check: Optional[datetime],
+        update_types: Optional[Collection[str]] = None,
     ) -> List[UpdateDetail]:
         question_id = self._parse_stackoverflow_url(str(url))
         if not question_id:
@@ -143,32 +203,46 @@ class StackOverflowClient(BaseClient):
         if last_check is None:
             return new_updates
 
+        wants_answers = self._wants(update_types, "Answer")
+        wants_comments = self._wants(update_types, "Comment")
+        if not wants_answers and not wants_comments:
+            return new_updates
+
         question_api_url = f"{self.BASE_URL}/questions/{question_id}"
         params = {
             "site": "stackoverflow",
             "filter": "!)rTkraRkW6wZ.J)YB)3)",  # Фильтр для получения title
         }
-        async with self.session.get(question_api_url, params=params) as response:
+        async with self._get(question_api_url, params) as response:
             if response.status != HTTP_200_OK:
                 return new_updates
             data = await response.json()
+            self._record_quota(data)
             items = data.get("items", [])
             if not items:
                 return new_updates
             question_title = items[0].get("title", "No Title")
 
-        answers_api_url = f"{self.BASE_URL}/questions/{question_id}/answers"
-
-        await self.make_api_request(answers_api_url, last_check, new_updates, question_title, True)
-
-        comments_api_url = f"{self.BASE_URL}/questions/{question_id}/comments"
-
-        await self.make_api_request(
-            comments_api_url,
-            last_check,
-            new_updates,
-            question_title,
-            False,
-        )
+        if wants_answers:
+            answers_api_url = f"{self.BASE_URL}/questions/{question_id}/answers"
+
+            await self.make_api_request(
+                answers_api_url,
+                last_check,
+                new_updates,
+                question_title,
+                True,
+            )
+
+        if wants_comments:
+            comments_api_url = f"{self.BASE_URL}/questions/{question_id}/comments"
+
+            await self.make_api_request(
+                comments_api_url,
+                last_check,
+                new_updates,
+                question_title,
+                False,
+            )
 
         return new_updates
@@ -0,0 +1,187 @@
+"""Язык фильтров обновлений, которые пользователь задаёт при /track.
+
+Выражения: key=value (равно), key!=value (не равно), key~regex (поиск по регулярному
+выражению не длиннее MAX_PATTERN_LENGTH символов и без вложенных повторов); сравнение без
+учёта регистра. Ключи: user, type, platform, title, preview. Условия c одним ключом
+объединяются через ИЛИ (type=PR type=Issue), отрицания и разные ключи - через И.
+Некорректные выражения отклоняются при /track, a уже сохранённые - игнорируются.
+"""
+
+import functools
+import logging
+import re
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from re import _parser as sre_parse  # type: ignore[attr-defined]
+from typing import Any, Optional
+
+from src.scrapper.models import UPDATE_TYPES, UpdateDetail
+
+__all__ = (
+    "FIELDS",
+    "MAX_PATTERN_LENGTH",
+    "CompiledFilter",
+    "compile_filters",
+    "link_update_types",
+    "parse_filter",
+    "validate_filters",
+    "wanted_update_types",
+)
+
+logger = logging.getLogger(__name__)
+
+FIELDS = {
+    "user": "username",
+    "type": "update_type",
+    "platform": "platform",
+    "title": "title",
+    "preview": "preview",
+}
+
+MAX_PATTERN_LENGTH = 64
+
+# Регулярные выражения пользователей выполняются в цикле событий планировщика. Повтор внутри
+# неограниченного повтора, как в (a+)+ или (\w*)*, даёт экспоненциальный перебор на
+# несовпадающей строке, поэтому такие выражения отклоняются. Это не защищает от любого
+# медленного выражения (например, (a|aa)+), но отсекает классический случай.
+_REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, sre_parse.POSSESSIVE_REPEAT)
+
+# Узел дерева разбора re: код операции и её аргументы.
+_Node = tuple[object, Any]
+
+FILTER_PATTERN = re.compile(r"^(?P<key>[a-z]+)(?P<op>!=|=|~)(?P<value>.+)$", re.IGNORECASE)
+
+Condition = Callable[[str], bool]
+
+
+@dataclass(frozen=True, slots=True)
+class FilterExpression:
+    field: str
+    negated: bool
+    condition: Condition
+
+
+def _subpatterns(node: _Node) -> list[Iterable[_Node]]:
+    """Вложенные части узла дерева разбора регулярного выражения."""
+    op, av = node
+    if op is sre_parse.BRANCH:
+        return list(av[1])
+    if op is sre_parse.SUBPATTERN:
+        return [av[3]]
+    if op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+        return [av[1]]
+    if op is sre_parse.ATOMIC_GROUP:
+        return [av]
+    if op is sre_parse.GROUPREF_EXISTS:
+        return [branch for branch in av[1:] if branch is not None]
+    return []
+
+
+def _has_nested_repeat(pattern: Iterable[_Node], in_unbounded_repeat: bool = False) -> bool:
+    for node in pattern:
+        op, av = node
+        if op in _REPEATS:
+            _, high, item = av
+            if in_unbounded_repeat and high > 1:
+                return True
+            if _has_nested_repeat(item, in_unbounded_repeat or high == sre_parse.MAXREPEAT):
+                return True
+        elif any(_has_nested_repeat(sub, in_unbounded_repeat) for sub in _subpatterns(node)):
+            return True
+    return False
+
+
+def _compile_condition(op: str, value: str) -> Condition:
+    if op == "~":
+        if len(value) > MAX_PATTERN_LENGTH:
+            raise ValueError(f"Регулярное выражение длиннее {MAX_PATTERN_LENGTH} символов")
+        if _has_nested_repeat(sre_parse.parse(value, re.IGNORECASE)):
+            raise ValueError(f"Вложенные повторы в регулярном выражении: {value}")
+        pattern = re.compile(value, re.IGNORECASE)
+        return lambda actual: pattern.search(actual) is not None
+    expected = value.casefold()
+    return lambda actual: actual.casefold() == expected
+
+
+def parse_filter(raw: str) -> FilterExpression:
+    """Разобрать одно выражение; ValueError, если оно некорректно."""
+    match = FILTER_PATTERN.match(raw.strip())
+    if match is None:
+        raise ValueError(f"Некорректный фильтр: {raw}")
+    field = FIELDS.get(match["key"].lower())
+    if field is None:
+        raise ValueError(f"Неизвестное поле фильтра: {match['key']}")
+    op = match["op"]
+    try:
+        condition = _compile_condition(op, match["value"])
+    except re.error as e:
+        raise ValueError(f"Некорректное регулярное выражение: {match['value']}") from e
+    return FilterExpression(field, op == "!=", condition)
+
+
+def validate_filters(filters: Iterable[str]) -> None:
+    """Проверить фильтры, введённые при /track; ValueError c описанием первой ошибки."""
+    for raw in filters:
+        parse_filter(raw)
+
+
+def _parse_or_none(raw: str) -> Optional[FilterExpression]:
+    try:
+        return parse_filter(raw)
+    except ValueError:
+        logger.warning("Ignoring invalid filter %r", raw)
+        return None
+
+
+class CompiledFilter:
+    def __init__(self, expressions: Iterable[FilterExpression]) -> None:
+        self.required: dict[str, list[Condition]] = {}
+        self.excluded: list[tuple[str, Condition]] = []
+        for expression in expressions:
+            if expression.negated:
+                self.excluded.append((expression.field, expression.condition))
+            else:
+                self.required.setdefault(expression.field, []).append(expression.condition)
+
+    def matches(self, update: UpdateDetail) -> bool:
+        for field, conditions in self.required.items():
+            value = str(getattr(update, field))
+            if not any(condition(value) for condition in conditions):
+                return False
+        return not any(condition(str(getattr(update, field))) for field, condition in self.excluded)
+
+    def accepts_type(self, update_type: str) -> bool:
+        """Может ли фильтр пропустить обновление такого типа (учитываются только условия type)."""
+        field = FIELDS["type"]
+        conditions = self.required.get(field)
+        if conditions and not any(condition(update_type) for condition in conditions):
+            return False
+        return not any(
+            condition(update_type) for excluded, condition in self.excluded if excluded == field
+        )
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_filters(filters: tuple[str, ...]) -> CompiledFilter:
+    """Скомпилировать набор фильтров; результат кэшируется по самому набору."""
+    parsed = (_parse_or_none(raw) for raw in filters)
+    return CompiledFilter(expression for expression in parsed if expression is not None)
+
+
+def wanted_update_types(
+    filter_sets: Iterable[tuple[str, ...]],
+    known_types: Iterable[str],
+) -> frozenset[str]:
+    """Объединение типов обновлений, которые нужны хотя бы одному набору фильтров."""
+    compiled = [compile_filters(filters) for filters in filter_sets]
+    return frozenset(
+        update_type
+        for update_type in known_types
+        if any(check.accepts_type(update_type) for check in compiled)
+    )
+
+
+def link_update_types(filters: Iterable[str]) -> list[str]:
+    """Типы обновлений, которые пропускают фильтры одной ссылки; хранятся вместе c ней."""
+    wanted = wanted_update_types([tuple(sorted(set(filters)))], UPDATE_TYPES)
+    return [update_type for update_type in UPDATE_TYPES if update_type in wanted]
@@ -0,0 +1,79 @@
+import heapq
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+from src.metrics import Histogram
+
+__all__ = ("UPDATE_LAG_SECONDS", "FreshnessSample", "FreshnessTracker")
+
+FRESHNESS_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0, 7200.0)
+
+UPDATE_LAG_SECONDS = Histogram(
+    "scrapper_update_lag_seconds",
+    "Update lag by pipeline stage: detection (created -> detected), dispatch "
+    "(detected -> sent to bot), delivery (sent -> acknowledged by bot), total",
+    ["platform", "stage"],
+    buckets=FRESHNESS_BUCKETS,
+)
+
+
+@dataclass(slots=True)
+class FreshnessSample:
+    """Моменты прохождения одного события через конвейер доставки.
+
+    created_at берётся из платформы, остальные отметки ставит scrapper; бот отвечает на
+    /updates после отправки сообщений в Telegram, поэтому delivered_at включает и её.
+    """
+
+    resource_id: int
+    url: str
+    platform: str
+    update_type: str
+    event_id: str
+    created_at: datetime
+    detected_at: datetime
+    sent_to_bot_at: datetime
+    delivered_at: datetime
+
+    @property
+    def stages(self) -> dict[str, float]:
+        """Задержка каждого этапа и общая, в секундах."""
+        return {
+            "detection": (self.detected_at - self.created_at).total_seconds(),
+            "dispatch": (self.sent_to_bot_at - self.detected_at).total_seconds(),
+            "delivery": (self.delivered_at - self.sent_to_bot_at).total_seconds(),
+            "total": (self.delivered_at - self.created_at).total_seconds(),
+        }
+
+    @property
+    def lag_seconds(self) -> float:
+        return (self.delivered_at - self.created_at).total_seconds()
+
+
+class FreshnessTracker:
+    """Гистограммы задержек по платформам и последний замер по каждой ссылке.
+
+    Хранится не больше max_size ссылок: вытесняются те, по которым дольше всего
+    не было обновлений.
+    """
+
+    def __init__(self, max_size: int = 10000) -> None:
+        self.max_size = max_size
+        self._latest: OrderedDict[int, FreshnessSample] = OrderedDict()
+
+    def record(self, sample: FreshnessSample) -> None:
+        for stage, seconds in sample.stages.items():
+            # Часы платформы могут спешить: отрицательная задержка считается нулевой.
+            UPDATE_LAG_SECONDS.observe(max(seconds, 0.0), platform=sample.platform, stage=stage)
+        self._latest[sample.resource_id] = sample
+        self._latest.move_to_end(sample.resource_id)
+        while len(self._latest) > self.max_size:
+            self._latest.popitem(last=False)
+
+    def worst(self, limit: int) -> list[FreshnessSample]:
+        """Ссылки c наибольшей общей задержкой последнего доставленного события."""
+        return heapq.nlargest(limit, self._latest.values(), key=lambda s: s.lag_seconds)
+
+    def __len__(self) -> int:
+        return len(self._latest)
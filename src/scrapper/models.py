@@ -1,4 +1,5 @@
-from datetime import datetime
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
 from typing import Optional
 
 from pydantic import BaseModel, Field, HttpUrl
@@ -32,11 +33,61 @@ class RemoveLinkRequest(BaseModel):
 class ListLinksResponse(BaseModel):
     links: list[LinkResponse]
     size: int
+    next_cursor: Optional[str] = None
 
 
-class ChatInfo(BaseModel):
+@dataclass(slots=True)
+class LinkRecord:
+    """Ссылка из хранилища: данные проверены при вставке, поэтому без валидации pydantic."""
+
+    id: int
+    url: str
+    tags: list[str] = field(default_factory=list)
+    filters: list[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class LinksPage:
+    """Страница ссылок из хранилища; сериализуется orjson в формат ListLinksResponse."""
+
+    links: list[LinkRecord]
+    size: int
+    next_cursor: Optional[str] = None
+
+
+class ResourceFreshness(BaseModel):
+    """Последнее доставленное по ссылке событие и задержки этапов доставки."""
+
+    resource_id: int
+    url: str
+    platform: str
+    update_type: str
+    event_id: str
+    created_at: datetime
+    detected_at: datetime
+    sent_to_bot_at: datetime
+    delivered_at: datetime
+    lag_seconds: float
+    stages: dict[str, float]
+
+
+@dataclass(slots=True)
+class ChatInfo:
+    """Чат и ссылки чата из хранилища в том же виде, что возвращает get_links."""
+
     chat_id: int
-    links: list[LinkResponse] = Field(default_factory=list)
+    links: list[LinkRecord] = field(default_factory=list)
+
+
+# Типы обновлений, которые умеют получать клиенты платформ.
+UPDATE_TYPES = ("PR", "Issue", "Answer", "Comment")
+
+
+# Размер кольца недавно отправленных событий, хранимого вместе c ресурсом.
+SEEN_EVENTS_LIMIT = 256
+# Насколько раньше водяного знака запрашиваются события: защита от расхождения часов
+# и событий, которые платформа показывает c задержкой.
+WATERMARK_LOOKBACK = timedelta(minutes=5)
 
 
 class UpdateDetail(BaseModel):
@@ -46,3 +97,43 @@ class UpdateDetail(BaseModel):
     username: str
     created_at: datetime
     preview: str
+    # Идентификатор события на платформе, уникальный в пределах одного адреса.
+    event_id: str
+
+
+class Watermark(BaseModel):
+    """Позиция проверки адреса: (время, id) последнего события и кольцо уже отправленных id.
+
+    Событие новое, если id события нет в кольце и время не раньше окна WATERMARK_LOOKBACK
+    перед водяным знаком, поэтому события c одинаковым временем не теряются и не дублируются.
+    """
+
+    checked_at: datetime
+    event_id: Optional[str] = None
+    seen_ids: list[str] = Field(default_factory=list)
+
+    @property
+    def since(self) -> datetime:
+        return self.checked_at - WATERMARK_LOOKBACK
+
+    def is_new(self, update: UpdateDetail) -> bool:
+        return update.created_at >= self.since and update.event_id not in self.seen_ids
+
+    def advance(self, update: UpdateDetail) -> "Watermark":
+        """Водяной знак после успешной отправки update."""
+        seen_ids = [*self.seen_ids, update.event_id][-SEEN_EVENTS_LIMIT:]
+        if (update.created_at, update.event_id) > (self.checked_at, self.event_id or ""):
+            return Watermark(
+                checked_at=update.created_at,
+                event_id=update.event_id,
+                seen_ids=seen_ids,
+            )
+        return self.model_copy(update={"seen_ids": seen_ids})
+
+
+class ResourceInfo(BaseModel):
+    id: int
+    url: HttpUrl
+    platform: Optional[str] = None
+    subscribers_count: int = 0
+    watermark: Optional[Watermark] = None
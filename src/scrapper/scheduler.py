@@ -2,20 +2,69 @@ import asyncio
 import contextlib
 import datetime
 import logging
-from typing import Dict
-
-from pydantic import HttpUrl
+import time
+from collections.abc import Collection, Iterator
+from typing import NamedTuple, Optional
 
+from src.metrics import Counter, Gauge, Histogram
 from src.models import LinkUpdate
-from src.scrapper.sender import NotificationSender
+from src.scrapper.filters import compile_filters
+from src.scrapper.freshness import FreshnessSample, FreshnessTracker
+from src.scrapper.models import UPDATE_TYPES, ResourceInfo, UpdateDetail, Watermark
+from src.scrapper.sender import DeliveryResult, NotificationSender
 from src.scrapper.storage import ScrapperStorage
 from src.scrapper.update_checker import UpdateChecker
 from src.settings import TGBotSettings
+from src.tracing import TRACER
 
 settings = TGBotSettings()  # type: ignore[call-arg]
 
+RESOURCES_PAGE_SIZE = 500
+# Сколько циклов подряд пытаться доставить событие, прежде чем отказаться от него.
+MAX_DELIVERY_ATTEMPTS = 5
+
 logger = logging.getLogger(__name__)
 
+CYCLE_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+CYCLE_SECONDS = Histogram(
+    "scrapper_cycle_seconds",
+    "Duration of a full pass over all tracked resources",
+    buckets=CYCLE_BUCKETS,
+)
+CYCLE_LAG_SECONDS = Histogram(
+    "scrapper_cycle_lag_seconds",
+    "Delay of a cycle start past its nominal time (previous start + interval)",
+    buckets=CYCLE_BUCKETS,
+)
+LINKS_CHECKED = Counter(
+    "scrapper_links_checked",
+    "Resources checked by the scheduler by result (ok, failed, skipped)",
+    ["platform", "result"],
+)
+UPDATES_EMITTED = Counter(
+    "scrapper_updates_emitted",
+    "Updates delivered to the bot",
+    ["platform", "update_type"],
+)
+PENDING_UPDATES = Gauge(
+    "scrapper_pending_updates",
+    "Updates waiting for redelivery to the bot in the next cycle",
+)
+UPDATES_DEAD_LETTERED = Counter(
+    "scrapper_updates_dead_lettered",
+    "Updates dropped without delivery by reason (rejected, attempts_exhausted)",
+    ["platform", "reason"],
+)
+
+
+class PendingUpdate(NamedTuple):
+    """Недоставленное событие: при повторе сохраняются id и время первого обнаружения."""
+
+    update_id: int
+    detected_at: datetime.datetime
+    attempts: int = 0
+
 
 class UpdateScheduler:
     def __init__(
@@ -23,15 +72,19 @@ class UpdateScheduler:
         storage: ScrapperStorage,
         update_checker: UpdateChecker,
         bot_base_url: str = "http://localhost:7777",
+        freshness: Optional[FreshnessTracker] = None,
+        max_delivery_attempts: int = MAX_DELIVERY_ATTEMPTS,
     ) -> None:
         self.storage = storage  # type: ignore
         self.update_checker = update_checker
         self.bot_base_url = bot_base_url.rstrip("/")
-        self._last_check: Dict[str, datetime.datetime] = {}
         self._running = False
         self._task: asyncio.Task | None = None  # type: ignore[type-arg]
-        self._next_update_id = 1
+        self._update_ids: Iterator[int] = iter(())
+        self._pending_updates: dict[tuple[int, str], PendingUpdate] = {}
         self._sender = NotificationSender(bot_base_url)
+        self.freshness = freshness if freshness is not None else FreshnessTracker()
+        self.max_delivery_attempts = max_delivery_attempts
 
     async def start(self, check_interval: int = settings.check_interval) -> None:
         """Запускает планировщик c указанным интервалом проверки в секундах."""
@@ -55,44 +108,166 @@ class UpdateScheduler:
 
     async def _check_loop(self, interval: int) -> None:
         """Основной цикл проверки обновлений."""
+        previous_start: Optional[float] = None
         while self._running:
+            started = time.monotonic()
+            if previous_start is not None:
+                CYCLE_LAG_SECONDS.observe(max(started - previous_start - interval, 0.0))
+            previous_start = started
             try:
-                logger.info("updating..........")
-                await self._check_all_links()
+                with TRACER.span("scheduler.cycle", new_trace=True):
+                    await self._check_all_links()
             except Exception:
                 logger.exception("Error checking updates")
+            CYCLE_SECONDS.observe(time.monotonic() - started)
 
             await asyncio.sleep(interval)
 
     async def _check_all_links(self) -> None:
-        for url_str, chat_ids in self.storage.get_all_unique_links_chat_ids():
-            try:
-                last_check = self._last_check.get(url_str)
-                new_updates = await self.update_checker.get_new_updates(
-                    HttpUrl(url_str),
-                    last_check,
-                )
-                if new_updates:
-                    for upd in new_updates:
-                        message = (
-                            f"Платформа: {upd.platform}\n"
-                            f"Тип: {upd.update_type}\n"
-                            f"Заголовок: {upd.title}\n"
-                            f"Пользователь: {upd.username}\n"
-                            f"Время создания: {upd.created_at.isoformat()}\n"
-                            f"Превью: {upd.preview}"
-                        )
-                        update_obj = LinkUpdate(
-                            id=self._next_update_id,  # type: ignore
-                            url=HttpUrl(url_str),
-                            tgChatIds=list(chat_ids),
-                            description=message,
-                        )
-                        self._next_update_id += 1
-                        await self._sender.send_update_notification(update_obj)
-                    latest_time = max(upd.created_at for upd in new_updates)
-                    self._last_check[url_str] = latest_time
-                else:
-                    self._last_check[url_str] = datetime.datetime.now(datetime.UTC)
-            except Exception:  # noqa: PERF203
-                logger.exception("Ошибка проверки URL %s", url_str)
+        after_id = 0
+        while resources := self.storage.get_resources(after_id, RESOURCES_PAGE_SIZE):
+            # Сводка по типам ведётся в БД при изменении подписок: ссылки здесь не читаются.
+            wanted = self.storage.get_resource_update_types([r.id for r in resources])
+            for resource in resources:
+                await self._check_resource(resource, wanted.get(resource.id, frozenset()))
+            after_id = resources[-1].id
+
+    @staticmethod
+    def _match_subscribers(
+        subscribers: dict[tuple[str, ...], set[int]],
+        update: UpdateDetail,
+    ) -> list[int]:
+        """Чаты, чьи фильтры пропускают обновление; каждый набор фильтров проверяется один раз."""
+        chat_ids: list[int] = []
+        for filters, group in subscribers.items():
+            if not filters or compile_filters(filters).matches(update):
+                chat_ids.extend(group)
+        return sorted(chat_ids)
+
+    async def _check_resource(
+        self,
+        resource: ResourceInfo,
+        update_types: Collection[str] = UPDATE_TYPES,
+    ) -> None:
+        """Проверить ссылку, запрашивая только нужные подписчикам типы обновлений."""
+        platform = resource.platform or "unknown"
+        if resource.watermark is not None and not update_types:
+            # Фильтры всех подписчиков отсекают любые типы: к платформе не обращаемся.
+            LINKS_CHECKED.inc(platform=platform, result="skipped")
+            return
+        try:
+            # Каждая ссылка - отдельная трасса: сэмплирование решается для неё независимо.
+            with TRACER.span(
+                "scheduler.check_resource",
+                new_trace=True,
+                resource_id=resource.id,
+                platform=platform,
+            ):
+                await self._poll_resource(resource, update_types)
+        except Exception:
+            LINKS_CHECKED.inc(platform=platform, result="failed")
+            logger.exception("Ошибка проверки URL %s", resource.url)
+        else:
+            LINKS_CHECKED.inc(platform=platform, result="ok")
+
+    async def _poll_resource(self, resource: ResourceInfo, update_types: Collection[str]) -> None:
+        watermark = resource.watermark
+        if watermark is None:
+            # Первая проверка: отсчёт идёт c текущего момента, старые события не рассылаются.
+            now = datetime.datetime.now(datetime.UTC)
+            self.storage.save_watermark(resource.id, Watermark(checked_at=now))
+            return
+        updates = await self.update_checker.get_new_updates(
+            resource.url,
+            watermark.since,
+            update_types,
+        )
+        detected_at = datetime.datetime.now(datetime.UTC)
+        new_updates = [upd for upd in updates if watermark.is_new(upd)]
+        if not new_updates:
+            return
+        subscribers = self.storage.get_resource_subscribers(resource.id)
+        for upd in sorted(new_updates, key=lambda upd: (upd.created_at, upd.event_id)):
+            chat_ids = self._match_subscribers(subscribers, upd)
+            if chat_ids and not await self._send_update(resource, upd, chat_ids, detected_at):
+                # Временная ошибка: водяной знак не двигаем, событие уйдёт в следующем цикле.
+                break
+            watermark = watermark.advance(upd)
+        self.storage.save_watermark(resource.id, watermark)
+
+    def _next_update_id(self) -> int:
+        """Следующий id из блока, выданного последовательностью в БД: id не повторяются."""
+        update_id = next(self._update_ids, None)
+        if update_id is None:
+            self._update_ids = iter(self.storage.reserve_update_ids())
+            update_id = next(self._update_ids)
+        return update_id
+
+    async def _send_update(
+        self,
+        resource: ResourceInfo,
+        upd: UpdateDetail,
+        chat_ids: list[int],
+        detected_at: datetime.datetime,
+    ) -> bool:
+        """Отправить событие; False, если событие нужно повторить и водяной знак двигать нельзя."""
+        message = (
+            f"Платформа: {upd.platform}\n"
+            f"Тип: {upd.update_type}\n"
+            f"Заголовок: {upd.title}\n"
+            f"Пользователь: {upd.username}\n"
+            f"Время создания: {upd.created_at.isoformat()}\n"
+            f"Превью: {upd.preview}"
+        )
+        # Неотправленное событие уходит в следующем цикле c тем же id: бот пропустит чаты,
+        # в которые сообщение уже доставлено.
+        key = (resource.id, upd.event_id)
+        pending = self._pending_updates.pop(key, None) or PendingUpdate(
+            self._next_update_id(),
+            detected_at,
+        )
+        sent_to_bot_at = datetime.datetime.now(datetime.UTC)
+        update_obj = LinkUpdate(
+            id=pending.update_id,  # type: ignore
+            url=resource.url,
+            tgChatIds=chat_ids,
+            description=message,
+            platform=upd.platform,
+            createdAt=upd.created_at,
+            detectedAt=pending.detected_at,
+            sentToBotAt=sent_to_bot_at,
+        )
+        result = await self._sender.send_update_notification(update_obj)
+        attempts = pending.attempts + 1
+        if result is DeliveryResult.RETRY and attempts < self.max_delivery_attempts:
+            self._pending_updates[key] = pending._replace(attempts=attempts)
+        elif result is DeliveryResult.DELIVERED:
+            UPDATES_EMITTED.inc(platform=upd.platform, update_type=upd.update_type)
+            self.freshness.record(
+                FreshnessSample(
+                    resource_id=resource.id,
+                    url=str(resource.url),
+                    platform=upd.platform,
+                    update_type=upd.update_type,
+                    event_id=upd.event_id,
+                    created_at=upd.created_at,
+                    detected_at=pending.detected_at,
+                    sent_to_bot_at=sent_to_bot_at,
+                    delivered_at=datetime.datetime.now(datetime.UTC),
+                ),
+            )
+        else:
+            # Отказ бота или исчерпанные попытки: событие пропускается, чтобы не блокировать
+            # следующие события этой ссылки.
+            reason = "rejected" if result is DeliveryResult.REJECTED else "attempts_exhausted"
+            UPDATES_DEAD_LETTERED.inc(platform=upd.platform, reason=reason)
+            logger.error(
+                "Dropping update %s for %s (%s) after %d attempts: %s",
+                upd.event_id,
+                resource.url,
+                reason,
+                attempts,
+                update_obj.model_dump_json(by_alias=True),
+            )
+        PENDING_UPDATES.set(len(self._pending_updates))
+        return key not in self._pending_updates
@@ -1,39 +1,94 @@
+import asyncio
 import logging
+import time
+from enum import Enum
+from typing import Optional
 
 import aiohttp
-from fastapi.encoders import jsonable_encoder
-from starlette.status import HTTP_200_OK
+import orjson
+from starlette.status import HTTP_200_OK, HTTP_500_INTERNAL_SERVER_ERROR
 
+from src.metrics import Histogram
 from src.models import LinkUpdate
+from src.resilience import backoff_delay
+from src.tracing import TRACER, inject
 
 logger = logging.getLogger(__name__)
 
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+SENDER_REQUEST_SECONDS = Histogram(
+    "scrapper_sender_request_seconds",
+    "Latency of a single delivery attempt to the bot by response status",
+    ["status"],
+)
+
+
+class DeliveryResult(Enum):
+    DELIVERED = "delivered"
+    # Сетевая ошибка или 5xx: обновление стоит отправить ещё раз в следующем цикле.
+    RETRY = "retry"
+    # 4xx: бот не примет это обновление и при повторе.
+    REJECTED = "rejected"
+
 
 class NotificationSender:
 
-    def __init__(self, bot_base_url: str) -> None:
+    def __init__(self, bot_base_url: str, retries: int = 3, retry_backoff: float = 0.5) -> None:
         self.bot_base_url = bot_base_url
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+
+    async def send_update_notification(self, update: LinkUpdate) -> DeliveryResult:
+        """Отправляет уведомление o6 обновлении через API бота.
+
+        При сетевых ошибках и 5xx запрос повторяется: бот не рассылает повторно обновление
+        c уже обработанным id. Ответ 4xx не повторяется и означает отказ от обновления.
+        """
+        payload = update.model_dump_json(by_alias=True)
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(backoff_delay(attempt - 1, self.retry_backoff))
+            status = await self._post(payload)
+            if status == HTTP_200_OK:
+                logger.info(
+                    "Successfully sent update notification for URL %s to %d chats",
+                    update.url,
+                    len(update.tg_chat_ids),
+                )
+                return DeliveryResult.DELIVERED
+            if status is not None and status < HTTP_500_INTERNAL_SERVER_ERROR:
+                return DeliveryResult.REJECTED
+        return DeliveryResult.RETRY
+
+    async def _post(self, payload: str) -> Optional[int]:
+        """Статус ответа бота; None, если запрос не удался."""
+        started = time.perf_counter()
+        with TRACER.span("sender.post") as span:
+            status = await self._post_once(payload)
+            span.set_attribute("status", status)
+        SENDER_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            status=status if status is not None else "error",
+        )
+        return status
 
-    async def send_update_notification(self, update: LinkUpdate) -> None:
-        """Отправляет уведомление o6 обновлении через API бота."""
+    async def _post_once(self, payload: str) -> Optional[int]:
         try:
             bot_api_url = f"{self.bot_base_url}/api/v1/updates"
-            logger.debug("before session")
-            json_data = jsonable_encoder(update)
-            logger.debug("after dump: %s", json_data)
             async with aiohttp.ClientSession() as session:
                 logger.debug("getting session")
-                async with session.post(bot_api_url, json=json_data) as response:
+                async with session.post(
+                    bot_api_url,
+                    data=payload,
+                    headers=inject(JSON_HEADERS),
+                ) as response:
                     logger.debug("sending request: %d", response.status)
                     if response.status != HTTP_200_OK:
-                        error_data = await response.json()
+                        error_data = orjson.loads(await response.read())
                         logger.error("Failed to send update notification: %s", error_data)
-                    else:
-                        logger.info(
-                            "Successfully sent update notification for URL %s to %d chats",
-                            update.url,
-                            len(update.tg_chat_ids),
-                        )
+                    return int(response.status)
 
         except Exception:
             logger.exception("Error sending update notification")
+            return None
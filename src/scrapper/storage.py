@@ -1,23 +1,178 @@
 import os
 from abc import ABC, abstractmethod
-from typing import Dict, Optional, Set
+from typing import Optional, Set
 
 from dotenv import load_dotenv
 from pydantic import HttpUrl
-from sqlalchemy import create_engine, func, text
-from sqlalchemy.orm import sessionmaker
-
-from src.database import Chat, Filter, Link, Tag
-from src.scrapper.models import ChatInfo, LinkResponse, ListLinksResponse
-from src.utils import chat_to_schema, link_to_schema
+from sqlalchemy import Integer, Row, any_, bindparam, delete, func, select, text
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload, sessionmaker
+
+from src.database import (
+    UPDATE_ID_BLOCK,
+    Chat,
+    Filter,
+    Link,
+    Resource,
+    Tag,
+    link_filters,
+    link_tags,
+    link_update_ids,
+    resource_update_types,
+)
+from src.engine import get_engine
+from src.scrapper.filters import link_update_types
+from src.scrapper.models import (
+    ChatInfo,
+    LinkRecord,
+    LinkResponse,
+    LinksPage,
+    ResourceInfo,
+    Watermark,
+)
+from src.tracing import traced
+from src.utils import (
+    canonical_url,
+    detect_platform,
+    link_to_record,
+    link_to_schema,
+    links_page,
+    resource_to_schema,
+)
 
 load_dotenv()
 
+# Ссылка добавляется одним запросом: проверка чата, upsert адреса, вставка ссылки
+# (дубликат отсекается ON CONFLICT), привязка тегов и фильтров и итоговая строка ответа.
+ADD_LINK_QUERY = text(
+    """
+    WITH chat AS (
+        SELECT chat_id FROM chats WHERE chat_id = :chat_id
+    ),
+    resource AS (
+        INSERT INTO resources (url, platform)
+        SELECT :resource_url, :platform FROM chat
+        ON CONFLICT (url) DO UPDATE SET platform = EXCLUDED.platform
+        RETURNING id
+    ),
+    new_link AS (
+        INSERT INTO links (chat_id, url, resource_id, update_types)
+        SELECT chat.chat_id, :url, resource.id, CAST(:update_types AS text[]) FROM chat, resource
+        ON CONFLICT (chat_id, url) DO NOTHING
+        RETURNING id, url
+    ),
+    tag_names AS (
+        SELECT name, min(ord) AS ord
+        FROM unnest(CAST(:tags AS text[])) WITH ORDINALITY AS t(name, ord)
+        GROUP BY name
+    ),
+    new_tags AS (
+        INSERT INTO tags (name)
+        SELECT name FROM tag_names WHERE EXISTS (SELECT 1 FROM new_link)
+        ON CONFLICT (name) DO UPDATE SET name = EXCLUDED.name
+        RETURNING id, name
+    ),
+    new_link_tags AS (
+        INSERT INTO link_tags (link_id, tag_id)
+        SELECT new_link.id, new_tags.id FROM new_link, new_tags
+        RETURNING tag_id
+    ),
+    filter_names AS (
+        SELECT name, min(ord) AS ord
+        FROM unnest(CAST(:filters AS text[])) WITH ORDINALITY AS f(name, ord)
+        GROUP BY name
+    ),
+    new_filters AS (
+        INSERT INTO filters (name)
+        SELECT name FROM filter_names WHERE EXISTS (SELECT 1 FROM new_link)
+        ON CONFLICT (name) DO UPDATE SET name = EXCLUDED.name
+        RETURNING id, name
+    ),
+    new_link_filters AS (
+        INSERT INTO link_filters (link_id, filter_id)
+        SELECT new_link.id, new_filters.id FROM new_link, new_filters
+        RETURNING filter_id
+    )
+    SELECT
+        new_link.id,
+        new_link.url,
+        ARRAY(
+            SELECT new_tags.name FROM new_tags
+            JOIN new_link_tags ON new_link_tags.tag_id = new_tags.id
+            JOIN tag_names ON tag_names.name = new_tags.name
+            ORDER BY tag_names.ord
+        ) AS tags,
+        ARRAY(
+            SELECT new_filters.name FROM new_filters
+            JOIN new_link_filters ON new_link_filters.filter_id = new_filters.id
+            JOIN filter_names ON filter_names.name = new_filters.name
+            ORDER BY filter_names.ord
+        ) AS filters
+    FROM new_link
+    """,
+)
+
+# Связи ссылки c тегами и фильтрами удаляются каскадом (migrations/03-cascading-deletes.sql).
+# RETURNING ещё видит их в снимке запроса, поэтому ответ собирается тем же DELETE.
+REMOVE_LINK_QUERY = text(
+    """
+    DELETE FROM links
+    WHERE chat_id = :chat_id AND url = :url
+    RETURNING
+        id,
+        url,
+        ARRAY(
+            SELECT t.name FROM link_tags lt
+            JOIN tags t ON t.id = lt.tag_id
+            WHERE lt.link_id = links.id
+        ) AS tags,
+        ARRAY(
+            SELECT f.name FROM link_filters lf
+            JOIN filters f ON f.id = lf.filter_id
+            WHERE lf.link_id = links.id
+        ) AS filters
+    """,
+)
+
+# Страница ссылок чата по keyset-курсору (ix_links_chat_id_id); теги и фильтры
+# собираются подзапросами, поэтому на страницу уходит один запрос.
+GET_LINKS_QUERY = text(
+    """
+    SELECT
+        l.id,
+        l.url,
+        ARRAY(
+            SELECT t.name FROM link_tags lt
+            JOIN tags t ON t.id = lt.tag_id
+            WHERE lt.link_id = l.id
+        ) AS tags,
+        ARRAY(
+            SELECT f.name FROM link_filters lf
+            JOIN filters f ON f.id = lf.filter_id
+            WHERE lf.link_id = l.id
+        ) AS filters
+    FROM links l
+    WHERE l.chat_id = :chat_id
+        AND l.id > :after_id
+        AND (
+            CAST(:tag AS text) IS NULL
+            OR EXISTS (
+                SELECT 1 FROM link_tags lt
+                JOIN tags t ON t.id = lt.tag_id
+                WHERE lt.link_id = l.id AND t.name = :tag
+            )
+        )
+    ORDER BY l.id
+    LIMIT :limit
+    """,
+)
+
 
 class StorageInterface(ABC):
     @abstractmethod
-    def add_chat(self, chat_id: int) -> None:
-        """Добавить новый чат."""
+    def add_chat(self, chat_id: int) -> bool:
+        """Добавить новый чат; True, если чат зарегистрирован."""
 
     @abstractmethod
     def remove_chat(self, chat_id: int) -> bool:
@@ -42,50 +197,72 @@ class StorageInterface(ABC):
         """Удалить ссылку из отслеживания."""
 
     @abstractmethod
-    def get_links(self, chat_id: int) -> ListLinksResponse:
-        """Получить все отслеживаемые ссылки чата."""
+    def get_links(
+        self,
+        chat_id: int,
+        limit: Optional[int] = None,
+        after_id: int = 0,
+        tag: Optional[str] = None,
+    ) -> LinksPage:
+        """Получить ссылки чата по возрастанию id: не больше limit штук после after_id, по тегу."""
+
+    @abstractmethod
+    def get_resources(self, after_id: int = 0, limit: int = 500) -> list[ResourceInfo]:
+        """Получить страницу ресурсов, y которых есть подписчики, c id больше after_id."""
 
     @abstractmethod
-    def get_all_unique_links_chat_ids(self) -> Dict[str, Set[int]]:
-        """Получить словарь уникальных ссылок и множества чатов, отслеживающих их."""
+    def save_watermark(self, resource_id: int, watermark: Watermark) -> None:
+        """Сохранить водяной знак проверки адреса."""
+
+    @abstractmethod
+    def reserve_update_ids(self) -> range:
+        """Зарезервировать блок идентификаторов для LinkUpdate."""
+
+    @abstractmethod
+    def get_resource_update_types(self, resource_ids: list[int]) -> dict[int, frozenset[str]]:
+        """Получить типы обновлений, нужные хотя бы одному подписчику, для каждого из ресурсов."""
+
+    @abstractmethod
+    def get_resource_subscribers(self, resource_id: int) -> dict[tuple[str, ...], Set[int]]:
+        """Получить чаты, отслеживающие адрес, сгруппированные по набору фильтров."""
 
 
 class ORMStorage(StorageInterface):
     def __init__(self, db_url: str) -> None:
-        self.engine = create_engine(db_url)
+        self.engine = get_engine(db_url)
         self.Session = sessionmaker(bind=self.engine)
 
-    def add_chat(self, chat_id: int) -> None:
+    def add_chat(self, chat_id: int) -> bool:
         session = self.Session()
         try:
             if not session.get(Chat, chat_id):
                 chat = Chat(chat_id=chat_id)
                 session.add(chat)
                 session.commit()
+            return True
         finally:
             session.close()
 
     def remove_chat(self, chat_id: int) -> bool:
         session = self.Session()
         try:
-            chat = session.get(Chat, chat_id)
-            if chat:
-                session.delete(chat)
-                session.commit()
-                return True
-            return False
+            deleted: Optional[Row[tuple[int]]] = session.execute(
+                delete(Chat).where(Chat.chat_id == chat_id).returning(Chat.chat_id),
+                execution_options={"synchronize_session": False},
+            ).first()
+            session.commit()
+            return deleted is not None
         finally:
             session.close()
 
     def get_chat(self, chat_id: int) -> Optional[ChatInfo]:
         session = self.Session()
         try:
-            chat = session.get(Chat, chat_id)
-            if chat:
-                return chat_to_schema(chat)
-            return None
+            if session.get(Chat, chat_id) is None:
+                return None
         finally:
             session.close()
+        return ChatInfo(chat_id=chat_id, links=self.get_links(chat_id).links)
 
     def add_link(
         self,
@@ -106,65 +283,202 @@ class ORMStorage(StorageInterface):
             if existing:
                 return None
 
-            link = Link(chat_id=chat_id, url=str(url))
-            for tag_name in tags:
-                tag = session.query(Tag).filter_by(name=tag_name).first()
-                if not tag:
-                    tag = Tag(name=tag_name)
-                link.tags.append(tag)
-            for filter_name in filters:
-                flt = session.query(Filter).filter_by(name=filter_name).first()
-                if not flt:
-                    flt = Filter(name=filter_name)
-                link.filters.append(flt)
+            resource_url = canonical_url(str(url))
+            upsert_resource = insert(Resource).values(
+                url=resource_url,
+                platform=detect_platform(resource_url),
+            )
+            upsert_resource = upsert_resource.on_conflict_do_update(
+                index_elements=[Resource.url],
+                set_={"platform": upsert_resource.excluded.platform},
+            )
+            resource_id: int = session.execute(upsert_resource.returning(Resource.id)).scalar_one()
+
+            link = Link(
+                chat_id=chat_id,
+                url=str(url),
+                resource_id=resource_id,
+                update_types=link_update_types(filters),
+            )
+            with session.no_autoflush:
+                for tag_name in dict.fromkeys(tags):
+                    tag = session.query(Tag).filter_by(name=tag_name).first()
+                    if not tag:
+                        tag = Tag(name=tag_name)
+                    link.tags.append(tag)
+                for filter_name in dict.fromkeys(filters):
+                    flt = session.query(Filter).filter_by(name=filter_name).first()
+                    if not flt:
+                        flt = Filter(name=filter_name)
+                    link.filters.append(flt)
             session.add(link)
-            session.commit()
+            try:
+                session.commit()
+            except IntegrityError:
+                session.rollback()
+                return None
             session.refresh(link)
             return link_to_schema(link)
         finally:
             session.close()
 
     def remove_link(self, chat_id: int, url: HttpUrl) -> Optional[LinkResponse]:
+        tag_names = (
+            select(func.array_agg(Tag.name))
+            .join(link_tags, link_tags.c.tag_id == Tag.id)
+            .where(link_tags.c.link_id == Link.id)
+            .correlate(Link)
+            .scalar_subquery()
+        )
+        filter_names = (
+            select(func.array_agg(Filter.name))
+            .join(link_filters, link_filters.c.filter_id == Filter.id)
+            .where(link_filters.c.link_id == Link.id)
+            .correlate(Link)
+            .scalar_subquery()
+        )
+        query = (
+            delete(Link)
+            .where(Link.chat_id == chat_id, Link.url == str(url))
+            .returning(Link.id, Link.url, tag_names.label("tags"), filter_names.label("filters"))
+        )
         session = self.Session()
         try:
-            link = session.query(Link).filter(Link.chat_id == chat_id, Link.url == str(url)).first()
-            if link:
-                link_schema = link_to_schema(link)
-                session.delete(link)
-                session.commit()
-                return link_schema
-            return None
+            row = session.execute(
+                query,
+                execution_options={"synchronize_session": False},
+            ).first()
+            session.commit()
+            if not row:
+                return None
+            return LinkResponse(
+                id=row.id,
+                url=row.url,
+                tags=list(row.tags or []),
+                filters=list(row.filters or []),
+            )
+        finally:
+            session.close()
+
+    def get_links(
+        self,
+        chat_id: int,
+        limit: Optional[int] = None,
+        after_id: int = 0,
+        tag: Optional[str] = None,
+    ) -> LinksPage:
+        session = self.Session()
+        try:
+            query = (
+                session.query(Link)
+                .options(selectinload(Link.tags), selectinload(Link.filters))
+                .filter(Link.chat_id == chat_id, Link.id > after_id)
+            )
+            if tag is not None:
+                query = query.filter(Link.tags.any(Tag.name == tag))
+            query = query.order_by(Link.id)
+            if limit is not None:
+                query = query.limit(limit + 1)
+            return links_page([link_to_record(link) for link in query], limit)
+        finally:
+            session.close()
+
+    def get_resources(self, after_id: int = 0, limit: int = 500) -> list[ResourceInfo]:
+        session = self.Session()
+        try:
+            resources = (
+                session.query(Resource)
+                .filter(Resource.subscribers_count > 0, Resource.id > after_id)
+                .order_by(Resource.id)
+                .limit(limit)
+                .all()
+            )
+            return [resource_to_schema(resource) for resource in resources]
+        finally:
+            session.close()
+
+    def save_watermark(self, resource_id: int, watermark: Watermark) -> None:
+        session = self.Session()
+        try:
+            session.query(Resource).filter(Resource.id == resource_id).update(
+                {
+                    Resource.watermark_at: watermark.checked_at,
+                    Resource.watermark_id: watermark.event_id,
+                    Resource.seen_event_ids: watermark.seen_ids,
+                },
+            )
+            session.commit()
+        finally:
+            session.close()
+
+    def reserve_update_ids(self) -> range:
+        session = self.Session()
+        try:
+            start = session.execute(select(link_update_ids.next_value())).scalar_one()
+            session.commit()
+            return range(start, start + UPDATE_ID_BLOCK)
         finally:
             session.close()
 
-    def get_links(self, chat_id: int) -> ListLinksResponse:
+    def get_resource_update_types(self, resource_ids: list[int]) -> dict[int, frozenset[str]]:
+        ids = bindparam("ids", resource_ids, type_=ARRAY(Integer))
+        query = (
+            select(
+                resource_update_types.c.resource_id,
+                func.array_agg(resource_update_types.c.update_type),
+            )
+            .where(
+                resource_update_types.c.resource_id == any_(ids),
+                resource_update_types.c.subscribers_count > 0,
+            )
+            .group_by(resource_update_types.c.resource_id)
+        )
         session = self.Session()
         try:
-            links = session.query(Link).filter(Link.chat_id == chat_id).all()
-            schema_links = [link_to_schema(link) for link in links]
-            return ListLinksResponse(links=schema_links, size=len(schema_links))
+            rows: list[Row[tuple[int, list[str]]]] = list(session.execute(query))
+            return {resource_id: frozenset(update_types) for resource_id, update_types in rows}
         finally:
             session.close()
 
-    def get_all_unique_links_chat_ids(self) -> Dict[str, Set[int]]:
+    def get_resource_subscribers(self, resource_id: int) -> dict[tuple[str, ...], Set[int]]:
         session = self.Session()
         try:
-            query = session.query(Link.url, func.array_agg(Link.chat_id)).group_by(Link.url)
-            for url, chat_ids in query:
-                yield url, set(chat_ids)
+            links = (
+                session.query(Link)
+                .options(selectinload(Link.filters))
+                .filter(Link.resource_id == resource_id)
+                .all()
+            )
+            subscribers: dict[tuple[str, ...], Set[int]] = {}
+            for link in links:
+                filters = tuple(sorted(f.name for f in link.filters))
+                subscribers.setdefault(filters, set()).add(int(link.chat_id))
+            return subscribers
         finally:
             session.close()
 
 
 class SQLStorage(StorageInterface):
     def __init__(self, db_url: str) -> None:
-        self.engine = create_engine(db_url)
-
-    def add_chat(self, chat_id: int) -> None:
-        query = text("INSERT INTO chats (chat_id) VALUES (:chat_id) ON CONFLICT DO NOTHING")
+        self.engine = get_engine(db_url)
+
+    def add_chat(self, chat_id: int) -> bool:
+        query = text(
+            """
+            WITH inserted AS (
+                INSERT INTO chats (chat_id) VALUES (:chat_id)
+                ON CONFLICT DO NOTHING
+                RETURNING chat_id
+            )
+            SELECT chat_id FROM inserted
+            UNION ALL
+            SELECT chat_id FROM chats WHERE chat_id = :chat_id
+            """,
+        )
         with self.engine.connect() as conn:
-            conn.execute(query, {"chat_id": chat_id})
+            row = conn.execute(query, {"chat_id": chat_id}).first()
             conn.commit()
+            return row is not None
 
     def remove_chat(self, chat_id: int) -> bool:
         query = text("DELETE FROM chats WHERE chat_id = :chat_id RETURNING chat_id")
@@ -179,8 +493,7 @@ class SQLStorage(StorageInterface):
             result = conn.execute(query, {"chat_id": chat_id})
             row = result.fetchone()
             if row:
-                links_resp = self.get_links(chat_id)
-                return ChatInfo(chat_id=chat_id, links=links_resp.links)
+                return ChatInfo(chat_id=chat_id, links=self.get_links(chat_id).links)
             return None
 
     def add_link(
@@ -190,167 +503,156 @@ class SQLStorage(StorageInterface):
         tags: list[str],
         filters: list[str],
     ) -> Optional[LinkResponse]:
-        if not self.get_chat(chat_id):
-            return None
-
-        check_query = text("SELECT id FROM links WHERE chat_id = :chat_id AND url = :url")
+        resource_url = canonical_url(str(url))
         with self.engine.connect() as conn:
-            if conn.execute(check_query, {"chat_id": chat_id, "url": str(url)}).fetchone():
-                return None
-
-            insert_link = text(
-                "INSERT INTO links (chat_id, url) VALUES (:chat_id, :url) RETURNING id",
-            )
-            result = conn.execute(insert_link, {"chat_id": chat_id, "url": str(url)})
-            link_row = result.fetchone()
-            if not link_row:
-                return None
-            link_id = link_row.id
-
-            for tag in tags:
-                upsert_tag = text(
-                    """
-                    INSERT INTO tags (name) VALUES (:name)
-                    ON CONFLICT (name) DO UPDATE SET name = EXCLUDED.name
-                    RETURNING id
-                    """,
-                )
-                tag_result = conn.execute(upsert_tag, {"name": tag})
-                tag_id = tag_result.fetchone().id  # type: ignore[union-attr]
-                link_tag = text(
-                    "INSERT INTO link_tags (link_id, tag_id) "
-                    "VALUES (:link_id, :tag_id) ON CONFLICT DO NOTHING",
-                )
-                conn.execute(link_tag, {"link_id": link_id, "tag_id": tag_id})
-
-            for flt in filters:
-                upsert_filter = text(
-                    """
-                    INSERT INTO filters (name) VALUES (:name)
-                    ON CONFLICT (name) DO UPDATE SET name = EXCLUDED.name
-                    RETURNING id
-                    """,
-                )
-                filter_result = conn.execute(upsert_filter, {"name": flt})
-                filter_id = filter_result.fetchone().id  # type: ignore[union-attr]
-                link_filter = text(
-                    "INSERT INTO link_filters (link_id, filter_id) "
-                    "VALUES (:link_id, :filter_id) ON CONFLICT DO NOTHING",
-                )
-                conn.execute(link_filter, {"link_id": link_id, "filter_id": filter_id})
-
+            row = conn.execute(
+                ADD_LINK_QUERY,
+                {
+                    "chat_id": chat_id,
+                    "url": str(url),
+                    "resource_url": resource_url,
+                    "platform": detect_platform(resource_url),
+                    "tags": tags,
+                    "filters": filters,
+                    "update_types": link_update_types(filters),
+                },
+            ).fetchone()
             conn.commit()
-
-            select_tags = text(
-                """
-                SELECT t.name FROM tags t
-                JOIN link_tags lt ON t.id = lt.tag_id
-                WHERE lt.link_id = :link_id
-                """,
-            )
-            tag_names = [r.name for r in conn.execute(select_tags, {"link_id": link_id})]
-            select_filters = text(
-                """
-                SELECT f.name FROM filters f
-                JOIN link_filters lf ON f.id = lf.filter_id
-                WHERE lf.link_id = :link_id
-                """,
-            )
-            filter_names = [r.name for r in conn.execute(select_filters, {"link_id": link_id})]
-
-            return LinkResponse(
-                id=link_id,
-                url=HttpUrl(str(url)),
-                tags=tag_names,
-                filters=filter_names,
-            )
+        if not row:
+            return None
+        return LinkResponse(
+            id=row.id,
+            url=row.url,
+            tags=list(row.tags),
+            filters=list(row.filters),
+        )
 
     def remove_link(self, chat_id: int, url: HttpUrl) -> Optional[LinkResponse]:
-        select_link = text("SELECT id FROM links WHERE chat_id = :chat_id AND url = :url")
         with self.engine.connect() as conn:
-            row = conn.execute(select_link, {"chat_id": chat_id, "url": str(url)}).fetchone()
-            if not row:
-                return None
-            link_id = row.id
-
-            select_tags = text(
-                """
-                SELECT t.name FROM tags t
-                JOIN link_tags lt ON t.id = lt.tag_id
-                WHERE lt.link_id = :link_id
-                """,
-            )
-            tag_names = [r.name for r in conn.execute(select_tags, {"link_id": link_id})]
-            select_filters = text(
-                """
-                SELECT f.name FROM filters f
-                JOIN link_filters lf ON f.id = lf.filter_id
-                WHERE lf.link_id = :link_id
-                """,
-            )
-            filter_names = [r.name for r in conn.execute(select_filters, {"link_id": link_id})]
-
-            conn.execute(
-                text("DELETE FROM link_tags WHERE link_id = :link_id"),
-                {"link_id": link_id},
-            )
-            conn.execute(
-                text("DELETE FROM link_filters WHERE link_id = :link_id"),
-                {"link_id": link_id},
-            )
-            delete_link = text("DELETE FROM links WHERE id = :link_id RETURNING id, url")
-            result = conn.execute(delete_link, {"link_id": link_id})
+            row = conn.execute(REMOVE_LINK_QUERY, {"chat_id": chat_id, "url": str(url)}).fetchone()
             conn.commit()
-            deleted = result.fetchone()
-            if deleted:
-                return LinkResponse(
-                    id=deleted.id,
-                    url=deleted.url,
-                    tags=tag_names,
-                    filters=filter_names,
-                )
+        if not row:
             return None
-
-    def get_links(self, chat_id: int) -> ListLinksResponse:
-        links_list = []
-        select_links = text("SELECT id, url FROM links WHERE chat_id = :chat_id")
+        return LinkResponse(
+            id=row.id,
+            url=row.url,
+            tags=list(row.tags),
+            filters=list(row.filters),
+        )
+
+    def get_links(
+        self,
+        chat_id: int,
+        limit: Optional[int] = None,
+        after_id: int = 0,
+        tag: Optional[str] = None,
+    ) -> LinksPage:
         with self.engine.connect() as conn:
-            for row in conn.execute(select_links, {"chat_id": chat_id}):
-                link_id = row.id
-                select_tags = text(
-                    """
-                    SELECT t.name FROM tags t
-                    JOIN link_tags lt ON t.id = lt.tag_id
-                    WHERE lt.link_id = :link_id
-                    """,
-                )
-                tag_names = [r.name for r in conn.execute(select_tags, {"link_id": link_id})]
-                select_filters = text(
-                    """
-                    SELECT f.name FROM filters f
-                    JOIN link_filters lf ON f.id = lf.filter_id
-                    WHERE lf.link_id = :link_id
-                    """,
-                )
-                filter_names = [r.name for r in conn.execute(select_filters, {"link_id": link_id})]
-                links_list.append(
-                    LinkResponse(
-                        id=link_id,
-                        url=row.url,
-                        tags=tag_names,
-                        filters=filter_names,
+            result = conn.execute(
+                GET_LINKS_QUERY,
+                {
+                    "chat_id": chat_id,
+                    "after_id": after_id,
+                    "tag": tag,
+                    "limit": limit + 1 if limit is not None else None,
+                },
+            )
+            links = [LinkRecord(row.id, row.url, row.tags, row.filters) for row in result]
+        return links_page(links, limit)
+
+    def get_resources(self, after_id: int = 0, limit: int = 500) -> list[ResourceInfo]:
+        query = text(
+            """
+            SELECT id, url, platform, subscribers_count,
+                   watermark_at, watermark_id, seen_event_ids
+            FROM resources
+            WHERE subscribers_count > 0 AND id > :after_id
+            ORDER BY id
+            LIMIT :limit
+            """,
+        )
+        with self.engine.connect() as conn:
+            result = conn.execute(query, {"after_id": after_id, "limit": limit})
+            return [
+                ResourceInfo(
+                    id=row.id,
+                    url=row.url,
+                    platform=row.platform,
+                    subscribers_count=row.subscribers_count,
+                    watermark=(
+                        Watermark(
+                            checked_at=row.watermark_at,
+                            event_id=row.watermark_id,
+                            seen_ids=row.seen_event_ids,
+                        )
+                        if row.watermark_at is not None
+                        else None
                     ),
                 )
-        return ListLinksResponse(links=links_list, size=len(links_list))
+                for row in result
+            ]
+
+    def save_watermark(self, resource_id: int, watermark: Watermark) -> None:
+        query = text(
+            """
+            UPDATE resources
+            SET watermark_at = :checked_at, watermark_id = :event_id, seen_event_ids = :seen_ids
+            WHERE id = :resource_id
+            """,
+        )
+        with self.engine.connect() as conn:
+            conn.execute(
+                query,
+                {
+                    "resource_id": resource_id,
+                    "checked_at": watermark.checked_at,
+                    "event_id": watermark.event_id,
+                    "seen_ids": watermark.seen_ids,
+                },
+            )
+            conn.commit()
 
-    def get_all_unique_links_chat_ids(self) -> Dict[str, Set[int]]:
-        query = text("SELECT url, array_agg(chat_id) AS chat_ids FROM links GROUP BY url")
+    def reserve_update_ids(self) -> range:
         with self.engine.connect() as conn:
-            result = conn.execute(query)
-            for row in result:
-                url = row[0]
-                chat_ids = set(row[1])
-                yield url, chat_ids
+            start: int = conn.execute(text("SELECT nextval('link_update_ids')")).scalar_one()
+            conn.commit()
+            return range(start, start + UPDATE_ID_BLOCK)
+
+    def get_resource_update_types(self, resource_ids: list[int]) -> dict[int, frozenset[str]]:
+        # Сводка ведётся триггерами на links: строки ссылок и фильтров не читаются.
+        query = text(
+            """
+            SELECT resource_id, array_agg(update_type) AS update_types
+            FROM resource_update_types
+            WHERE resource_id = ANY(:resource_ids) AND subscribers_count > 0
+            GROUP BY resource_id
+            """,
+        )
+        with self.engine.connect() as conn:
+            return {
+                row.resource_id: frozenset(row.update_types)
+                for row in conn.execute(query, {"resource_ids": resource_ids})
+            }
+
+    def get_resource_subscribers(self, resource_id: int) -> dict[tuple[str, ...], Set[int]]:
+        query = text(
+            """
+            SELECT l.chat_id,
+                   ARRAY(
+                       SELECT f.name FROM link_filters lf
+                       JOIN filters f ON f.id = lf.filter_id
+                       WHERE lf.link_id = l.id
+                       ORDER BY f.name
+                   ) AS filters
+            FROM links l
+            WHERE l.resource_id = :resource_id
+            """,
+        )
+        subscribers: dict[tuple[str, ...], Set[int]] = {}
+        with self.engine.connect() as conn:
+            for row in conn.execute(query, {"resource_id": resource_id}):
+                subscribers.setdefault(tuple(row.filters), set()).add(row.chat_id)
+        return subscribers
 
 
 class ScrapperStorage(StorageInterface):
@@ -362,15 +664,19 @@ class ScrapperStorage(StorageInterface):
         else:
             self.impl = ORMStorage(db_url)
 
-    def add_chat(self, chat_id: int) -> None:
+    @traced("storage.add_chat")
+    def add_chat(self, chat_id: int) -> bool:
         return self.impl.add_chat(chat_id)
 
+    @traced("storage.remove_chat")
     def remove_chat(self, chat_id: int) -> bool:
         return self.impl.remove_chat(chat_id)
 
+    @traced("storage.get_chat")
     def get_chat(self, chat_id: int) -> Optional[ChatInfo]:
         return self.impl.get_chat(chat_id)
 
+    @traced("storage.add_link")
     def add_link(
         self,
         chat_id: int,
@@ -380,11 +686,36 @@ class ScrapperStorage(StorageInterface):
     ) -> Optional[LinkResponse]:
         return self.impl.add_link(chat_id, url, tags, filters)
 
+    @traced("storage.remove_link")
     def remove_link(self, chat_id: int, url: HttpUrl) -> Optional[LinkResponse]:
         return self.impl.remove_link(chat_id, url)
 
-    def get_links(self, chat_id: int) -> ListLinksResponse:
-        return self.impl.get_links(chat_id)
-
-    def get_all_unique_links_chat_ids(self) -> Dict[str, Set[int]]:
-        return self.impl.get_all_unique_links_chat_ids()
+    @traced("storage.get_links")
+    def get_links(
+        self,
+        chat_id: int,
+        limit: Optional[int] = None,
+        after_id: int = 0,
+        tag: Optional[str] = None,
+    ) -> LinksPage:
+        return self.impl.get_links(chat_id, limit, after_id, tag)
+
+    @traced("storage.get_resources")
+    def get_resources(self, after_id: int = 0, limit: int = 500) -> list[ResourceInfo]:
+        return self.impl.get_resources(after_id, limit)
+
+    @traced("storage.save_watermark")
+    def save_watermark(self, resource_id: int, watermark: Watermark) -> None:
+        self.impl.save_watermark(resource_id, watermark)
+
+    @traced("storage.reserve_update_ids")
+    def reserve_update_ids(self) -> range:
+        return self.impl.reserve_update_ids()
+
+    @traced("storage.get_resource_update_types")
+    def get_resource_update_types(self, resource_ids: list[int]) -> dict[int, frozenset[str]]:
+        return self.impl.get_resource_update_types(resource_ids)
+
+    @traced("storage.get_resource_subscribers")
+    def get_resource_subscribers(self, resource_id: int) -> dict[tuple[str, ...], Set[int]]:
+        return self.impl.get_resource_subscribers(resource_id)
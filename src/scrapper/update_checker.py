@@ -1,3 +1,4 @@
+from collections.abc import Collection
 from datetime import datetime
 from typing import List, Optional
 
@@ -17,10 +18,12 @@ class UpdateChecker:
         self,
         url: HttpUrl,
         last_check: Optional[datetime],
+        update_types: Optional[Collection[str]] = None,
     ) -> List[UpdateDetail]:
+        """Новые обновления по ссылке; запрашиваются только типы из update_types (None - все)."""
         str_url = str(url).lower()
         if "github.com" in str_url:
-            return await self.github.get_new_updates(url, last_check)
+            return await self.github.get_new_updates(url, last_check, update_types)
         elif "stackoverflow.com" in str_url:
-            return await self.stackoverflow.get_new_updates(url, last_check)
+            return await self.stackoverflow.get_new_updates(url, last_check, update_types)
         return []
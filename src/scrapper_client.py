@@ -1,23 +1,112 @@
+import asyncio
+from types import TracebackType
 from typing import Optional
 
 import aiohttp
-from fastapi.encoders import jsonable_encoder
 from pydantic import HttpUrl
-from starlette.status import HTTP_200_OK
+from starlette.status import HTTP_200_OK, HTTP_500_INTERNAL_SERVER_ERROR
 
+from src.resilience import CircuitBreaker, CircuitOpenError, backoff_delay
 from src.scrapper.models import AddLinkRequest, LinkResponse, ListLinksResponse, RemoveLinkRequest
+from src.settings import ScrapperClientSettings
+
+LINKS_PAGE_SIZE = 100
+JSON_HEADERS = {"Content-Type": "application/json"}
 
 
 class ScrapperClient:
-    def __init__(self, base_url: str = "http://localhost:8080") -> None:
-        self.base_url = base_url.rstrip("/")
+    """Клиент Scrapper API c одним пулом соединений на всё время жизни бота.
+
+    Идемпотентные вызовы повторяются c jitter; после серии ошибок circuit breaker
+    отклоняет вызовы сразу (CircuitOpenError), не копя ждущие корутины хендлеров.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        settings: Optional[ScrapperClientSettings] = None,
+    ) -> None:
+        self.settings = settings or ScrapperClientSettings()
+        self.base_url = (base_url or self.settings.base_url).rstrip("/")
+        self.timeout = aiohttp.ClientTimeout(
+            total=self.settings.request_timeout,
+            connect=self.settings.connect_timeout,
+        )
+        self.breaker = CircuitBreaker(
+            self.settings.breaker_failures,
+            self.settings.breaker_reset_seconds,
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "ScrapperClient":
+        self._get_session()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        await self.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.settings.pool_size),
+                timeout=self.timeout,
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _can_retry(self, attempt: int, *, retry: bool) -> bool:
+        return retry and attempt < self.settings.retries and self.breaker.allow()
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        retry: bool = False,
+        **kwargs: object,
+    ) -> tuple[int, bytes]:
+        """Выполнить запрос; 5xx, сетевые ошибки и таймауты считаются отказами scrapper."""
+        if not self.breaker.allow():
+            raise CircuitOpenError("Scrapper API временно недоступен")
+        request = getattr(self._get_session(), method)
+        attempt = 0
+        while True:
+            try:
+                async with request(
+                    f"{self.base_url}{path}",
+                    timeout=self.timeout,
+                    **kwargs,
+                ) as response:
+                    status, body = response.status, await response.read()
+            except (aiohttp.ClientError, TimeoutError):
+                self.breaker.record_failure()
+                if not self._can_retry(attempt, retry=retry):
+                    raise
+            except BaseException:
+                self.breaker.release()
+                raise
+            else:
+                if status < HTTP_500_INTERNAL_SERVER_ERROR:
+                    self.breaker.record_success()
+                    return status, body
+                self.breaker.record_failure()
+                if not self._can_retry(attempt, retry=retry):
+                    return status, body
+            await asyncio.sleep(backoff_delay(attempt, self.settings.retry_backoff))
+            attempt += 1
 
     async def register_chat(self, chat_id: int) -> bool:
-        async with (
-            aiohttp.ClientSession() as session,
-            session.post(f"{self.base_url}/tg-chat/{chat_id}") as response,
-        ):
-            return response.status == HTTP_200_OK
+        status, _ = await self._request("post", f"/tg-chat/{chat_id}", retry=True)
+        return status == HTTP_200_OK
 
     async def add_link(
         self,
@@ -33,36 +122,60 @@ class ScrapperClient:
             filters=filters,
         )
 
-        async with aiohttp.ClientSession() as session:
-            headers = {"Tg-Chat-Id": str(chat_id)}
-            async with session.post(
-                f"{self.base_url}/links",
-                headers=headers,
-                json=jsonable_encoder(request),
-            ) as response:
-                if response.status == HTTP_200_OK:
-                    return LinkResponse.model_validate(await response.json())
-                return None
+        status, body = await self._request(
+            "post",
+            "/links",
+            headers={"Tg-Chat-Id": str(chat_id), **JSON_HEADERS},
+            data=request.model_dump_json(),
+        )
+        if status == HTTP_200_OK:
+            return LinkResponse.model_validate_json(body)
+        return None
 
     async def remove_link(self, chat_id: int, url: HttpUrl) -> Optional[LinkResponse]:
         request = RemoveLinkRequest(link=url)
 
-        async with aiohttp.ClientSession() as session:
-            headers = {"Tg-Chat-Id": str(chat_id)}
-            async with session.delete(
-                f"{self.base_url}/links",
-                headers=headers,
-                json=jsonable_encoder(request),
-            ) as response:
-                if response.status == HTTP_200_OK:
-                    return LinkResponse.model_validate(await response.json())
-                return None
-
-    async def get_links(self, chat_id: int) -> list[LinkResponse]:
-        async with aiohttp.ClientSession() as session:
-            headers = {"Tg-Chat-Id": str(chat_id)}
-            async with session.get(f"{self.base_url}/links", headers=headers) as response:
-                if response.status == HTTP_200_OK:
-                    data = await response.json()
-                    return ListLinksResponse.model_validate(data).links
-                return []
+        status, body = await self._request(
+            "delete",
+            "/links",
+            headers={"Tg-Chat-Id": str(chat_id), **JSON_HEADERS},
+            data=request.model_dump_json(),
+        )
+        if status == HTTP_200_OK:
+            return LinkResponse.model_validate_json(body)
+        return None
+
+    async def get_links_page(
+        self,
+        chat_id: int,
+        cursor: Optional[str] = None,
+        tag: Optional[str] = None,
+        limit: int = LINKS_PAGE_SIZE,
+    ) -> Optional[ListLinksResponse]:
+        params = {"limit": str(limit)}
+        if cursor:
+            params["cursor"] = cursor
+        if tag:
+            params["tag"] = tag
+        status, body = await self._request(
+            "get",
+            "/links",
+            retry=True,
+            headers={"Tg-Chat-Id": str(chat_id)},
+            params=params,
+        )
+        if status == HTTP_200_OK:
+            return ListLinksResponse.model_validate_json(body)
+        return None
+
+    async def get_links(self, chat_id: int, tag: Optional[str] = None) -> list[LinkResponse]:
+        links: list[LinkResponse] = []
+        cursor = None
+        while True:
+            page = await self.get_links_page(chat_id, cursor, tag)
+            if page is None:
+                return links
+            links.extend(page.links)
+            if page.next_cursor is None:
+                return links
+            cursor = page.next_cursor
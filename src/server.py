@@ -1,5 +1,6 @@
 import asyncio
 import logging
+import os
 from collections.abc import AsyncIterator
 from concurrent.futures import ThreadPoolExecutor
 from contextlib import AsyncExitStack, asynccontextmanager
@@ -16,10 +17,23 @@ from telethon import TelegramClient
 from telethon.errors.rpcerrorlist import ApiIdInvalidError
 
 from src.api import router
+from src.api.metrics import router as metrics_router
 from src.api.ping import router as ping_router
+from src.chat_registry import ChatRegistry
+from src.conversations import create_conversation_store, evict_periodically
+from src.delivered_updates import DeliveredUpdates
+from src.dispatcher import ChatDispatcher
 from src.handlers.bot_handlers import BotHandler
-from src.settings import TGBotSettings
+from src.responses import ORJSONResponse
+from src.scrapper_client import ScrapperClient
+from src.settings import (
+    ConversationSettings,
+    ScrapperClientSettings,
+    TGBotSettings,
+    TracingSettings,
+)
 from src.storage import Storage
+from src.tracing import TRACER, configure_tracing
 
 logger = logging.getLogger(__name__)
 
@@ -40,22 +54,62 @@ async def default_lifespan(application: FastAPI) -> AsyncIterator[None]:
         ),
     )
     application.settings = TGBotSettings()  # type: ignore[call-arg, attr-defined]
+    configure_tracing(TracingSettings())
     application.storage = Storage()  # type: ignore[attr-defined]
+    application.chats = ChatRegistry()  # type: ignore[attr-defined]
+    await application.chats.refresh(application.storage)  # type: ignore[attr-defined]
+    application.delivered_updates = DeliveredUpdates(  # type: ignore[attr-defined]
+        application.settings.delivered_updates_size,  # type: ignore[attr-defined]
+    )
+    conversation_settings = ConversationSettings()
+    application.conversations = create_conversation_store(  # type: ignore[attr-defined]
+        conversation_settings,
+        os.getenv("DB_URL"),
+    )
 
     client = TelegramClient(
         "fastapi_bot_session",
         application.settings.api_id,  # type: ignore[attr-defined]
         application.settings.api_hash,  # type: ignore[attr-defined]
+        sequential_updates=True,
     ).start(
         bot_token=application.settings.token,  # type: ignore[attr-defined]
     )
 
     async with AsyncExitStack() as stack:
+        stack.callback(TRACER.shutdown)
+        reconcile = asyncio.create_task(
+            application.chats.reconcile(  # type: ignore[attr-defined]
+                application.storage,  # type: ignore[attr-defined]
+                application.settings.chats_refresh_interval,  # type: ignore[attr-defined]
+            ),
+        )
+        stack.callback(reconcile.cancel)
+        eviction = asyncio.create_task(
+            evict_periodically(
+                application.conversations,  # type: ignore[attr-defined]
+                conversation_settings.evict_interval,
+            ),
+        )
+        stack.callback(eviction.cancel)
+        application.scrapper = await stack.enter_async_context(  # type: ignore[attr-defined]
+            ScrapperClient(settings=ScrapperClientSettings()),
+        )
         try:
             application.tg_client = await stack.enter_async_context(await client)  # type: ignore[attr-defined]
             application.bot_handler = await BotHandler.create(  # type: ignore[attr-defined]
                 application.tg_client,  # type: ignore[attr-defined]
                 application.storage,  # type: ignore[attr-defined]
+                application.scrapper,  # type: ignore[attr-defined]
+                application.chats,  # type: ignore[attr-defined]
+                application.conversations,  # type: ignore[attr-defined]
+                ChatDispatcher(
+                    application.settings.handler_workers,  # type: ignore[attr-defined]
+                    application.settings.handler_queue_size,  # type: ignore[attr-defined]
+                ),
+            )
+            stack.push_async_callback(
+                application.bot_handler.dispatcher.join,  # type: ignore[attr-defined]
             )
             logger.info("Telegram bot initialized successfully")
         except ApiIdInvalidError:
@@ -70,12 +124,14 @@ app = FastAPI(
     version="1.0.0",
     title="Telegram Bot API",
     lifespan=default_lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 app.exception_handler(RequestValidationError)(validation_exception_handler)
 
 app.include_router(router=router, prefix="/api/v1")
 app.include_router(router=ping_router, prefix="/api/v1")
+app.include_router(router=metrics_router)
 
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
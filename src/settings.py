@@ -1,10 +1,18 @@
 import typing
 from pathlib import Path
+from typing import Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-__all__ = ("TGBotSettings",)
+__all__ = (
+    "CacheSettings",
+    "ConversationSettings",
+    "DatabaseSettings",
+    "ScrapperClientSettings",
+    "TGBotSettings",
+    "TracingSettings",
+)
 
 
 class TGBotSettings(BaseSettings):
@@ -14,6 +22,10 @@ class TGBotSettings(BaseSettings):
     api_hash: str = Field(...)
     token: str = Field(...)
     check_interval: int = Field(default=10)
+    chats_refresh_interval: int = Field(default=300)
+    handler_workers: int = Field(default=16)
+    handler_queue_size: int = Field(default=1000)
+    delivered_updates_size: int = Field(default=10000)
 
     model_config: typing.ClassVar[SettingsConfigDict] = SettingsConfigDict(
         extra="ignore",
@@ -22,3 +34,84 @@ class TGBotSettings(BaseSettings):
         env_file=Path(__file__).parent.parent / ".env",
         env_prefix="BOT_",
     )
+
+
+class DatabaseSettings(BaseSettings):
+    pool_size: int = Field(default=5)
+    max_overflow: int = Field(default=5)
+    pool_timeout: float = Field(default=10.0)
+    pool_recycle: int = Field(default=1800)
+    pool_pre_ping: bool = Field(default=True)
+    statement_timeout_ms: int = Field(default=5000)
+    lock_timeout_ms: int = Field(default=2000)
+
+    model_config: typing.ClassVar[SettingsConfigDict] = SettingsConfigDict(
+        extra="ignore",
+        frozen=True,
+        case_sensitive=False,
+        env_file=Path(__file__).parent.parent / ".env",
+        env_prefix="DB_",
+    )
+
+
+class CacheSettings(BaseSettings):
+    backend: str = Field(default="memory")
+    url: Optional[str] = Field(default=None)
+    ttl_seconds: float = Field(default=300.0)
+    max_size: int = Field(default=10000)
+
+    model_config: typing.ClassVar[SettingsConfigDict] = SettingsConfigDict(
+        extra="ignore",
+        frozen=True,
+        case_sensitive=False,
+        env_file=Path(__file__).parent.parent / ".env",
+        env_prefix="LINKS_CACHE_",
+    )
+
+
+class ScrapperClientSettings(BaseSettings):
+    base_url: str = Field(default="http://localhost:8080")
+    pool_size: int = Field(default=20)
+    connect_timeout: float = Field(default=2.0)
+    request_timeout: float = Field(default=5.0)
+    retries: int = Field(default=2)
+    retry_backoff: float = Field(default=0.2)
+    breaker_failures: int = Field(default=5)
+    breaker_reset_seconds: float = Field(default=30.0)
+
+    model_config: typing.ClassVar[SettingsConfigDict] = SettingsConfigDict(
+        extra="ignore",
+        frozen=True,
+        case_sensitive=False,
+        env_file=Path(__file__).parent.parent / ".env",
+        env_prefix="SCRAPPER_CLIENT_",
+    )
+
+
+class ConversationSettings(BaseSettings):
+    backend: str = Field(default="memory")
+    ttl_seconds: float = Field(default=900.0)
+    max_size: int = Field(default=10000)
+    evict_interval: float = Field(default=60.0)
+    negative_ttl_seconds: float = Field(default=2.0)
+
+    model_config: typing.ClassVar[SettingsConfigDict] = SettingsConfigDict(
+        extra="ignore",
+        frozen=True,
+        case_sensitive=False,
+        env_file=Path(__file__).parent.parent / ".env",
+        env_prefix="CONVERSATIONS_",
+    )
+
+
+class TracingSettings(BaseSettings):
+    sample_rate: float = Field(default=0.01, ge=0.0, le=1.0)
+    export_path: Optional[str] = Field(default=None)
+
+    model_config: typing.ClassVar[SettingsConfigDict] = SettingsConfigDict(
+        extra="ignore",
+        frozen=True,
+        case_sensitive=False,
+        env_file=Path(__file__).parent.parent / ".env",
+        env_prefix="TRACING_",
+    )
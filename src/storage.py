@@ -1,16 +1,26 @@
+import asyncio
+import contextvars
+import functools
 import os
 from abc import ABC, abstractmethod
-from typing import Optional
+from collections.abc import Callable, Iterable
+from concurrent.futures import Executor
+from typing import Optional, TypeVar
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import Integer, Row, any_, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import sessionmaker
 
 from src.database import Chat
+from src.engine import get_engine
 from src.models import Link, User
+from src.tracing import traced
 
 load_dotenv()
 
+T = TypeVar("T")
+
 
 class StorageInterface(ABC):
     @abstractmethod
@@ -21,10 +31,22 @@ class StorageInterface(ABC):
     def get_user(self, chat_id: int) -> Optional[User]:
         """Получить пользователя по chat_id."""
 
+    @abstractmethod
+    def exists(self, chat_id: int) -> bool:
+        """Проверить, зарегистрирован ли чат, не загружая ссылки чата."""
+
+    @abstractmethod
+    def filter_registered(self, chat_ids: Iterable[int]) -> set[int]:
+        """Оставить из chat_ids только зарегистрированные чаты одним запросом."""
+
+    @abstractmethod
+    def registered_chat_ids(self) -> set[int]:
+        """Получить идентификаторы всех зарегистрированных чатов."""
+
 
 class ORMStorage(StorageInterface):
     def __init__(self, db_url: str) -> None:
-        self.engine = create_engine(db_url)
+        self.engine = get_engine(db_url)
         self.Session = sessionmaker(bind=self.engine)
 
     def add_user(self, chat_id: int) -> None:
@@ -48,10 +70,30 @@ class ORMStorage(StorageInterface):
         finally:
             session.close()
 
+    def exists(self, chat_id: int) -> bool:
+        with self.Session() as session:
+            return session.query(Chat.chat_id).filter(Chat.chat_id == chat_id).first() is not None
+
+    def filter_registered(self, chat_ids: Iterable[int]) -> set[int]:
+        ids = list(set(chat_ids))
+        if not ids:
+            return set()
+        with self.Session() as session:
+            registered = any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+            rows: list[Row[tuple[int]]] = (
+                session.query(Chat.chat_id).filter(Chat.chat_id == registered).all()
+            )
+            return {int(row.chat_id) for row in rows}
+
+    def registered_chat_ids(self) -> set[int]:
+        with self.Session() as session:
+            rows: list[Row[tuple[int]]] = session.query(Chat.chat_id).all()
+            return {int(row.chat_id) for row in rows}
+
 
 class SQLStorage(StorageInterface):
     def __init__(self, db_url: str) -> None:
-        self.engine = create_engine(db_url)
+        self.engine = get_engine(db_url)
 
     def add_user(self, chat_id: int) -> None:
         query = text("INSERT INTO chats (chat_id) VALUES (:chat_id) ON CONFLICT DO NOTHING")
@@ -78,6 +120,23 @@ class SQLStorage(StorageInterface):
                 return User(chat_id=user_row.chat_id, tracked_links=links)
             return None
 
+    def exists(self, chat_id: int) -> bool:
+        query = text("SELECT EXISTS(SELECT 1 FROM chats WHERE chat_id = :chat_id)")
+        with self.engine.connect() as conn:
+            return bool(conn.execute(query, {"chat_id": chat_id}).scalar())
+
+    def filter_registered(self, chat_ids: Iterable[int]) -> set[int]:
+        ids = list(set(chat_ids))
+        if not ids:
+            return set()
+        query = text("SELECT chat_id FROM chats WHERE chat_id = ANY(:ids)")
+        with self.engine.connect() as conn:
+            return set(conn.execute(query, {"ids": ids}).scalars())
+
+    def registered_chat_ids(self) -> set[int]:
+        with self.engine.connect() as conn:
+            return set(conn.execute(text("SELECT chat_id FROM chats")).scalars())
+
 
 class Storage(StorageInterface):
     def __init__(self, db_url: str = os.getenv("DB_URL")) -> None:  # type: ignore[assignment]
@@ -88,8 +147,57 @@ class Storage(StorageInterface):
         else:
             self.impl = ORMStorage(db_url)
 
+    @traced("storage.add_user")
     def add_user(self, chat_id: int) -> None:
         return self.impl.add_user(chat_id)
 
+    @traced("storage.get_user")
     def get_user(self, chat_id: int) -> Optional[User]:
         return self.impl.get_user(chat_id)
+
+    @traced("storage.exists")
+    def exists(self, chat_id: int) -> bool:
+        return self.impl.exists(chat_id)
+
+    @traced("storage.filter_registered")
+    def filter_registered(self, chat_ids: Iterable[int]) -> set[int]:
+        return self.impl.filter_registered(chat_ids)
+
+    @traced("storage.registered_chat_ids")
+    def registered_chat_ids(self) -> set[int]:
+        return self.impl.registered_chat_ids()
+
+
+class AsyncStorage:
+    """Асинхронный адаптер над StorageInterface: запросы к БД выполняются в executor.
+
+    По умолчанию используется executor цикла событий, заданный в lifespan приложения.
+    """
+
+    def __init__(self, storage: StorageInterface, executor: Optional[Executor] = None) -> None:
+        self.storage = storage
+        self.executor = executor
+
+    async def _run(self, func: Callable[..., T], *args: object) -> T:
+        loop = asyncio.get_running_loop()
+        # run_in_executor не переносит contextvars: спаны в потоке продолжают текущую трассу.
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self.executor,
+            functools.partial(context.run, func, *args),
+        )
+
+    async def add_user(self, chat_id: int) -> None:
+        return await self._run(self.storage.add_user, chat_id)
+
+    async def get_user(self, chat_id: int) -> Optional[User]:
+        return await self._run(self.storage.get_user, chat_id)
+
+    async def exists(self, chat_id: int) -> bool:
+        return await self._run(self.storage.exists, chat_id)
+
+    async def filter_registered(self, chat_ids: Iterable[int]) -> set[int]:
+        return await self._run(self.storage.filter_registered, list(chat_ids))
+
+    async def registered_chat_ids(self) -> set[int]:
+        return await self._run(self.storage.registered_chat_ids)
@@ -0,0 +1,21 @@
+from telethon.errors import FloodWaitError
+
+from src.metrics import Counter
+
+__all__ = ("FLOOD_WAITS", "FLOOD_WAIT_SECONDS", "record_flood_wait")
+
+FLOOD_WAITS = Counter(
+    "bot_flood_waits",
+    "FloodWaitError responses from Telegram by where they were raised",
+    ["source"],
+)
+FLOOD_WAIT_SECONDS = Counter(
+    "bot_flood_wait_seconds",
+    "Seconds Telegram asked the bot to wait in FloodWaitError",
+    ["source"],
+)
+
+
+def record_flood_wait(error: FloodWaitError, source: str) -> None:
+    FLOOD_WAITS.inc(source=source)
+    FLOOD_WAIT_SECONDS.inc(error.seconds, source=source)
@@ -0,0 +1,224 @@
+import contextlib
+import contextvars
+import functools
+import inspect
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterator, Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, ParamSpec, TypeVar, cast
+
+import orjson
+
+from src.settings import TracingSettings
+
+__all__ = (
+    "TRACEPARENT",
+    "TRACER",
+    "JsonlExporter",
+    "Span",
+    "SpanContext",
+    "Tracer",
+    "configure_tracing",
+    "extract",
+    "inject",
+    "traced",
+)
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# Заголовок W3C Trace Context: версия-trace_id-span_id-флаги.
+TRACEPARENT = "traceparent"
+_TRACE_ID_LENGTH = 32
+_SPAN_ID_LENGTH = 16
+_TRACEPARENT_PARTS = 4
+
+
+@dataclass(slots=True, frozen=True)
+class SpanContext:
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+    def to_traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    @classmethod
+    def from_traceparent(cls, header: Optional[str]) -> Optional["SpanContext"]:
+        """Разобрать заголовок traceparent; None, если он отсутствует или некорректен."""
+        if not header:
+            return None
+        parts = header.strip().lower().split("-")
+        if len(parts) < _TRACEPARENT_PARTS or parts[0] == "ff":
+            return None
+        _, trace_id, span_id, flags = parts[:_TRACEPARENT_PARTS]
+        if len(trace_id) != _TRACE_ID_LENGTH or len(span_id) != _SPAN_ID_LENGTH:
+            return None
+        try:
+            sampled = bool(int(flags, 16) & 1)
+            if not int(trace_id, 16) or not int(span_id, 16):
+                return None
+        except ValueError:
+            return None
+        return cls(trace_id, span_id, sampled)
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    context: SpanContext
+    parent_id: Optional[str]
+    attributes: dict[str, object] = field(default_factory=dict)
+    start_time: float = field(default_factory=time.time)
+    duration: float = 0.0
+    status: str = "ok"
+
+    def set_attribute(self, key: str, value: object) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "name": self.name,
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class JsonlExporter:
+    """Запись завершённых спанов в файл, по одному JSON на строку.
+
+    Строки копятся в буфере и дописываются в файл пачками по batch_size.
+    """
+
+    def __init__(self, path: str | Path, batch_size: int = 100) -> None:
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self._buffer: list[bytes] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = orjson.dumps(span.to_dict(), default=str) + b"\n"
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) < self.batch_size:
+                return
+            lines, self._buffer = self._buffer, []
+        self._write(lines)
+
+    def flush(self) -> None:
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        self._write(lines)
+
+    def _write(self, lines: list[bytes]) -> None:
+        if lines:
+            with self.path.open("ab") as f:
+                f.writelines(lines)
+
+
+_current: contextvars.ContextVar[Optional[SpanContext]] = contextvars.ContextVar(
+    "current_span",
+    default=None,
+)
+
+
+class Tracer:
+    """Спаны c контекстом в contextvars; решение o записи принимается в корне трассы.
+
+    Несэмплированные спаны только передают контекст дальше и ничего не экспортируют.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, exporter: Optional[JsonlExporter] = None) -> None:
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+
+    @contextlib.contextmanager
+    def span(
+        self,
+        name: str,
+        parent: Optional[SpanContext] = None,
+        *,
+        new_trace: bool = False,
+        **attributes: object,
+    ) -> Iterator[Span]:
+        """Открыть спан; родитель по умолчанию текущий спан, new_trace начинает новую трассу."""
+        if parent is None and not new_trace:
+            parent = _current.get()
+        if parent is None:
+            trace_id = f"{random.getrandbits(128):032x}"
+            sampled = self.exporter is not None and random.random() < self.sample_rate  # noqa: S311
+        else:
+            trace_id, sampled = parent.trace_id, parent.sampled
+        context = SpanContext(trace_id, f"{random.getrandbits(64) or 1:016x}", sampled)
+        span = Span(name, context, parent.span_id if parent else None, attributes)
+        token = _current.set(context)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.set_attribute("error", e.__class__.__name__)
+            raise
+        finally:
+            _current.reset(token)
+            if sampled and self.exporter is not None:
+                span.duration = time.perf_counter() - started
+                self.exporter.export(span)
+
+    def shutdown(self) -> None:
+        if self.exporter is not None:
+            self.exporter.flush()
+
+
+TRACER = Tracer()
+
+
+def configure_tracing(settings: TracingSettings, tracer: Tracer = TRACER) -> Tracer:
+    """Настроить сэмплирование и экспорт; без export_path трассы не пишутся."""
+    tracer.sample_rate = settings.sample_rate
+    tracer.exporter = JsonlExporter(settings.export_path) if settings.export_path else None
+    return tracer
+
+
+def inject(headers: Mapping[str, str]) -> dict[str, str]:
+    """Заголовки запроса c traceparent текущего спана."""
+    context = _current.get()
+    if context is None:
+        return dict(headers)
+    return {**headers, TRACEPARENT: context.to_traceparent()}
+
+
+def extract(headers: Mapping[str, str]) -> Optional[SpanContext]:
+    return SpanContext.from_traceparent(headers.get(TRACEPARENT))
+
+
+def traced(name: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Декоратор: вызов функции (синхронной или корутины) оборачивается в спан name."""
+
+    def decorator(func: Callable[P, R]) -> Callable[P, R]:
+        if inspect.iscoroutinefunction(func):
+            coroutine = cast(Callable[P, Awaitable[object]], func)
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> object:
+                with TRACER.span(name):
+                    return await coroutine(*args, **kwargs)
+
+            return cast(Callable[P, R], async_wrapper)
+
+        @functools.wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            with TRACER.span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,20 +1,99 @@
-from pydantic import HttpUrl
+import base64
+import binascii
+import re
+from typing import Optional
 
-from src.database import Chat, Link
-from src.scrapper.models import ChatInfo, LinkResponse
+from src.database import Link, Resource
+from src.scrapper.models import (
+    LinkRecord,
+    LinkResponse,
+    LinksPage,
+    ResourceInfo,
+    Watermark,
+)
+
+GITHUB_URL_RE = re.compile(r"^https?://(?:www\.)?github\.com/([^/?#]+)/([^/?#]+)", re.IGNORECASE)
+STACKOVERFLOW_URL_RE = re.compile(
+    r"^https?://(?:www\.)?stackoverflow\.com/questions/(\d+)",
+    re.IGNORECASE,
+)
+
+
+def canonical_url(url: str) -> str:
+    """Канонический адрес: ссылки на один репозиторий или вопрос дают одну строку."""
+    if match := GITHUB_URL_RE.match(url):
+        owner, repo = match.groups()
+        return f"https://github.com/{owner.lower()}/{repo.lower()}"
+    if match := STACKOVERFLOW_URL_RE.match(url):
+        return f"https://stackoverflow.com/questions/{match.group(1)}"
+    return url
+
+
+def detect_platform(url: str) -> Optional[str]:
+    if GITHUB_URL_RE.match(url):
+        return "github"
+    if STACKOVERFLOW_URL_RE.match(url):
+        return "stackoverflow"
+    return None
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Id последней ссылки предыдущей страницы; ValueError для чужого курсора."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    prefix, _, value = raw.partition(":")
+    if prefix != "id" or not value.isdigit():
+        raise ValueError("Invalid cursor")
+    return int(value)
+
+
+def links_page(links: list[LinkRecord], limit: Optional[int]) -> LinksPage:
+    """Обрезать выборку из limit + 1 ссылок до страницы и выставить курсор следующей."""
+    next_cursor = None
+    if limit is not None and len(links) > limit:
+        links = links[:limit]
+        next_cursor = encode_cursor(links[-1].id)
+    return LinksPage(links=links, size=len(links), next_cursor=next_cursor)
+
+
+def link_to_record(link: Link) -> LinkRecord:
+    return LinkRecord(
+        id=link.id,  # type: ignore[arg-type]
+        url=link.url,  # type: ignore[arg-type]
+        tags=[tag.name for tag in link.tags],
+        filters=[flt.name for flt in link.filters],
+    )
 
 
 def link_to_schema(link: Link) -> LinkResponse:
+    # Ответ POST /links: модель проверяется обычным конструктором, url разбирается один раз.
     return LinkResponse(
-        id=int(link.id),
-        url=HttpUrl(str(link.url)),
+        id=link.id,  # type: ignore[arg-type]
+        url=link.url,  # type: ignore[arg-type]
         tags=[tag.name for tag in link.tags],
         filters=[flt.name for flt in link.filters],
     )
 
 
-def chat_to_schema(chat: Chat) -> ChatInfo:
-    return ChatInfo(
-        chat_id=int(chat.chat_id),
-        links=[link_to_schema(link) for link in chat.links],
+def resource_to_schema(resource: Resource) -> ResourceInfo:
+    return ResourceInfo(
+        id=resource.id,  # type: ignore[arg-type]
+        url=resource.url,  # type: ignore[arg-type]
+        platform=resource.platform,  # type: ignore[arg-type]
+        subscribers_count=resource.subscribers_count,  # type: ignore[arg-type]
+        watermark=(
+            Watermark(
+                checked_at=resource.watermark_at,  # type: ignore[arg-type]
+                event_id=resource.watermark_id,  # type: ignore[arg-type]
+                seen_ids=list(resource.seen_event_ids),
+            )
+            if resource.watermark_at is not None
+            else None
+        ),
     )
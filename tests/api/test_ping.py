@@ -1,5 +1,6 @@
 from fastapi.testclient import TestClient
 
+from src.responses import ORJSONResponse
 from src.server import app
 
 client = TestClient(app)
@@ -9,3 +10,15 @@ def test_api_ping() -> None:
     response = client.get("/api/v1/ping")
     assert response.status_code == 200
     assert response.json() == {"pong": "ok"}
+
+
+def test_api_metrics() -> None:
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE db_pool_checkout_seconds histogram" in response.text
+
+
+def test_api_uses_orjson_responses() -> None:
+    assert app.router.default_response_class is ORJSONResponse
+    assert client.get("/api/v1/ping").headers["content-type"] == "application/json"
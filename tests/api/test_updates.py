@@ -1,21 +1,36 @@
+from datetime import UTC, datetime, timedelta
 from typing import NoReturn
 
 import pytest
 from fastapi import HTTPException
+from telethon.errors import ChatWriteForbiddenError, FloodWaitError, UserIsBlockedError
 
-from src.api.updates import process_update
+from src.api.updates import (
+    SEND_MESSAGE_SECONDS,
+    UPDATE_FRESHNESS_SECONDS,
+    UPDATES_REQUEST_SECONDS,
+    process_update,
+)
+from src.chat_registry import ChatRegistry
+from src.delivered_updates import DeliveredUpdates
 from src.models import LinkUpdate
+from src.telegram_metrics import FLOOD_WAIT_SECONDS, FLOOD_WAITS
 
 
 class FakeStorage:
-    def __init__(self) -> None:
+    def __init__(self, chats) -> None:
         self.users = {}
+        self.chats = chats
 
     def get_user(self, chat_id):
         return self.users.get(chat_id)
 
     def add_user(self, chat_id, user) -> None:
         self.users[chat_id] = user
+        self.chats.add(chat_id)
+
+    def filter_registered(self, chat_ids) -> set[int]:
+        return {chat_id for chat_id in chat_ids if chat_id in self.users}
 
 
 class FakeUser:
@@ -32,13 +47,16 @@ class FakeTGClient:
 
 class FakeApp:
     def __init__(self) -> None:
-        self.storage = FakeStorage()
+        self.chats = ChatRegistry()
+        self.storage = FakeStorage(self.chats)
         self.tg_client = FakeTGClient()
+        self.delivered_updates = DeliveredUpdates()
 
 
 class FakeRequest:
-    def __init__(self, app) -> None:
+    def __init__(self, app, headers=None) -> None:
         self.app = app
+        self.headers = headers or {}
 
 
 @pytest.mark.asyncio
@@ -59,6 +77,18 @@ async def test_process_update_success() -> None:
     ]
 
 
+@pytest.mark.asyncio
+async def test_chat_missing_from_registry_is_loaded_from_storage() -> None:
+    fake_app = FakeApp()
+    # Чат зарегистрирован через другую реплику бота: в БД он есть, в памяти нет.
+    fake_app.storage.users[111] = FakeUser()
+    update = LinkUpdate(id=1, url="https://example.com", tgChatIds=[111, 222])
+    response = await process_update(update, FakeRequest(fake_app))
+    assert response == {"status": "ok"}
+    assert [chat_id for chat_id, _ in fake_app.tg_client.sent_messages] == [111]
+    assert 111 in fake_app.chats
+
+
 @pytest.mark.asyncio
 async def test_process_update_exception(monkeypatch) -> None:
     fake_app = FakeApp()
@@ -72,6 +102,167 @@ async def test_process_update_exception(monkeypatch) -> None:
     fake_request = FakeRequest(fake_app)
     with pytest.raises(HTTPException) as excinfo:
         await process_update(update, fake_request)
-    assert excinfo.value.status_code == 400
+    assert excinfo.value.status_code == 503
     detail = excinfo.value.detail
-    assert detail["code"] == "UPDATE_PROCESSING_ERROR"
+    assert detail["code"] == "UPDATE_DELIVERY_RETRY"
+    assert detail["exception_name"] == "Exception"
+
+
+@pytest.mark.asyncio
+async def test_process_update_sends_to_every_registered_chat() -> None:
+    fake_app = FakeApp()
+    fake_app.storage.add_user(111, FakeUser())
+    fake_app.storage.add_user(333, FakeUser())
+    update = LinkUpdate(id=1, url="https://example.com", tgChatIds=[222, 111, 333])
+    response = await process_update(update, FakeRequest(fake_app))
+    assert response == {"status": "ok"}
+    assert [chat_id for chat_id, _ in fake_app.tg_client.sent_messages] == [111, 333]
+
+
+@pytest.mark.asyncio
+async def test_repeated_update_not_sent_again() -> None:
+    fake_app = FakeApp()
+    fake_app.storage.add_user(111, FakeUser())
+    update = LinkUpdate(id=7, url="https://example.com", tgChatIds=[111])
+
+    assert await process_update(update, FakeRequest(fake_app)) == {"status": "ok"}
+    assert await process_update(update, FakeRequest(fake_app)) == {"status": "ok"}
+
+    assert [chat_id for chat_id, _ in fake_app.tg_client.sent_messages] == [111]
+
+
+@pytest.mark.asyncio
+async def test_retry_after_failure_sends_only_to_missed_chats() -> None:
+    fake_app = FakeApp()
+    fake_app.storage.add_user(111, FakeUser())
+    fake_app.storage.add_user(222, FakeUser())
+    update = LinkUpdate(id=7, url="https://example.com", tgChatIds=[111, 222])
+    send_message = fake_app.tg_client.send_message
+
+    async def failing_for_222(chat_id, message) -> None:
+        if chat_id == 222:
+            raise ConnectionError
+        await send_message(chat_id, message)
+
+    fake_app.tg_client.send_message = failing_for_222
+    with pytest.raises(HTTPException):
+        await process_update(update, FakeRequest(fake_app))
+
+    fake_app.tg_client.send_message = send_message
+    await process_update(update, FakeRequest(fake_app))
+
+    assert [chat_id for chat_id, _ in fake_app.tg_client.sent_messages] == [111, 222]
+
+
+@pytest.mark.asyncio
+async def test_update_latency_is_recorded() -> None:
+    fake_app = FakeApp()
+    fake_app.storage.add_user(111, FakeUser())
+    requests_before = UPDATES_REQUEST_SECONDS.count(status="ok")
+    sends_before = SEND_MESSAGE_SECONDS.count(result="ok")
+
+    update = LinkUpdate(id=8, url="https://example.com", tgChatIds=[111, 222])
+    await process_update(update, FakeRequest(fake_app))
+
+    assert UPDATES_REQUEST_SECONDS.count(status="ok") == requests_before + 1
+    assert SEND_MESSAGE_SECONDS.count(result="ok") == sends_before + 1
+
+
+@pytest.mark.asyncio
+async def test_flood_wait_is_counted_and_retried_later() -> None:
+    fake_app = FakeApp()
+    fake_app.storage.add_user(111, FakeUser())
+    send_message = fake_app.tg_client.send_message
+    waits_before = FLOOD_WAITS.value(source="updates")
+    seconds_before = FLOOD_WAIT_SECONDS.value(source="updates")
+
+    async def flood_wait(chat_id, message) -> NoReturn:
+        raise FloodWaitError(request=None, capture=5)
+
+    fake_app.tg_client.send_message = flood_wait
+    update = LinkUpdate(id=9, url="https://example.com", tgChatIds=[111])
+    with pytest.raises(HTTPException):
+        await process_update(update, FakeRequest(fake_app))
+
+    assert FLOOD_WAITS.value(source="updates") == waits_before + 1
+    assert FLOOD_WAIT_SECONDS.value(source="updates") == seconds_before + 5
+    assert UPDATES_REQUEST_SECONDS.count(status="error") >= 1
+
+    fake_app.tg_client.send_message = send_message
+    await process_update(update, FakeRequest(fake_app))
+    assert [chat_id for chat_id, _ in fake_app.tg_client.sent_messages] == [111]
+
+
+@pytest.mark.asyncio
+async def test_delivery_freshness_is_recorded_per_platform() -> None:
+    fake_app = FakeApp()
+    fake_app.storage.add_user(111, FakeUser())
+    before = UPDATE_FRESHNESS_SECONDS.count(platform="GitHub")
+    update = LinkUpdate.model_validate_json(
+        LinkUpdate(
+            id=10,
+            url="https://example.com",
+            tgChatIds=[111],
+            platform="GitHub",
+            createdAt=datetime.now(UTC) - timedelta(minutes=3),
+        ).model_dump_json(by_alias=True),
+    )
+
+    await process_update(update, FakeRequest(fake_app))
+    await process_update(
+        LinkUpdate(id=11, url="https://example.com", tgChatIds=[111]),
+        FakeRequest(fake_app),
+    )
+
+    assert update.platform == "GitHub"
+    assert UPDATE_FRESHNESS_SECONDS.count(platform="GitHub") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_failing_chat_does_not_stop_fan_out() -> None:
+    fake_app = FakeApp()
+    for chat_id in (111, 222, 333):
+        fake_app.storage.add_user(chat_id, FakeUser())
+    send_message = fake_app.tg_client.send_message
+
+    async def failing_for_111(chat_id, message) -> None:
+        if chat_id == 111:
+            raise ConnectionError
+        await send_message(chat_id, message)
+
+    fake_app.tg_client.send_message = failing_for_111
+    update = LinkUpdate(id=12, url="https://example.com", tgChatIds=[111, 222, 333])
+    with pytest.raises(HTTPException) as excinfo:
+        await process_update(update, FakeRequest(fake_app))
+
+    assert excinfo.value.status_code == 503
+    assert [chat_id for chat_id, _ in fake_app.tg_client.sent_messages] == [222, 333]
+
+    fake_app.tg_client.send_message = send_message
+    await process_update(update, FakeRequest(fake_app))
+    assert [chat_id for chat_id, _ in fake_app.tg_client.sent_messages] == [222, 333, 111]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("error", [UserIsBlockedError, ChatWriteForbiddenError])
+async def test_undeliverable_chat_is_skipped_without_failing(error) -> None:
+    fake_app = FakeApp()
+    fake_app.storage.add_user(111, FakeUser())
+    fake_app.storage.add_user(222, FakeUser())
+    send_message = fake_app.tg_client.send_message
+    attempts = []
+
+    async def blocked_by_111(chat_id, message) -> None:
+        attempts.append(chat_id)
+        if chat_id == 111:
+            raise error(request=None)
+        await send_message(chat_id, message)
+
+    fake_app.tg_client.send_message = blocked_by_111
+    update = LinkUpdate(id=13, url="https://example.com", tgChatIds=[111, 222])
+
+    assert await process_update(update, FakeRequest(fake_app)) == {"status": "ok"}
+    assert await process_update(update, FakeRequest(fake_app)) == {"status": "ok"}
+
+    assert attempts == [111, 222]
+    assert [chat_id for chat_id, _ in fake_app.tg_client.sent_messages] == [222]
@@ -1,10 +1,17 @@
+from types import SimpleNamespace
+
 import pytest
 from fastapi import HTTPException
+from telethon import events
 
-from src.handlers.bot_handlers import HELP_MESSAGE, BotHandler
+from src.handlers.bot_handlers import HANDLER_SECONDS, HELP_MESSAGE, BotHandler
 from src.storage import Storage
 
 
+def links_page(links, next_cursor=None):
+    return SimpleNamespace(links=links, next_cursor=next_cursor)
+
+
 class FakeScrapper:
     async def register_chat(self, chat_id: int) -> bool:
         return True
@@ -19,7 +26,7 @@ class FakeScrapper:
             return type("FakeLinkResponse", (), {"url": url})
         return None
 
-    async def get_links(self, chat_id: int):
+    async def get_links(self, chat_id: int, tag=None):
         if chat_id == 12345:
             FakeLinkResponse = type(
                 "FakeLinkResponse", (), {"url": "https://example.com",
@@ -29,6 +36,9 @@ class FakeScrapper:
             return [FakeLinkResponse]
         return []
 
+    async def get_links_page(self, chat_id: int, cursor=None, tag=None, limit=100):
+        return links_page(await self.get_links(chat_id, tag))
+
 
 class FakeMessage:
     def __init__(self, text: str) -> None:
@@ -40,9 +50,11 @@ class FakeEvent:
         self.chat_id = chat_id
         self.message = FakeMessage(text)
         self.replies = []
+        self.buttons = []
 
-    async def reply(self, message: str) -> None:
+    async def reply(self, message: str, buttons=None) -> None:
         self.replies.append(message)
+        self.buttons.append(buttons)
 
 
 class FakeClient:
@@ -86,11 +98,14 @@ class FullFakeScrapper:
             raise self._remove_link_exception
         return self._remove_link_return
 
-    async def get_links(self, chat_id: int):
+    async def get_links(self, chat_id: int, tag=None):
         if self._get_links_exception:
             raise self._get_links_exception
         return self._get_links_return
 
+    async def get_links_page(self, chat_id: int, cursor=None, tag=None, limit=100):
+        return links_page(await self.get_links(chat_id, tag))
+
 
 @pytest.fixture(scope="module")
 def storage(postgres_container):
@@ -105,6 +120,7 @@ async def test_start_handler_success(storage) -> None:
     fake_event = FakeEvent("/start", chat_id=111)
     await handler._start_handler(fake_event)
     assert storage.get_user(111) is not None
+    assert 111 in handler.chats
     assert any("Добро пожаловать" in reply for reply in fake_event.replies)
 
 
@@ -187,7 +203,7 @@ async def test_track_handler_http_exception(storage) -> None:
     await handler._conversation_handler(fake_event)
     assert any("Настройте фильтры (опционально)" in reply for reply in fake_event.replies)
 
-    fake_event = FakeEvent("filter1 filter2", chat_id=226)
+    fake_event = FakeEvent("type=PR user=bot", chat_id=226)
     await handler._conversation_handler(fake_event)
     assert any("Ошибка API:" in reply for reply in fake_event.replies)
 
@@ -246,10 +262,10 @@ async def test_untrack_handler_generic_exception(storage) -> None:
 async def test_list_handler_empty(storage) -> None:
     fake_client = FakeClient()
     handler = BotHandler(fake_client, storage)
-    async def fake_get_links(chat_id: int):
-        return []
+    async def fake_get_links_page(chat_id: int, cursor=None, tag=None, limit=100):
+        return links_page([])
     handler.scrapper = FullFakeScrapper()
-    handler.scrapper.get_links = fake_get_links
+    handler.scrapper.get_links_page = fake_get_links_page
     fake_event = FakeEvent("/list", chat_id=666)
     await handler._list_handler(fake_event)
     assert any("пуст" in reply for reply in fake_event.replies)
@@ -259,11 +275,11 @@ async def test_list_handler_empty(storage) -> None:
 async def test_list_handler_with_links(storage) -> None:
     fake_client = FakeClient()
     handler = BotHandler(fake_client, storage)
-    def fake_get_links(chat_id: int):
+    async def fake_get_links_page(chat_id: int, cursor=None, tag=None, limit=100):
         FakeLinkResponse = type("FakeLinkResponse", (), {"url": "https://example.com", "tags": ["tag1", "tag2"]})
-        return [FakeLinkResponse]
+        return links_page([FakeLinkResponse])
     handler.scrapper = FullFakeScrapper()
-    handler.scrapper.get_links = fake_get_links
+    handler.scrapper.get_links_page = fake_get_links_page
     fake_event = FakeEvent("/list", chat_id=12345)
     await handler._list_handler(fake_event)
     reply = fake_event.replies[0]
@@ -346,11 +362,11 @@ async def test_list_handler_empty(storage) -> None:
     fake_client = FakeClient()
     handler = BotHandler(fake_client, storage)
 
-    async def fake_get_links(chat_id: int):
-        return []
+    async def fake_get_links_page(chat_id: int, cursor=None, tag=None, limit=100):
+        return links_page([])
 
     handler.scrapper = FullFakeScrapper()
-    handler.scrapper.get_links = fake_get_links
+    handler.scrapper.get_links_page = fake_get_links_page
     fake_event = FakeEvent("/list", chat_id=666)
     await handler._list_handler(fake_event)
     assert any("пуст" in reply for reply in fake_event.replies)
@@ -431,7 +447,7 @@ async def test_conversation_handler_generic_exception(storage) -> None:
          "stage": "await_filters",
     }
     handler.scrapper = FullFakeScrapper(add_link_exception=Exception("Test generic error"))
-    fake_event = FakeEvent("filter1 filter2", chat_id=chat_id)
+    fake_event = FakeEvent("type=PR user=bot", chat_id=chat_id)
     await handler._conversation_handler(fake_event)
     assert any("Произошла непредвиденная ошибка при добавлении ссылки" in reply for reply in fake_event.replies)
     assert chat_id not in handler.conversations
@@ -448,12 +464,34 @@ async def test_conversation_handler_link_response_none(storage) -> None:
          "stage": "await_filters",
     }
     handler.scrapper = FullFakeScrapper(add_link_return=None)
-    fake_event = FakeEvent("filter1 filter2", chat_id=chat_id)
+    fake_event = FakeEvent("type=PR user=bot", chat_id=chat_id)
     await handler._conversation_handler(fake_event)
     assert any("Эта ссылка уже отслеживается или произошла ошибка при добавлении" in reply for reply in fake_event.replies)
     assert chat_id not in handler.conversations
 
 
+@pytest.mark.asyncio
+async def test_conversation_handler_rejects_invalid_filters(storage) -> None:
+    fake_client = FakeClient()
+    handler = BotHandler(fake_client, storage)
+    chat_id = 303
+    handler.conversations[chat_id] = {
+         "url": "https://example.com",
+         "tags": [],
+         "stage": "await_filters",
+    }
+    handler.scrapper = FullFakeScrapper(add_link_return="fake_link")
+    fake_event = FakeEvent("type=PR title~(a+)+", chat_id=chat_id)
+    await handler._conversation_handler(fake_event)
+    assert any("Исправьте фильтры" in reply for reply in fake_event.replies)
+    assert handler.conversations[chat_id]["stage"] == "await_filters"
+
+    fake_event = FakeEvent("type=PR", chat_id=chat_id)
+    await handler._conversation_handler(fake_event)
+    assert any("добавлена для отслеживания" in reply for reply in fake_event.replies)
+    assert chat_id not in handler.conversations
+
+
 @pytest.mark.asyncio
 async def test_conversation_handler_success(storage) -> None:
     fake_client = FakeClient()
@@ -465,7 +503,179 @@ async def test_conversation_handler_success(storage) -> None:
          "stage": "await_filters",
     }
     handler.scrapper = FullFakeScrapper(add_link_return="fake_link")
-    fake_event = FakeEvent("filter1 filter2", chat_id=chat_id)
+    fake_event = FakeEvent("type=PR user=bot", chat_id=chat_id)
     await handler._conversation_handler(fake_event)
     assert any("Ссылка https://example.com добавлена для отслеживания" in reply for reply in fake_event.replies)
     assert chat_id not in handler.conversations
+
+
+@pytest.mark.asyncio
+async def test_list_handler_passes_tag(storage) -> None:
+    fake_client = FakeClient()
+    handler = BotHandler(fake_client, storage)
+    requested_tags = []
+
+    async def fake_get_links_page(chat_id: int, cursor=None, tag=None, limit=100):
+        requested_tags.append(tag)
+        return links_page([])
+
+    handler.scrapper = FullFakeScrapper()
+    handler.scrapper.get_links_page = fake_get_links_page
+    fake_event = FakeEvent("/list work", chat_id=668)
+    await handler._list_handler(fake_event)
+    assert requested_tags == ["work"]
+    assert fake_event.replies == ["Нет отслеживаемых ссылок c тегом work."]
+
+
+@pytest.mark.asyncio
+async def test_single_message_handler_registered(storage) -> None:
+    fake_client = FakeClient()
+    BotHandler(fake_client, storage)
+    message_handlers = [
+        callback for callback, event in fake_client.handlers if isinstance(event, events.NewMessage)
+    ]
+    assert len(message_handlers) == 1
+
+
+@pytest.mark.asyncio
+async def test_message_handler_dispatches_command_once(storage) -> None:
+    fake_client = FakeClient()
+    handler = BotHandler(fake_client, storage)
+    handler.scrapper = FullFakeScrapper()
+    fake_event = FakeEvent("/track@link_bot https://example.com", chat_id=880)
+    await handler._message_handler(fake_event)
+    assert fake_event.replies == ["Введите тэги (опционально):"]
+    assert handler.conversations[880]["url"] == "https://example.com"
+
+
+@pytest.mark.asyncio
+async def test_message_handler_routes_text_to_conversation(storage) -> None:
+    fake_client = FakeClient()
+    handler = BotHandler(fake_client, storage)
+    handler.conversations[881] = {"url": "https://example.com", "stage": "await_tags"}
+    fake_event = FakeEvent("tag1 tag2", chat_id=881)
+    await handler._message_handler(fake_event)
+    assert fake_event.replies == ["Настройте фильтры (опционально):"]
+    assert handler.conversations[881]["tags"] == ["tag1", "tag2"]
+
+
+@pytest.mark.asyncio
+async def test_message_handler_unknown_command(storage) -> None:
+    fake_client = FakeClient()
+    handler = BotHandler(fake_client, storage)
+    fake_event = FakeEvent("/unknown", chat_id=882)
+    await handler._message_handler(fake_event)
+    assert fake_event.replies == [
+        "Неизвестная команда. Используйте /help для просмотра доступных команд.",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_on_message_goes_through_dispatcher(storage) -> None:
+    fake_client = FakeClient()
+    handler = BotHandler(fake_client, storage)
+    fake_event = FakeEvent("/help", chat_id=883)
+    await handler._on_message(fake_event)
+    await handler.dispatcher.join()
+    assert fake_event.replies == [HELP_MESSAGE]
+
+
+class FakeCallbackEvent:
+    def __init__(self, data: bytes, chat_id: int = 12345) -> None:
+        self.chat_id = chat_id
+        self.data = data
+        self.answers = []
+        self.responses = []
+
+    async def answer(self, message=None, alert=False) -> None:
+        self.answers.append(message)
+
+    async def respond(self, message: str, buttons=None) -> None:
+        self.responses.append((message, buttons))
+
+
+def button_data(button) -> bytes:
+    # В новых версиях Telethon данные inline-кнопки лежат в button.type.
+    return button.data if hasattr(button, "data") else button.type.data
+
+
+def make_links(count: int, prefix: str = "https://example.com/"):
+    return [SimpleNamespace(url=f"{prefix}{i}", tags=["tag"]) for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_list_handler_splits_long_pages(storage) -> None:
+    fake_client = FakeClient()
+    handler = BotHandler(fake_client, storage)
+
+    async def fake_get_links_page(chat_id: int, cursor=None, tag=None, limit=100):
+        return links_page(make_links(50, prefix="https://example.com/" + "x" * 150 + "/"))
+
+    handler.scrapper = FullFakeScrapper()
+    handler.scrapper.get_links_page = fake_get_links_page
+    fake_event = FakeEvent("/list", chat_id=884)
+    await handler._list_handler(fake_event)
+    assert len(fake_event.replies) > 1
+    assert all(len(reply) <= 4096 for reply in fake_event.replies)
+    assert sum(reply.count("🔗") for reply in fake_event.replies) == 50
+    assert fake_event.buttons[-1] is None
+
+
+@pytest.mark.asyncio
+async def test_list_handler_adds_next_page_button(storage) -> None:
+    fake_client = FakeClient()
+    handler = BotHandler(fake_client, storage)
+    requested = []
+
+    async def fake_get_links_page(chat_id: int, cursor=None, tag=None, limit=100):
+        requested.append((cursor, tag, limit))
+        if cursor is None:
+            return links_page(make_links(2), next_cursor="abc")
+        return links_page(make_links(1, prefix="https://example.org/"))
+
+    handler.scrapper = FullFakeScrapper()
+    handler.scrapper.get_links_page = fake_get_links_page
+    fake_event = FakeEvent("/list work", chat_id=885)
+    await handler._list_handler(fake_event)
+    [[button]] = fake_event.buttons[-1]
+    data = button_data(button)
+    assert data == b"list:abc:work"
+
+    callback = FakeCallbackEvent(data, chat_id=885)
+    await handler._list_page_callback(callback)
+    assert requested == [(None, "work", 50), ("abc", "work", 50)]
+    assert callback.answers == [None]
+    [(message, buttons)] = callback.responses
+    assert "https://example.org/0" in message
+    assert buttons is None
+
+
+@pytest.mark.asyncio
+async def test_list_callback_with_stale_cursor(storage) -> None:
+    fake_client = FakeClient()
+    handler = BotHandler(fake_client, storage)
+
+    async def fake_get_links_page(chat_id: int, cursor=None, tag=None, limit=100):
+        return None
+
+    handler.scrapper = FullFakeScrapper()
+    handler.scrapper.get_links_page = fake_get_links_page
+    callback = FakeCallbackEvent(b"list:bad:")
+    await handler._list_page_callback(callback)
+    assert callback.responses == []
+    assert "запросите /list заново" in callback.answers[0]
+
+
+@pytest.mark.asyncio
+async def test_message_handler_latency_is_recorded_by_command(storage) -> None:
+    fake_client = FakeClient()
+    handler = BotHandler(fake_client, storage)
+    before = {
+        command: HANDLER_SECONDS.count(command=command)
+        for command in ("/help", "unknown", "conversation")
+    }
+    for text in ("/help", "/help@link_bot", "/whatever", "plain text"):
+        await handler._message_handler(FakeEvent(text, chat_id=884))
+    assert HANDLER_SECONDS.count(command="/help") == before["/help"] + 2
+    assert HANDLER_SECONDS.count(command="unknown") == before["unknown"] + 1
+    assert HANDLER_SECONDS.count(command="conversation") == before["conversation"] + 1
@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+from src.handlers.rendering import (
+    format_link,
+    parse_list_callback,
+    render_links,
+    split_message,
+    to_list_callback,
+)
+
+
+def test_format_link() -> None:
+    assert format_link(SimpleNamespace(url="https://a.com", tags=[])) == "🔗 https://a.com"
+    assert format_link(SimpleNamespace(url="https://a.com", tags=["x", "y"])) == (
+        "🔗 https://a.com - x, y"
+    )
+
+
+def test_split_message_respects_limit_and_lines() -> None:
+    chunks = split_message(["aaaa", "bbbb", "cccc"], limit=9)
+    assert chunks == ["aaaa\nbbbb", "cccc"]
+
+
+def test_split_message_truncates_oversized_line() -> None:
+    chunks = split_message(["a" * 20], limit=10)
+    assert chunks == ["a" * 9 + "…"]
+
+
+def test_render_links_keeps_header() -> None:
+    links = [SimpleNamespace(url="https://a.com", tags=["t"])]
+    assert render_links(links) == ["Отслеживаемые ссылки:\n\n🔗 https://a.com - t"]
+
+
+def test_list_callback_roundtrip() -> None:
+    data = to_list_callback("aWQ6MTA", "work:home")
+    assert data == b"list:aWQ6MTA:work:home"
+    assert parse_list_callback(data) == ("aWQ6MTA", "work:home")
+    assert parse_list_callback(to_list_callback("aWQ6MTA", None)) == ("aWQ6MTA", None)
+    assert to_list_callback("aWQ6MTA", "x" * 64) is None
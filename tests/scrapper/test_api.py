@@ -1,3 +1,4 @@
+from datetime import UTC, datetime, timedelta
 from typing import NoReturn
 
 import pytest
@@ -5,6 +6,8 @@ from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
 from src.scrapper.api import router
+from src.scrapper.cache import InMemoryCacheBackend, LinksCache
+from src.scrapper.freshness import FreshnessSample, FreshnessTracker
 from src.scrapper.storage import ScrapperStorage
 
 
@@ -13,6 +16,8 @@ def app(postgres_container) -> FastAPI:
     app = FastAPI()
     app.include_router(router)
     app.state.storage = ScrapperStorage(postgres_container)
+    app.state.links_cache = LinksCache(InMemoryCacheBackend(max_size=100), ttl=60)
+    app.state.freshness = FreshnessTracker()
     return app
 
 
@@ -66,14 +71,14 @@ def test_add_link_success_and_duplicate(client: TestClient) -> None:
     client.post("/tg-chat/1")
     headers = {"Tg-Chat-Id": "1"}
 
-    link_request = {"link": "https://example.com", "tags": ["tag1", "tag2"], "filters": ["filter1"]}
+    link_request = {"link": "https://example.com", "tags": ["tag1", "tag2"], "filters": ["type=PR"]}
 
     response = client.post("/links", json=link_request, headers=headers)
     assert response.status_code == 200
     data = response.json()
     assert data["url"] == "https://example.com/"
     assert data["tags"] == ["tag1", "tag2"]
-    assert data["filters"] == ["filter1"]
+    assert data["filters"] == ["type=PR"]
     assert "id" in data
 
     duplicate_response = client.post("/links", json=link_request, headers=headers)
@@ -83,6 +88,16 @@ def test_add_link_success_and_duplicate(client: TestClient) -> None:
     assert error["detail"]["code"] == "LINK_ALREADY_EXISTS"
 
 
+def test_add_link_rejects_invalid_filter(client: TestClient) -> None:
+    client.post("/tg-chat/77")
+    link_request = {"link": "https://example.com", "tags": [], "filters": ["size=big"]}
+
+    response = client.post("/links", json=link_request, headers={"Tg-Chat-Id": "77"})
+    assert response.status_code == 400
+    assert response.json()["detail"]["code"] == "INVALID_FILTER"
+    assert client.get("/links", headers={"Tg-Chat-Id": "77"}).json()["size"] == 0
+
+
 def test_remove_link_success_and_not_found(client: TestClient) -> None:
     client.post("/tg-chat/1")
     headers = {"Tg-Chat-Id": "1"}
@@ -136,7 +151,7 @@ def test_remove_chat_exception(client: TestClient, monkeypatch) -> None:
 
 
 def test_get_links_exception(client: TestClient, monkeypatch) -> None:
-    def raise_exception(chat_id: int) -> NoReturn:
+    def raise_exception(chat_id: int, limit, after_id, tag) -> NoReturn:
         raise Exception("Test error")
 
     client.app.state.storage.get_links = raise_exception
@@ -186,3 +201,104 @@ def test_remove_link_exception(client: TestClient, monkeypatch) -> None:
     assert detail["code"] == "LINK_REMOVAL_ERROR"
     assert detail["exception_name"] == "Exception"
     assert "Test error" in detail["exception_message"]
+
+
+def test_get_links_is_served_from_cache(client: TestClient) -> None:
+    client.post("/tg-chat/7")
+    headers = {"Tg-Chat-Id": "7"}
+    first = client.get("/links", headers=headers)
+
+    def raise_exception(chat_id: int, limit, after_id, tag) -> NoReturn:
+        raise Exception("DB must not be queried")
+
+    client.app.state.storage.get_links = raise_exception
+
+    second = client.get("/links", headers=headers)
+    assert second.status_code == 200
+    assert second.json() == first.json()
+
+
+def test_link_changes_invalidate_cached_list(client: TestClient) -> None:
+    client.post("/tg-chat/8")
+    headers = {"Tg-Chat-Id": "8"}
+    assert client.get("/links", headers=headers).json()["size"] == 0
+
+    link_request = {"link": "https://example.com/cached", "tags": [], "filters": []}
+    client.post("/links", json=link_request, headers=headers)
+    assert client.get("/links", headers=headers).json()["size"] == 1
+
+    remove_request = {"link": "https://example.com/cached"}
+    client.request("DELETE", "/links", json=remove_request, headers=headers)
+    assert client.get("/links", headers=headers).json()["size"] == 0
+
+    client.post("/links", json=link_request, headers=headers)
+    assert client.get("/links", headers=headers).json()["size"] == 1
+    client.delete("/tg-chat/8")
+    links_cache = client.app.state.links_cache
+    assert links_cache.get(8, links_cache.version(8)) is None
+
+
+def test_get_links_pages_with_cursor_and_tag(client: TestClient) -> None:
+    client.post("/tg-chat/9")
+    headers = {"Tg-Chat-Id": "9"}
+    for i in range(5):
+        tags = ["even"] if i % 2 == 0 else []
+        client.post("/links", json={"link": f"https://example.com/{i}", "tags": tags}, headers=headers)
+
+    urls = []
+    cursor = None
+    while True:
+        params = {"limit": 2} | ({"cursor": cursor} if cursor else {})
+        page = client.get("/links", params=params, headers=headers).json()
+        assert page["size"] <= 2
+        urls += [link["url"] for link in page["links"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert urls == [f"https://example.com/{i}" for i in range(5)]
+
+    tagged = client.get("/links", params={"tag": "even"}, headers=headers).json()
+    assert [link["url"] for link in tagged["links"]] == [
+        "https://example.com/0",
+        "https://example.com/2",
+        "https://example.com/4",
+    ]
+    assert tagged["next_cursor"] is None
+
+
+def test_get_links_rejects_invalid_cursor_and_limit(client: TestClient) -> None:
+    headers = {"Tg-Chat-Id": "1"}
+    response = client.get("/links", params={"cursor": "garbage!"}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"]["code"] == "INVALID_CURSOR"
+
+    response = client.get("/links", params={"limit": 0}, headers=headers)
+    assert response.status_code == 422
+
+
+def test_freshness_lists_worst_lagging_links(client: TestClient) -> None:
+    freshness: FreshnessTracker = client.app.state.freshness
+    created_at = datetime(2024, 1, 1, tzinfo=UTC)
+    for resource_id, lag in ((1, 30), (2, 900), (3, 120)):
+        delivered_at = created_at + timedelta(seconds=lag)
+        freshness.record(
+            FreshnessSample(
+                resource_id=resource_id,
+                url=f"https://github.com/owner/repo{resource_id}",
+                platform="GitHub",
+                update_type="PR",
+                event_id=f"pr:{resource_id}",
+                created_at=created_at,
+                detected_at=created_at,
+                sent_to_bot_at=delivered_at - timedelta(seconds=1),
+                delivered_at=delivered_at,
+            ),
+        )
+
+    response = client.get("/admin/freshness", params={"limit": 2})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [entry["resource_id"] for entry in body] == [2, 3]
+    assert body[0]["lag_seconds"] == 900
+    assert body[0]["stages"]["delivery"] == 1
@@ -62,3 +62,16 @@ def test_storage_functionality(client: TestClient) -> None:
     asyncio.run(storage.save(key, value))
     result = asyncio.run(storage.get(key))
     assert result == value
+
+
+def test_metrics_endpoint_exposes_scrapper_metrics(client: TestClient) -> None:
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    for name in (
+        "scrapper_cycle_seconds",
+        "scrapper_links_checked",
+        "scrapper_client_request_seconds",
+        "scrapper_sender_request_seconds",
+    ):
+        assert f"# TYPE {name} " in response.text
@@ -0,0 +1,134 @@
+from typing import Any, Optional
+
+import pytest
+
+from src.scrapper.cache import (
+    InMemoryCacheBackend,
+    KeyValueCacheBackend,
+    LinksCache,
+    create_links_cache,
+)
+from src.scrapper.models import LinkRecord, LinksPage, ListLinksResponse
+from src.settings import CacheSettings
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeKeyValueClient:
+    """Локальная замена Redis: хранит значения и TTL в памяти."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, tuple[bytes, int]] = {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        item = self.data.get(key)
+        return item[0] if item else None
+
+    def set(self, key: str, value: bytes, px: int, nx: bool = False) -> Any:
+        if nx and key in self.data:
+            return None
+        self.data[key] = (value, px)
+        return True
+
+    def delete(self, key: str) -> Any:
+        return self.data.pop(key, None) is not None
+
+
+def test_in_memory_backend_evicts_least_recently_used() -> None:
+    backend = InMemoryCacheBackend(max_size=2)
+    backend.set("a", b"1", ttl=60)
+    backend.set("b", b"2", ttl=60)
+    assert backend.get("a") == b"1"
+    backend.set("c", b"3", ttl=60)
+    assert backend.get("b") is None
+    assert backend.get("a") == b"1"
+    assert backend.get("c") == b"3"
+    assert len(backend) == 2
+
+
+def test_in_memory_backend_expires_entries() -> None:
+    clock = FakeClock()
+    backend = InMemoryCacheBackend(max_size=10, clock=clock)
+    backend.set("a", b"1", ttl=5)
+    clock.now = 4.9
+    assert backend.get("a") == b"1"
+    clock.now = 5
+    assert backend.get("a") is None
+    assert len(backend) == 0
+
+
+def test_key_value_backend_passes_ttl_in_milliseconds() -> None:
+    client = FakeKeyValueClient()
+    backend = KeyValueCacheBackend(client)
+    backend.set("a", b"1", ttl=1.5)
+    assert client.data["a"] == (b"1", 1500)
+    assert backend.get("a") == b"1"
+    backend.delete("a")
+    assert backend.get("a") is None
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [InMemoryCacheBackend(max_size=10), KeyValueCacheBackend(FakeKeyValueClient())],
+)
+def test_links_cache_round_trip(backend) -> None:
+    cache = LinksCache(backend, ttl=60)
+    links = LinksPage(
+        links=[LinkRecord(id=1, url="https://example.com/", tags=["a"], filters=[])],
+        size=1,
+    )
+    version = cache.version(1)
+    assert cache.version(1) == version
+    payload = cache.set(1, version, links)
+    assert cache.get(1, cache.version(1)) == payload
+    response = ListLinksResponse.model_validate_json(payload)
+    assert response.size == 1
+    assert response.next_cursor is None
+    assert str(response.links[0].url) == "https://example.com/"
+    assert response.links[0].tags == ["a"]
+    cache.invalidate(1)
+    assert cache.get(1, cache.version(1)) is None
+
+
+@pytest.mark.parametrize(
+    "backend",
+    [InMemoryCacheBackend(max_size=10), KeyValueCacheBackend(FakeKeyValueClient())],
+)
+def test_page_read_before_invalidate_is_not_served(backend) -> None:
+    cache = LinksCache(backend, ttl=60)
+    stale = LinksPage(links=[LinkRecord(id=1, url="https://example.com/")], size=1)
+    # Чтение из БД началось до удаления ссылки, а запись в кэш произошла после.
+    version = cache.version(1)
+    cache.invalidate(1)
+    cache.set(1, version, stale)
+
+    assert cache.get(1, cache.version(1)) is None
+
+
+def test_add_does_not_overwrite_live_key() -> None:
+    clock = FakeClock()
+    backend = InMemoryCacheBackend(max_size=10, clock=clock)
+    assert backend.add("a", b"1", ttl=10) is True
+    assert backend.add("a", b"2", ttl=10) is False
+    assert backend.get("a") == b"1"
+    clock.now = 10
+    assert backend.add("a", b"3", ttl=10) is True
+    assert backend.get("a") == b"3"
+
+
+def test_create_links_cache_defaults_to_memory() -> None:
+    cache = create_links_cache(CacheSettings(max_size=3, ttl_seconds=10))
+    assert isinstance(cache.backend, InMemoryCacheBackend)
+    assert cache.backend.max_size == 3
+    assert cache.ttl == 10
+
+
+def test_create_links_cache_requires_url_for_redis() -> None:
+    with pytest.raises(ValueError, match="LINKS_CACHE_URL"):
+        create_links_cache(CacheSettings(backend="redis"))
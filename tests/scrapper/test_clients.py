@@ -188,14 +188,26 @@ from typing import Optional
 
 import pytest
 
-from src.scrapper.clients import BaseClient, GitHubClient, StackOverflowClient
+from src.scrapper.clients import (
+    CLIENT_REQUEST_SECONDS,
+    RATE_LIMIT_REMAINING,
+    BaseClient,
+    GitHubClient,
+    StackOverflowClient,
+)
 from src.scrapper.update_checker import UpdateChecker
 
 
 class FakeResponse:
-    def __init__(self, status: int, json_data: Optional[dict] = None) -> None:
+    def __init__(
+        self,
+        status: int,
+        json_data: Optional[dict] = None,
+        headers: Optional[dict] = None,
+    ) -> None:
         self.status = status
         self._json_data = json_data or {}
+        self.headers = headers or {}
 
     async def __aenter__(self):
         return self
@@ -259,6 +271,7 @@ async def fake_get_github_new_updates(url, **kwargs):
     if "pulls" in url:
         pr = {
             "created_at": "2023-03-10T10:00:00Z",
+            "id": 101,
             "title": "New PR Title",
             "user": {"login": "pr_user"},
             "body": "This is the PR description body " * 10,
@@ -266,6 +279,7 @@ async def fake_get_github_new_updates(url, **kwargs):
         return FakeResponse(200, [pr])
     elif "issues" in url:
         issue = {
+            "id": 202,
             "created_at": "2023-03-11T10:00:00Z",
             "title": "New Issue Title",
             "user": {"login": "issue_user"},
@@ -297,6 +311,8 @@ async def test_github_get_new_updates_with_updates() -> None:
     assert issue_update is not None
     assert pr_update.title == "New PR Title"
     assert pr_update.username == "pr_user"
+    assert pr_update.event_id == "pr:101"
+    assert issue_update.event_id == "issue:202"
     assert len(pr_update.preview) <= 200
 
 
@@ -305,6 +321,7 @@ async def fake_get_stackoverflow_new_updates(url, **kwargs):
         return FakeResponse(200, {"items": [{"title": "Test Question Title"}]})
     elif "answers" in url:
         answer = {
+            "answer_id": 303,
             "creation_date": 1678052800,
             "owner": {"display_name": "answer_user"},
             "body": "This is the answer body " * 20,
@@ -312,6 +329,7 @@ async def fake_get_stackoverflow_new_updates(url, **kwargs):
         return FakeResponse(200, {"items": [answer]})
     elif "comments" in url:
         comment = {
+            "comment_id": 404,
             "creation_date": 1678052900,
             "owner": {"display_name": "comment_user"},
             "body": "This is the comment body " * 20,
@@ -341,6 +359,8 @@ async def test_stackoverflow_get_new_updates_with_updates() -> None:
     assert comment_update is not None
     assert answer_update.title == "Test Question Title"
     assert answer_update.username == "answer_user"
+    assert answer_update.event_id == "answer:303"
+    assert comment_update.event_id == "comment:404"
     assert len(answer_update.preview) <= 200
 
 @pytest.mark.asyncio
@@ -369,3 +389,38 @@ async def test_update_checker_unknown_url() -> None:
     last_check = datetime.fromisoformat("2023-03-01T00:00:00+00:00")
     updates = await checker.get_new_updates(url, last_check)
     assert updates == []
+
+
+@pytest.mark.asyncio
+async def test_client_requests_are_measured_per_host_and_status() -> None:
+    async def fake_get(url, **kwargs):
+        return FakeResponse(200, [], {"X-RateLimit-Remaining": "4999"})
+
+    session = FakeSession(fake_get)
+    client = GitHubClient(session)
+    before = CLIENT_REQUEST_SECONDS.count(host="api.github.com", status="200")
+
+    await client.get_new_updates(
+        "https://github.com/owner/repo",
+        datetime.fromisoformat("2023-03-01T00:00:00+00:00"),
+        {"PR"},
+    )
+
+    assert CLIENT_REQUEST_SECONDS.count(host="api.github.com", status="200") == before + 1
+    assert RATE_LIMIT_REMAINING.value(host="api.github.com") == 4999
+
+
+@pytest.mark.asyncio
+async def test_stackoverflow_quota_is_recorded() -> None:
+    async def fake_get(url, **kwargs):
+        return FakeResponse(200, {"items": [], "quota_remaining": 297})
+
+    session = FakeSession(fake_get)
+    client = StackOverflowClient(session)
+
+    await client.get_new_updates(
+        "https://stackoverflow.com/questions/1234567/title",
+        datetime.fromisoformat("2023-03-01T00:00:00+00:00"),
+    )
+
+    assert RATE_LIMIT_REMAINING.value(host="api.stackexchange.com") == 297
@@ -1,6 +1,10 @@
+from datetime import datetime, timezone
+
 import pytest
-from sqlalchemy import text
+from sqlalchemy import event, text
 
+from src.database import UPDATE_ID_BLOCK
+from src.scrapper.models import Watermark
 from src.scrapper.storage import ORMStorage, SQLStorage, StorageInterface
 
 
@@ -16,7 +20,8 @@ def storage(request, postgres_container) -> StorageInterface:
     with engine.connect() as conn:
         conn.execute(
             text(
-                "TRUNCATE TABLE link_filters, link_tags, links, tags, chats RESTART IDENTITY CASCADE",
+                "TRUNCATE TABLE link_filters, link_tags, links, resources, tags, chats "
+                "RESTART IDENTITY CASCADE",
             ),
         )
         conn.commit()
@@ -26,17 +31,27 @@ def test_add_and_get_chat(storage: StorageInterface) -> None:
     chat = storage.get_chat(1)
     assert chat is None
 
-    storage.add_chat(1)
+    assert storage.add_chat(1) is True
     chat = storage.get_chat(1)
     assert chat is not None
     assert chat.chat_id == 1
 
-    storage.add_chat(1)
+    assert storage.add_chat(1) is True
     chat = storage.get_chat(1)
     assert chat is not None
     assert chat.chat_id == 1
 
 
+def test_get_chat_returns_links(storage: StorageInterface) -> None:
+    storage.add_chat(1)
+    storage.add_link(1, "https://example.com/", ["tag1"], ["filter1"])
+    chat = storage.get_chat(1)
+    assert chat is not None
+    assert [(str(link.url), link.tags, link.filters) for link in chat.links] == [
+        ("https://example.com/", ["tag1"], ["filter1"]),
+    ]
+
+
 def test_remove_chat(storage: StorageInterface) -> None:
     result = storage.remove_chat(999)
     assert result is False
@@ -59,6 +74,8 @@ def test_add_link_success(storage: StorageInterface) -> None:
     assert str(result.url) == "https://example.com/"
     assert set(result.tags) == {"tag1", "tag2"}
     assert set(result.filters) == {"filter1"}
+    # Ответ POST /links сериализуется без предупреждений o типе url.
+    result.model_dump_json(warnings="error")
 
 
 def test_add_duplicate_link(storage: StorageInterface) -> None:
@@ -69,6 +86,40 @@ def test_add_duplicate_link(storage: StorageInterface) -> None:
     assert duplicate is None
 
 
+def test_add_link_deduplicates_tags(storage: StorageInterface) -> None:
+    storage.add_chat(1)
+    storage.add_link(1, "https://example.org/", ["shared"], [])
+    result = storage.add_link(1, "https://example.com/", ["b", "a", "b", "shared"], ["f", "f"])
+    assert result is not None
+    assert sorted(result.tags) == ["a", "b", "shared"]
+    assert result.filters == ["f"]
+
+
+def test_sql_add_link_is_single_statement(postgres_container) -> None:
+    storage = SQLStorage(postgres_container)
+    storage.add_chat(1)
+    statements = []
+
+    def count_statement(*_args) -> None:
+        statements.append(_args[2])
+
+    event.listen(storage.engine, "before_cursor_execute", count_statement)
+    try:
+        assert storage.add_link(1, "https://example.com/", ["t1", "t2"], ["f1"]) is not None
+        assert storage.add_link(1, "https://example.com/", ["t1"], []) is None
+    finally:
+        event.remove(storage.engine, "before_cursor_execute", count_statement)
+        with storage.engine.connect() as conn:
+            conn.execute(
+                text(
+                    "TRUNCATE TABLE link_filters, link_tags, links, resources, tags, filters, "
+                    "chats RESTART IDENTITY CASCADE",
+                ),
+            )
+            conn.commit()
+    assert len(statements) == 2
+
+
 def test_remove_link_non_existing_chat(storage: StorageInterface) -> None:
     result = storage.remove_link(999, "https://example.com/")
     assert result is None
@@ -93,6 +144,47 @@ def test_remove_link_success(storage: StorageInterface) -> None:
     assert removed_again is None
 
 
+def test_remove_link_returns_tags_and_cascades(storage: StorageInterface) -> None:
+    storage.add_chat(1)
+    storage.add_link(1, "https://example.com/", ["tag1", "tag2"], ["filter1"])
+
+    removed = storage.remove_link(1, "https://example.com/")
+    assert removed is not None
+    assert sorted(removed.tags) == ["tag1", "tag2"]
+    assert removed.filters == ["filter1"]
+
+    with storage.engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM link_tags")).scalar_one() == 0
+        assert conn.execute(text("SELECT count(*) FROM link_filters")).scalar_one() == 0
+
+
+def test_remove_chat_with_links_is_single_statement(storage: StorageInterface) -> None:
+    storage.add_chat(1)
+    storage.add_chat(2)
+    for i in range(20):
+        storage.add_link(1, f"https://example.com/{i}", ["tag"], ["filter"])
+    storage.add_link(2, "https://example.com/0", [], [])
+    statements = []
+
+    def count_statement(*_args) -> None:
+        statements.append(_args[2])
+
+    event.listen(storage.engine, "before_cursor_execute", count_statement)
+    try:
+        assert storage.remove_chat(1) is True
+    finally:
+        event.remove(storage.engine, "before_cursor_execute", count_statement)
+    assert len(statements) == 1
+
+    assert storage.get_chat(1) is None
+    assert storage.get_links(1).size == 0
+    assert [str(resource.url) for resource in storage.get_resources()] == [
+        "https://example.com/0",
+    ]
+    with storage.engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM link_tags")).scalar_one() == 0
+
+
 def test_get_links_non_existing_chat(storage: StorageInterface) -> None:
     links_resp = storage.get_links(999)
     assert links_resp.size == 0
@@ -109,24 +201,141 @@ def test_get_links_success(storage: StorageInterface) -> None:
     assert urls == {"https://example.com/", "https://example.org/"}
 
 
-def test_get_all_unique_links_chat_ids(storage: StorageInterface) -> None:
+def test_get_resources_deduplicates_links(storage: StorageInterface) -> None:
     storage.add_chat(1)
     storage.add_chat(2)
     storage.add_chat(3)
-    storage.add_link(1, "https://example.com/", ["tag1"], ["filter1"])
-    storage.add_link(1, "https://example.org/", ["tag1"], ["filter1"])
-    storage.add_link(2, "https://example.com/", ["tag2"], ["filter2"])
-    storage.add_link(2, "https://example.net", ["tag2"], ["filter2"])
-    storage.add_link(3, "https://example.org/", ["tag3"], ["filter3"])
-    storage.add_link(3, "https://example.net", ["tag3"], ["filter3"])
-    storage.add_link(3, "https://example.info", ["tag3"], ["filter3"])
-
-    expected = [
-        ("https://example.com/", {1, 2}),
-        ("https://example.org/", {1, 3}),
-        ("https://example.net", {2, 3}),
-        ("https://example.info", {3}),
+    storage.add_link(1, "https://github.com/Owner/Repo", ["tag1"], ["filter1"])
+    storage.add_link(2, "https://github.com/owner/repo/pulls", ["tag2"], ["filter2"])
+    storage.add_link(2, "https://stackoverflow.com/questions/123/title", [], [])
+    storage.add_link(3, "https://stackoverflow.com/questions/123", [], [])
+    storage.add_link(3, "https://example.net/", [], [])
+
+    resources = {str(resource.url): resource for resource in storage.get_resources()}
+    assert set(resources) == {
+        "https://github.com/owner/repo",
+        "https://stackoverflow.com/questions/123",
+        "https://example.net/",
+    }
+    github = resources["https://github.com/owner/repo"]
+    assert github.platform == "github"
+    assert github.subscribers_count == 2
+    assert set().union(*storage.get_resource_subscribers(github.id).values()) == {1, 2}
+    stackoverflow = resources["https://stackoverflow.com/questions/123"]
+    assert stackoverflow.platform == "stackoverflow"
+    assert set().union(*storage.get_resource_subscribers(stackoverflow.id).values()) == {2, 3}
+    assert resources["https://example.net/"].platform is None
+
+
+def test_get_resource_subscribers_groups_by_filters(storage: StorageInterface) -> None:
+    for chat_id in (1, 2, 3, 4):
+        storage.add_chat(chat_id)
+    storage.add_link(1, "https://github.com/owner/repo", [], ["type=PR", "user=bot"])
+    storage.add_link(2, "https://github.com/owner/repo", [], ["user=bot", "type=PR"])
+    storage.add_link(3, "https://github.com/owner/repo", [], [])
+    storage.add_link(4, "https://github.com/owner/repo", [], ["type=Issue"])
+
+    [resource] = storage.get_resources()
+    assert storage.get_resource_subscribers(resource.id) == {
+        ("type=PR", "user=bot"): {1, 2},
+        (): {3},
+        ("type=Issue",): {4},
+    }
+
+
+def test_get_resource_update_types(storage: StorageInterface) -> None:
+    for chat_id in (1, 2, 3):
+        storage.add_chat(chat_id)
+    storage.add_link(1, "https://github.com/owner/repo", [], ["user=bot", "type=PR"])
+    storage.add_link(2, "https://github.com/owner/repo", [], ["type!=PR", "type!=Answer"])
+    storage.add_link(3, "https://stackoverflow.com/questions/1", [], ["type=Answer"])
+
+    github, stackoverflow = storage.get_resources()
+    assert storage.get_resource_update_types([github.id, stackoverflow.id]) == {
+        github.id: {"PR", "Issue", "Comment"},
+        stackoverflow.id: {"Answer"},
+    }
+    assert storage.get_resource_update_types([]) == {}
+
+    # Сводка следует за подписками: удаление ссылки и чата убирает их типы.
+    storage.remove_link(2, "https://github.com/owner/repo")
+    storage.remove_chat(3)
+    assert storage.get_resource_update_types([github.id, stackoverflow.id]) == {
+        github.id: {"PR"},
+    }
+
+
+def test_save_watermark(storage: StorageInterface) -> None:
+    storage.add_chat(1)
+    storage.add_link(1, "https://github.com/owner/repo", [], [])
+    [resource] = storage.get_resources()
+    assert resource.watermark is None
+
+    checked_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    watermark = Watermark(checked_at=checked_at, event_id="pr:2", seen_ids=["pr:1", "pr:2"])
+    storage.save_watermark(resource.id, watermark)
+
+    [resource] = storage.get_resources()
+    assert resource.watermark == watermark
+
+
+def test_reserve_update_ids_returns_disjoint_blocks(storage: StorageInterface) -> None:
+    first = storage.reserve_update_ids()
+    second = storage.reserve_update_ids()
+
+    assert len(first) == len(second) == UPDATE_ID_BLOCK
+    assert not set(first) & set(second)
+
+
+def test_get_resources_tracks_unsubscribes(storage: StorageInterface) -> None:
+    storage.add_chat(1)
+    storage.add_chat(2)
+    storage.add_link(1, "https://github.com/owner/repo", [], [])
+    storage.add_link(2, "https://github.com/owner/repo", [], [])
+
+    storage.remove_link(1, "https://github.com/owner/repo")
+    [resource] = storage.get_resources()
+    assert resource.subscribers_count == 1
+    assert set().union(*storage.get_resource_subscribers(resource.id).values()) == {2}
+
+    storage.remove_link(2, "https://github.com/owner/repo")
+    assert storage.get_resources() == []
+
+
+def test_get_resources_pagination(storage: StorageInterface) -> None:
+    storage.add_chat(1)
+    for number in range(5):
+        storage.add_link(1, f"https://github.com/owner/repo{number}", [], [])
+
+    first_page = storage.get_resources(limit=2)
+    second_page = storage.get_resources(after_id=first_page[-1].id, limit=10)
+    assert len(first_page) == 2
+    assert len(second_page) == 3
+    urls = {str(resource.url) for resource in first_page + second_page}
+    assert urls == {f"https://github.com/owner/repo{number}" for number in range(5)}
+
+
+def test_get_links_pagination_and_tag(storage: StorageInterface) -> None:
+    storage.add_chat(1)
+    storage.add_chat(2)
+    for i in range(5):
+        storage.add_link(1, f"https://example.com/{i}", ["odd"] if i % 2 else [], [])
+    storage.add_link(2, "https://example.com/other", ["odd"], [])
+
+    first = storage.get_links(1, limit=2)
+    assert [str(link.url) for link in first.links] == [
+        "https://example.com/0",
+        "https://example.com/1",
     ]
+    assert first.next_cursor is not None
+
+    rest = storage.get_links(1, limit=10, after_id=first.links[-1].id)
+    assert rest.size == 3
+    assert rest.next_cursor is None
 
-    for ind, (url, chat_ids) in enumerate(storage.get_all_unique_links_chat_ids()):
-        assert url, chat_ids == expected[ind]
+    odd = storage.get_links(1, tag="odd")
+    assert [str(link.url) for link in odd.links] == [
+        "https://example.com/1",
+        "https://example.com/3",
+    ]
+    assert odd.links[0].tags == ["odd"]
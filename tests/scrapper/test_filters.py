@@ -0,0 +1,95 @@
+from datetime import datetime
+
+import pytest
+
+from src.scrapper.filters import (
+    MAX_PATTERN_LENGTH,
+    compile_filters,
+    parse_filter,
+    validate_filters,
+    wanted_update_types,
+)
+from src.scrapper.models import UPDATE_TYPES, UpdateDetail
+
+
+def make_update(**overrides) -> UpdateDetail:
+    values = {
+        "platform": "GitHub",
+        "update_type": "PR",
+        "title": "Fix flaky test",
+        "username": "dependabot",
+        "created_at": datetime(2024, 1, 1),
+        "preview": "Bumps the version",
+        "event_id": "pr:1",
+    }
+    return UpdateDetail(**{**values, **overrides})
+
+
+@pytest.mark.parametrize(
+    ("filters", "expected"),
+    [
+        ((), True),
+        (("type=pr",), True),
+        (("type=Issue",), False),
+        (("type=Issue", "type=PR"), True),
+        (("user!=dependabot",), False),
+        (("title~flaky",), True),
+        (("title~^Bump",), False),
+        (("type=PR", "user=someone"), False),
+        (("platform=github", "preview~version", "user!=bot"), True),
+    ],
+)
+def test_compiled_filter_matches(filters, expected) -> None:
+    assert compile_filters(filters).matches(make_update()) is expected
+
+
+def test_invalid_filters_are_ignored() -> None:
+    assert compile_filters(("important", "size=big", "title~(")).matches(make_update())
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        "important",
+        "size=big",
+        "title~(",
+        "title~" + "a" * (MAX_PATTERN_LENGTH + 1),
+        "title~(a+)+b",
+        "preview~((x)*)*",
+        "title~(?:a|b+)*",
+    ],
+)
+def test_parse_filter_rejects_invalid(raw) -> None:
+    with pytest.raises(ValueError):
+        parse_filter(raw)
+
+
+@pytest.mark.parametrize("raw", ["title~(ab)+", "title~a+b+", "title~x{2}(a+)?", "title~(a|b)*"])
+def test_parse_filter_accepts_repeats_without_nesting(raw) -> None:
+    parse_filter(raw)
+
+
+def test_validate_filters_reports_first_error() -> None:
+    validate_filters(["type=PR", "user!=bot"])
+    with pytest.raises(ValueError, match="size"):
+        validate_filters(["type=PR", "size=big"])
+
+
+def test_compile_filters_is_cached() -> None:
+    assert compile_filters(("type=PR",)) is compile_filters(("type=PR",))
+
+
+@pytest.mark.parametrize(
+    ("filter_sets", "expected"),
+    [
+        ([()], {"PR", "Issue", "Answer", "Comment"}),
+        ([("type=PR", "user=bot")], {"PR"}),
+        ([("type=pr",), ("type~^(answer|comment)$",)], {"PR", "Answer", "Comment"}),
+        ([("type!=Comment", "type!=Issue")], {"PR", "Answer"}),
+        ([("user=bot",)], {"PR", "Issue", "Answer", "Comment"}),
+        ([("type=Wiki",)], set()),
+        ([], set()),
+    ],
+)
+def test_wanted_update_types(filter_sets, expected) -> None:
+    assert wanted_update_types(filter_sets, UPDATE_TYPES) == expected
@@ -0,0 +1,50 @@
+from datetime import UTC, datetime, timedelta
+
+from src.scrapper.freshness import UPDATE_LAG_SECONDS, FreshnessSample, FreshnessTracker
+
+START = datetime(2024, 1, 1, tzinfo=UTC)
+
+
+def make_sample(resource_id, lag_seconds, platform="GitHub"):
+    delivered_at = START + timedelta(seconds=lag_seconds)
+    return FreshnessSample(
+        resource_id=resource_id,
+        url=f"https://github.com/owner/repo{resource_id}",
+        platform=platform,
+        update_type="PR",
+        event_id=f"pr:{resource_id}",
+        created_at=START,
+        detected_at=START + timedelta(seconds=lag_seconds / 2),
+        sent_to_bot_at=delivered_at - timedelta(seconds=1),
+        delivered_at=delivered_at,
+    )
+
+
+def test_stages_add_up_to_total() -> None:
+    stages = make_sample(1, 60).stages
+    assert stages == {"detection": 30, "dispatch": 29, "delivery": 1, "total": 60}
+
+
+def test_worst_returns_latest_sample_per_resource() -> None:
+    tracker = FreshnessTracker()
+    tracker.record(make_sample(1, 600))
+    tracker.record(make_sample(2, 30))
+    tracker.record(make_sample(3, 120))
+    tracker.record(make_sample(1, 10))
+
+    assert [sample.resource_id for sample in tracker.worst(2)] == [3, 2]
+
+
+def test_tracker_is_bounded() -> None:
+    tracker = FreshnessTracker(max_size=2)
+    for resource_id in range(3):
+        tracker.record(make_sample(resource_id, 60))
+
+    assert len(tracker) == 2
+    assert {sample.resource_id for sample in tracker.worst(10)} == {1, 2}
+
+
+def test_stage_histograms_are_observed_per_platform() -> None:
+    before = UPDATE_LAG_SECONDS.count(platform="StackOverflow", stage="detection")
+    FreshnessTracker().record(make_sample(1, 60, platform="StackOverflow"))
+    assert UPDATE_LAG_SECONDS.count(platform="StackOverflow", stage="detection") == before + 1
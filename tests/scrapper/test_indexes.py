@@ -0,0 +1,103 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.scrapper.storage import SQLStorage
+
+
+def collect_index_names(plan: dict) -> set[str]:
+    names = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        names |= collect_index_names(child)
+    return names
+
+
+@pytest.fixture(scope="module")
+def engine(postgres_container):
+    storage = SQLStorage(postgres_container)
+    storage.add_chat(1)
+    storage.add_chat(2)
+    storage.add_link(1, "https://example.com/", ["tag1"], ["filter1"])
+    storage.add_link(2, "https://example.com/", ["tag2"], ["filter2"])
+    storage.add_link(2, "https://example.org/", ["tag1"], [])
+    engine = create_engine(postgres_container)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE links, link_tags, link_filters, resources"))
+    yield engine
+    with engine.connect() as conn:
+        conn.execute(
+            text(
+                "TRUNCATE TABLE link_filters, link_tags, links, resources, tags, chats "
+                "RESTART IDENTITY CASCADE",
+            ),
+        )
+        conn.commit()
+
+
+@pytest.mark.parametrize(
+    ("query", "params", "index_name"),
+    [
+        (
+            "SELECT chat_id, url FROM links WHERE chat_id = :chat_id AND url = :url",
+            {"chat_id": 1, "url": "https://example.com/"},
+            "ux_links_chat_id_url",
+        ),
+        (
+            "SELECT url, array_agg(chat_id) AS chat_ids FROM links GROUP BY url",
+            {},
+            "ix_links_url",
+        ),
+        (
+            "SELECT id FROM links WHERE chat_id = :chat_id AND id > :after_id ORDER BY id LIMIT 2",
+            {"chat_id": 2, "after_id": 0},
+            "ix_links_chat_id_id",
+        ),
+        (
+            "SELECT link_id FROM link_tags WHERE tag_id = :tag_id",
+            {"tag_id": 1},
+            "ix_link_tags_tag_id",
+        ),
+        (
+            "SELECT link_id FROM link_filters WHERE filter_id = :filter_id",
+            {"filter_id": 1},
+            "ix_link_filters_filter_id",
+        ),
+        (
+            "SELECT chat_id FROM links WHERE resource_id = :resource_id",
+            {"resource_id": 1},
+            "ix_links_resource_id",
+        ),
+        (
+            "SELECT id, url FROM resources WHERE subscribers_count > 0 AND id > :after_id "
+            "ORDER BY id LIMIT 500",
+            {"after_id": 0},
+            "ix_resources_active",
+        ),
+        (
+            "SELECT tag_id FROM link_tags WHERE link_id = :link_id",
+            {"link_id": 1},
+            "link_tags_pkey",
+        ),
+        (
+            "SELECT filter_id FROM link_filters WHERE link_id = :link_id",
+            {"link_id": 1},
+            "link_filters_pkey",
+        ),
+    ],
+)
+def test_hot_lookups_use_indexes(engine, query: str, params: dict, index_name: str) -> None:
+    with engine.connect() as conn:
+        # Таблицы в тесте крошечные, поэтому запрещаем seq scan,
+        # чтобы проверить, что для запроса вообще есть подходящий индекс.
+        conn.execute(text("SET enable_seqscan = off"))
+        plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {query}"), params).scalar_one()
+    assert index_name in collect_index_names(plan[0]["Plan"])
+
+
+def test_duplicate_link_is_rejected_by_unique_index(engine) -> None:
+    with engine.connect() as conn, pytest.raises(Exception, match="ux_links_chat_id_url"):
+        conn.execute(
+            text(
+                "INSERT INTO links (chat_id, url, resource_id) "
+                "VALUES (1, 'https://example.com/', 1)",
+            ),
+        )
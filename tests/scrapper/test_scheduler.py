@@ -1,20 +1,95 @@
-from datetime import datetime, timedelta
+from datetime import UTC, datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from src.scrapper.scheduler import UpdateScheduler
+from src.scrapper.filters import wanted_update_types
+from src.scrapper.freshness import UPDATE_LAG_SECONDS
+from src.scrapper.models import (
+    UPDATE_TYPES,
+    WATERMARK_LOOKBACK,
+    ResourceInfo,
+    UpdateDetail,
+    Watermark,
+)
+from src.scrapper.scheduler import (
+    CYCLE_LAG_SECONDS,
+    CYCLE_SECONDS,
+    LINKS_CHECKED,
+    UPDATES_EMITTED,
+    UPDATES_DEAD_LETTERED,
+    UpdateScheduler,
+)
+from src.scrapper.sender import DeliveryResult
+
+START = datetime(2024, 1, 1, tzinfo=UTC)
+DELIVERED, RETRY, REJECTED = DeliveryResult.DELIVERED, DeliveryResult.RETRY, DeliveryResult.REJECTED
+
+
+def make_update(update_type="PR", *, seconds=10, event_id=None, username="user1", title="Test"):
+    return UpdateDetail(
+        platform="GitHub",
+        update_type=update_type,
+        title=title,
+        username=username,
+        created_at=START + timedelta(seconds=seconds),
+        preview="Preview text",
+        event_id=event_id or f"{update_type.lower()}:{seconds}",
+    )
 
 
 class FakeStorage:
     def __init__(self) -> None:
-        self._links = {
-            "https://github.com/test/repo": {123},
-            "https://stackoverflow.com/questions/12345/test": {456},
-        }
+        watermark = Watermark(checked_at=START)
+        self._resources = [
+            ResourceInfo(
+                id=1,
+                url="https://github.com/test/repo",
+                subscribers_count=1,
+                watermark=watermark,
+            ),
+            ResourceInfo(
+                id=2,
+                url="https://stackoverflow.com/questions/12345",
+                subscribers_count=1,
+                watermark=watermark,
+            ),
+        ]
+        self._chat_ids = {1: {123}, 2: {456}}
+        self._subscribers = {}
+        self.chat_ids_requests = []
+        self.watermarks = {}
+        self.reserved_blocks = 0
+
+    def get_resources(self, after_id=0, limit=500):
+        return [resource for resource in self._resources if resource.id > after_id][:limit]
+
+    def save_watermark(self, resource_id, watermark):
+        self.watermarks[resource_id] = watermark
+        self._resources = [
+            resource.model_copy(update={"watermark": watermark})
+            if resource.id == resource_id
+            else resource
+            for resource in self._resources
+        ]
+
+    def reserve_update_ids(self):
+        start = 1 + self.reserved_blocks * 2
+        self.reserved_blocks += 1
+        return range(start, start + 2)
+
+    def get_resource_subscribers(self, resource_id):
+        self.chat_ids_requests.append(resource_id)
+        return self._subscribers.get(resource_id) or {(): self._chat_ids[resource_id]}
 
-    def get_all_unique_links_chat_ids(self):
-        yield from self._links.items()
+    def get_resource_update_types(self, resource_ids):
+        return {
+            resource_id: wanted_update_types(
+                self._subscribers.get(resource_id) or {(): None},
+                UPDATE_TYPES,
+            )
+            for resource_id in resource_ids
+        }
 
 @pytest.fixture
 def storage():
@@ -30,6 +105,14 @@ def update_checker():
 def scheduler(storage, update_checker):
     return UpdateScheduler(storage, update_checker, "http://test.com")
 
+
+def github_only(*updates):
+    async def fake_get_new_updates(url, last_check, update_types=None):
+        return list(updates) if "github" in str(url) else []
+
+    return fake_get_new_updates
+
+
 @pytest.mark.asyncio
 async def test_start_stop_scheduler(scheduler) -> None:
     await scheduler.start(check_interval=1)
@@ -42,51 +125,36 @@ async def test_start_stop_scheduler(scheduler) -> None:
 
 @pytest.mark.asyncio
 async def test_check_updates_with_new_updates(scheduler, update_checker) -> None:
-    update_detail1 = MagicMock()
-    update_detail1.platform = "GitHub"
-    update_detail1.update_type = "PR"
-    update_detail1.title = "Test PR"
-    update_detail1.username = "user1"
-    update_detail1.created_at = datetime.now() + timedelta(seconds=10)
-    update_detail1.preview = "Preview text 1"[:200]
-
-    update_detail2 = MagicMock()
-    update_detail2.platform = "GitHub"
-    update_detail2.update_type = "Issue"
-    update_detail2.title = "Test Issue"
-    update_detail2.username = "user2"
-    update_detail2.created_at = datetime.now() + timedelta(seconds=20)
-    update_detail2.preview = "Preview text 2"[:200]
+    update_detail1 = make_update("PR", seconds=10)
+    update_detail2 = make_update("Issue", seconds=20)
 
-    update_checker.get_new_updates.return_value = [update_detail1, update_detail2]
+    update_checker.get_new_updates.return_value = [update_detail2, update_detail1]
 
-    scheduler._last_check["https://github.com/test/repo"] = datetime.now()
-
-    with patch("src.scrapper.sender.NotificationSender.send_update_notification", new=AsyncMock()) as mock_sender:
+    with patch("src.scrapper.sender.NotificationSender.send_update_notification", new=AsyncMock(return_value=DELIVERED)) as mock_sender:
         await scheduler._check_all_links()
 
         assert mock_sender.call_count == 4
-        expected_last_check = max(update_detail1.created_at, update_detail2.created_at)
-        assert scheduler._last_check["https://github.com/test/repo"] == expected_last_check
+        watermark = scheduler.storage.watermarks[1]
+        assert watermark.checked_at == update_detail2.created_at
+        assert watermark.event_id == update_detail2.event_id
+        assert watermark.seen_ids == [update_detail1.event_id, update_detail2.event_id]
 
 @pytest.mark.asyncio
 async def test_no_notification_on_first_check(scheduler, update_checker) -> None:
-    update_detail = MagicMock()
-    update_detail.platform = "GitHub"
-    update_detail.update_type = "PR"
-    update_detail.title = "Test PR"
-    update_detail.username = "user1"
-    update_detail.created_at = datetime.now() + timedelta(seconds=10)
-    update_detail.preview = "Preview text"[:200]
-
-    update_checker.get_new_updates.return_value = [update_detail]
+    scheduler.storage._resources[0] = scheduler.storage._resources[0].model_copy(
+        update={"watermark": None},
+    )
+    update_checker.get_new_updates.side_effect = github_only(make_update())
 
-    if "https://github.com/test/repo" in scheduler._last_check:
-        del scheduler._last_check["https://github.com/test/repo"]
-
-    with patch("src.scrapper.sender.NotificationSender.send_update_notification", new=AsyncMock()):
+    with patch("src.scrapper.sender.NotificationSender.send_update_notification", new=AsyncMock(return_value=DELIVERED)) as mock_sender:
         await scheduler._check_all_links()
-        assert scheduler._last_check["https://github.com/test/repo"] == update_detail.created_at
+
+    assert mock_sender.call_count == 0
+    assert [str(call.args[0]) for call in update_checker.get_new_updates.call_args_list] == [
+        "https://stackoverflow.com/questions/12345",
+    ]
+    assert scheduler.storage.watermarks[1].checked_at > START
+    assert scheduler.storage.watermarks[1].seen_ids == []
 
 @pytest.mark.asyncio
 async def test_handle_check_updates_error(scheduler, update_checker) -> None:
@@ -94,5 +162,276 @@ async def test_handle_check_updates_error(scheduler, update_checker) -> None:
 
     await scheduler._check_all_links()
 
-    for url, _ in scheduler.storage.get_all_unique_links_chat_ids():
-        assert url not in scheduler._last_check
+    assert scheduler.storage.watermarks == {}
+
+
+@pytest.mark.asyncio
+async def test_chat_ids_loaded_only_for_updated_resources(scheduler, update_checker) -> None:
+    update_checker.get_new_updates.side_effect = github_only(make_update())
+
+    with patch("src.scrapper.sender.NotificationSender.send_update_notification", new=AsyncMock(return_value=DELIVERED)) as mock_sender:
+        await scheduler._check_all_links()
+
+    assert scheduler.storage.chat_ids_requests == [1]
+    assert mock_sender.call_count == 1
+    assert mock_sender.call_args.args[0].tg_chat_ids == [123]
+
+
+@pytest.mark.asyncio
+async def test_check_all_links_pages_through_resources(scheduler, update_checker, monkeypatch) -> None:
+    monkeypatch.setattr("src.scrapper.scheduler.RESOURCES_PAGE_SIZE", 1)
+    update_checker.get_new_updates.return_value = []
+
+    await scheduler._check_all_links()
+
+    assert update_checker.get_new_updates.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_updates_sent_only_to_matching_filter_groups(scheduler, update_checker) -> None:
+    scheduler.storage._subscribers[1] = {
+        ("type=PR",): {10, 11},
+        ("type=Issue", "user!=bot"): {20},
+        (): {30},
+    }
+    pr = make_update("PR", seconds=1, username="bot", title="Fix")
+    issue = make_update("Issue", seconds=2, username="bot", title="Bug")
+    update_checker.get_new_updates.side_effect = github_only(pr, issue)
+
+    with patch("src.scrapper.sender.NotificationSender.send_update_notification", new=AsyncMock(return_value=DELIVERED)) as mock_sender:
+        await scheduler._check_all_links()
+
+    sent = [call.args[0].tg_chat_ids for call in mock_sender.call_args_list]
+    assert sent == [[10, 11, 30], [30]]
+
+
+@pytest.mark.asyncio
+async def test_update_skipped_when_no_group_matches(scheduler, update_checker) -> None:
+    scheduler.storage._subscribers[1] = {("type=Issue",): {10}}
+    pr = make_update("PR", username="bot")
+    update_checker.get_new_updates.side_effect = github_only(pr)
+
+    with patch("src.scrapper.sender.NotificationSender.send_update_notification", new=AsyncMock(return_value=DELIVERED)) as mock_sender:
+        await scheduler._check_all_links()
+
+    assert mock_sender.call_count == 0
+    assert scheduler.storage.watermarks[1].checked_at == pr.created_at
+
+
+@pytest.mark.asyncio
+async def test_only_wanted_update_types_requested(scheduler, update_checker) -> None:
+    scheduler.storage._subscribers[1] = {("type=PR",): {10}, ("type!=PR", "type!=Issue"): {20}}
+    scheduler.storage._subscribers[2] = {("type=Answer",): {30}}
+    update_checker.get_new_updates.return_value = []
+
+    await scheduler._check_all_links()
+
+    requested = {
+        str(call.args[0]): set(call.args[2]) for call in update_checker.get_new_updates.call_args_list
+    }
+    assert requested == {
+        "https://github.com/test/repo": {"PR", "Answer", "Comment"},
+        "https://stackoverflow.com/questions/12345": {"Answer"},
+    }
+
+
+@pytest.mark.asyncio
+async def test_resource_not_fetched_when_no_type_wanted(scheduler, update_checker) -> None:
+    scheduler.storage._resources = scheduler.storage._resources[:1]
+    scheduler.storage._subscribers[1] = {("type=Release",): {10}, ("user=bot", "type=Wiki"): {20}}
+
+    await scheduler._check_all_links()
+
+    update_checker.get_new_updates.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_events_with_same_timestamp_sent_once(scheduler, update_checker) -> None:
+    first = make_update("PR", seconds=10, event_id="pr:1")
+    second = make_update("PR", seconds=10, event_id="pr:2")
+    update_checker.get_new_updates.side_effect = github_only(first)
+
+    with patch("src.scrapper.sender.NotificationSender.send_update_notification", new=AsyncMock(return_value=DELIVERED)) as mock_sender:
+        await scheduler._check_all_links()
+        # Событие c тем же временем появляется позже, вместе c уже отправленным.
+        update_checker.get_new_updates.side_effect = github_only(first, second)
+        await scheduler._check_all_links()
+        await scheduler._check_all_links()
+
+    assert mock_sender.call_count == 2
+    assert scheduler.storage.watermarks[1].seen_ids == ["pr:1", "pr:2"]
+    github_calls = update_checker.get_new_updates.call_args_list[::2]
+    assert github_calls[-1].args[1] == first.created_at - WATERMARK_LOOKBACK
+
+
+@pytest.mark.asyncio
+async def test_watermark_not_advanced_after_failed_send(scheduler, update_checker) -> None:
+    first = make_update("PR", seconds=10)
+    second = make_update("Issue", seconds=20)
+    update_checker.get_new_updates.side_effect = github_only(first, second)
+    sender = AsyncMock(side_effect=[DELIVERED, RETRY, DELIVERED])
+
+    with patch("src.scrapper.sender.NotificationSender.send_update_notification", new=sender):
+        await scheduler._check_all_links()
+        assert scheduler.storage.watermarks[1].seen_ids == [first.event_id]
+
+        await scheduler._check_all_links()
+
+    assert sender.call_count == 3
+    assert scheduler.storage.watermarks[1].seen_ids == [first.event_id, second.event_id]
+
+
+def test_watermark_seen_ids_are_bounded(monkeypatch) -> None:
+    monkeypatch.setattr("src.scrapper.models.SEEN_EVENTS_LIMIT", 3)
+    watermark = Watermark(checked_at=START)
+    for seconds in range(5):
+        watermark = watermark.advance(make_update(seconds=seconds))
+
+    assert watermark.seen_ids == ["pr:2", "pr:3", "pr:4"]
+    assert watermark.event_id == "pr:4"
+    assert not watermark.is_new(make_update(seconds=4))
+    assert not watermark.is_new(make_update(seconds=-600, event_id="pr:old"))
+    assert watermark.is_new(make_update(seconds=4, event_id="pr:other"))
+
+
+@pytest.mark.asyncio
+async def test_update_ids_taken_from_reserved_blocks(scheduler, update_checker) -> None:
+    update_checker.get_new_updates.side_effect = github_only(
+        *(make_update(seconds=seconds) for seconds in range(3)),
+    )
+
+    with patch("src.scrapper.sender.NotificationSender.send_update_notification", new=AsyncMock(return_value=DELIVERED)) as mock_sender:
+        await scheduler._check_all_links()
+
+    assert [call.args[0].id for call in mock_sender.call_args_list] == [1, 2, 3]
+    assert scheduler.storage.reserved_blocks == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_update_retried_with_same_id(scheduler, update_checker) -> None:
+    update_checker.get_new_updates.side_effect = github_only(make_update(seconds=1))
+    sender = AsyncMock(side_effect=[RETRY, DELIVERED])
+
+    with patch("src.scrapper.sender.NotificationSender.send_update_notification", new=sender):
+        await scheduler._check_all_links()
+        await scheduler._check_all_links()
+
+    assert [call.args[0].id for call in sender.call_args_list] == [1, 1]
+    assert scheduler._pending_updates == {}
+
+
+@pytest.mark.asyncio
+async def test_check_results_are_counted(scheduler, update_checker) -> None:
+    scheduler.storage._resources = [
+        scheduler.storage._resources[0].model_copy(update={"platform": "github"}),
+        scheduler.storage._resources[1].model_copy(update={"platform": "stackoverflow"}),
+    ]
+    scheduler.storage._subscribers[2] = {("type=Release",): {10}}
+    update_checker.get_new_updates.side_effect = Exception("Test error")
+    before = {
+        result: LINKS_CHECKED.value(platform=platform, result=result)
+        for platform, result in (("github", "failed"), ("stackoverflow", "skipped"))
+    }
+
+    await scheduler._check_all_links()
+
+    assert LINKS_CHECKED.value(platform="github", result="failed") == before["failed"] + 1
+    assert LINKS_CHECKED.value(platform="stackoverflow", result="skipped") == before["skipped"] + 1
+
+
+@pytest.mark.asyncio
+async def test_emitted_updates_are_counted(scheduler, update_checker) -> None:
+    update_checker.get_new_updates.side_effect = github_only(make_update("Issue"))
+    before = UPDATES_EMITTED.value(platform="GitHub", update_type="Issue")
+
+    with patch("src.scrapper.sender.NotificationSender.send_update_notification", new=AsyncMock(return_value=DELIVERED)):
+        await scheduler._check_all_links()
+
+    assert UPDATES_EMITTED.value(platform="GitHub", update_type="Issue") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_cycle_duration_and_lag_are_observed(scheduler, update_checker, monkeypatch) -> None:
+    update_checker.get_new_updates.return_value = []
+    cycles = CYCLE_SECONDS.count()
+    lags = CYCLE_LAG_SECONDS.count()
+
+    async def fake_sleep(delay) -> None:
+        if CYCLE_SECONDS.count() - cycles == 2:
+            scheduler._running = False
+
+    monkeypatch.setattr("src.scrapper.scheduler.asyncio.sleep", fake_sleep)
+    scheduler._running = True
+    await scheduler._check_loop(0)
+
+    assert CYCLE_SECONDS.count() == cycles + 2
+    assert CYCLE_LAG_SECONDS.count() == lags + 1
+
+
+@pytest.mark.asyncio
+async def test_freshness_timestamps_survive_redelivery(scheduler, update_checker) -> None:
+    update = make_update("PR", seconds=1)
+    update_checker.get_new_updates.side_effect = github_only(update)
+    sender = AsyncMock(side_effect=[RETRY, DELIVERED])
+    lags_before = UPDATE_LAG_SECONDS.count(platform="GitHub", stage="total")
+
+    with patch("src.scrapper.sender.NotificationSender.send_update_notification", new=sender):
+        await scheduler._check_all_links()
+        await scheduler._check_all_links()
+
+    first, retry = (call.args[0] for call in sender.call_args_list)
+    assert retry.platform == "GitHub"
+    assert retry.created_at == update.created_at
+    assert retry.detected_at == first.detected_at
+    assert retry.sent_to_bot_at > first.sent_to_bot_at
+    assert UPDATE_LAG_SECONDS.count(platform="GitHub", stage="total") == lags_before + 1
+
+    [sample] = scheduler.freshness.worst(10)
+    assert sample.resource_id == 1
+    assert sample.detected_at == first.detected_at
+    assert sample.delivered_at >= retry.sent_to_bot_at
+
+
+@pytest.mark.asyncio
+async def test_rejected_update_does_not_block_following_ones(scheduler, update_checker) -> None:
+    poison = make_update(seconds=10, event_id="pr:10")
+    good = make_update(seconds=20, event_id="pr:20")
+    update_checker.get_new_updates.side_effect = github_only(poison, good)
+    before = UPDATES_DEAD_LETTERED.value(platform="GitHub", reason="rejected")
+
+    async def bot(update):
+        return REJECTED if update.created_at == poison.created_at else DELIVERED
+
+    sender = AsyncMock(side_effect=bot)
+    with patch("src.scrapper.sender.NotificationSender.send_update_notification", new=sender):
+        await scheduler._check_all_links()
+        await scheduler._check_all_links()
+
+    assert [call.args[0].created_at for call in sender.call_args_list] == [
+        poison.created_at,
+        good.created_at,
+    ]
+    assert scheduler.storage.watermarks[1].event_id == good.event_id
+    assert scheduler._pending_updates == {}
+    assert UPDATES_DEAD_LETTERED.value(platform="GitHub", reason="rejected") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_retries_are_capped_per_event(storage, update_checker) -> None:
+    scheduler = UpdateScheduler(storage, update_checker, "http://test.com", max_delivery_attempts=2)
+    poison = make_update(seconds=10, event_id="pr:10")
+    good = make_update(seconds=20, event_id="pr:20")
+    update_checker.get_new_updates.side_effect = github_only(poison, good)
+
+    async def bot(update):
+        return RETRY if update.created_at == poison.created_at else DELIVERED
+
+    sender = AsyncMock(side_effect=bot)
+    with patch("src.scrapper.sender.NotificationSender.send_update_notification", new=sender):
+        for _ in range(3):
+            await scheduler._check_all_links()
+
+    sent = [(call.args[0].id, call.args[0].created_at) for call in sender.call_args_list]
+    assert sent == [(1, poison.created_at), (1, poison.created_at), (2, good.created_at)]
+    assert scheduler.storage.watermarks[1].event_id == good.event_id
+    assert scheduler._pending_updates == {}
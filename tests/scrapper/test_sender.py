@@ -1,9 +1,11 @@
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import orjson
 import pytest
 
 from src.models import LinkUpdate
-from src.scrapper.sender import NotificationSender
+from src.scrapper.sender import DeliveryResult, NotificationSender
+from src.tracing import TRACEPARENT, SpanContext
 
 
 class FakeAiohttpResponse:
@@ -20,6 +22,9 @@ class FakeAiohttpResponse:
     async def json(self):
         return self._json_data
 
+    async def read(self):
+        return orjson.dumps(self._json_data)
+
 
 @pytest.mark.asyncio
 async def test_send_update_notification_exception() -> None:
@@ -29,7 +34,7 @@ async def test_send_update_notification_exception() -> None:
         tgChatIds=[321],
         description="Test update exception",
     )
-    sender = NotificationSender("http://testbot.com")
+    sender = NotificationSender("http://testbot.com", retries=0)
     fake_session = AsyncMock()
     fake_session.post.side_effect = Exception("Test Exception")
 
@@ -42,3 +47,57 @@ async def test_send_update_notification_exception() -> None:
         await sender.send_update_notification(update)
 
         mock_logger.exception.assert_called_with("Error sending update notification")
+
+
+@pytest.mark.asyncio
+async def test_send_update_notification_posts_json_payload() -> None:
+    update = LinkUpdate(
+        id=4,
+        url="https://github.com/owner/repo",
+        tgChatIds=[1, 2],
+        description="payload",
+    )
+    sender = NotificationSender("http://testbot.com")
+    fake_session = MagicMock()
+    fake_session.post.return_value = FakeAiohttpResponse(200)
+
+    with patch("src.scrapper.sender.aiohttp.ClientSession") as mock_client_session:
+        fake_context_manager = MagicMock()
+        fake_context_manager.__aenter__.return_value = fake_session
+        mock_client_session.return_value = fake_context_manager
+
+        await sender.send_update_notification(update)
+
+    _, kwargs = fake_session.post.call_args
+    assert kwargs["headers"]["Content-Type"] == "application/json"
+    assert SpanContext.from_traceparent(kwargs["headers"][TRACEPARENT]) is not None
+    assert LinkUpdate.model_validate_json(kwargs["data"]) == update
+    assert '"tgChatIds":[1,2]' in kwargs["data"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("statuses", "expected", "attempts"),
+    [
+        ([500, 503, 200], DeliveryResult.DELIVERED, 3),
+        ([500, 500, 500], DeliveryResult.RETRY, 3),
+        ([400], DeliveryResult.REJECTED, 1),
+    ],
+)
+async def test_send_update_notification_retries_server_errors(statuses, expected, attempts) -> None:
+    update = LinkUpdate(id=5, url="https://github.com/owner/repo", tgChatIds=[1])
+    sender = NotificationSender("http://testbot.com", retries=2, retry_backoff=0)
+    responses = [FakeAiohttpResponse(status, {"description": "error"}) for status in statuses]
+    fake_session = MagicMock()
+    fake_session.post.side_effect = responses
+
+    with patch("src.scrapper.sender.aiohttp.ClientSession") as mock_client_session:
+        fake_context_manager = MagicMock()
+        fake_context_manager.__aenter__.return_value = fake_session
+        mock_client_session.return_value = fake_context_manager
+
+        assert await sender.send_update_notification(update) is expected
+
+    assert fake_session.post.call_count == attempts
+    payloads = {call.kwargs["data"] for call in fake_session.post.call_args_list}
+    assert len(payloads) == 1
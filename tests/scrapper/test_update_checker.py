@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from src.scrapper.update_checker import UpdateChecker
+
+
+class FakeResponse:
+    def __init__(self, json_data) -> None:
+        self.status = 200
+        self._json_data = json_data
+        self.headers = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+    async def json(self):
+        return self._json_data
+
+
+class FakeSession:
+    def __init__(self) -> None:
+        self.urls: list[str] = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        if url.endswith(("/pulls", "/issues")):
+            return FakeResponse([])
+        return FakeResponse({"items": [{"title": "Question"}]})
+
+
+LAST_CHECK = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("update_types", "endpoints"),
+    [
+        (None, ["/pulls", "/issues"]),
+        ({"PR"}, ["/pulls"]),
+        ({"Issue", "Answer"}, ["/issues"]),
+        (set(), []),
+    ],
+)
+async def test_github_requests_only_wanted_endpoints(update_types, endpoints) -> None:
+    session = FakeSession()
+    checker = UpdateChecker(session)  # type: ignore[arg-type]
+
+    await checker.get_new_updates("https://github.com/owner/repo", LAST_CHECK, update_types)
+
+    assert session.urls == [f"https://api.github.com/repos/owner/repo{e}" for e in endpoints]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("update_types", "endpoints"),
+    [
+        (None, ["", "/answers", "/comments"]),
+        ({"Answer"}, ["", "/answers"]),
+        ({"Comment", "PR"}, ["", "/comments"]),
+        ({"PR", "Issue"}, []),
+    ],
+)
+async def test_stackoverflow_requests_only_wanted_endpoints(update_types, endpoints) -> None:
+    session = FakeSession()
+    checker = UpdateChecker(session)  # type: ignore[arg-type]
+
+    await checker.get_new_updates(
+        "https://stackoverflow.com/questions/42/title",
+        LAST_CHECK,
+        update_types,
+    )
+
+    assert session.urls == [f"https://api.stackexchange.com/2.3/questions/42{e}" for e in endpoints]
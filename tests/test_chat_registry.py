@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from src.chat_registry import ChatRegistry
+from src.tracing import TRACEPARENT, TRACER, inject
+
+
+class FakeStorage:
+    def __init__(self, chat_ids) -> None:
+        self.chat_ids = set(chat_ids)
+        self.calls = 0
+        self.traceparents = []
+
+    def registered_chat_ids(self) -> set[int]:
+        self.calls += 1
+        return set(self.chat_ids)
+
+    def filter_registered(self, chat_ids) -> set[int]:
+        self.calls += 1
+        self.traceparents.append(inject({}).get(TRACEPARENT))
+        return self.chat_ids & set(chat_ids)
+
+
+def test_add_and_filter() -> None:
+    chats = ChatRegistry([1, 2])
+    chats.add(3)
+    assert 3 in chats
+    assert 4 not in chats
+    assert len(chats) == 3
+    assert chats.filter_registered([1, 3, 4]) == {1, 3}
+
+
+@pytest.mark.asyncio
+async def test_resolve_checks_storage_only_for_misses() -> None:
+    chats = ChatRegistry([1])
+    storage = FakeStorage([1, 2])
+    assert await chats.resolve([1], storage) == {1}
+    assert storage.calls == 0
+    assert await chats.resolve([1, 2, 3], storage) == {1, 2}
+    assert storage.calls == 1
+    assert 2 in chats
+
+
+@pytest.mark.asyncio
+async def test_resolve_keeps_trace_context() -> None:
+    storage = FakeStorage([2])
+    with TRACER.span("bot.process_update") as span:
+        await ChatRegistry().resolve([2], storage)
+    [traceparent] = storage.traceparents
+    assert traceparent is not None
+    assert span.context.trace_id in traceparent
+
+
+@pytest.mark.asyncio
+async def test_refresh_replaces_with_snapshot() -> None:
+    chats = ChatRegistry([1, 2])
+    await chats.refresh(FakeStorage([2, 5]))
+    assert chats.filter_registered([1, 2, 5]) == {2, 5}
+
+
+@pytest.mark.asyncio
+async def test_refresh_keeps_chats_added_during_read() -> None:
+    chats = ChatRegistry()
+
+    class SlowStorage(FakeStorage):
+        def registered_chat_ids(self) -> set[int]:
+            chats.add(7)
+            return super().registered_chat_ids()
+
+    await chats.refresh(SlowStorage([1]))
+    assert chats.filter_registered([1, 7]) == {1, 7}
+
+
+@pytest.mark.asyncio
+async def test_reconcile_refreshes_periodically() -> None:
+    chats = ChatRegistry([1])
+    storage = FakeStorage([2])
+    task = asyncio.create_task(chats.reconcile(storage, interval=0.01))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    assert storage.calls >= 1
+    assert 2 in chats
+    assert 1 not in chats
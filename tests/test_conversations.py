@@ -0,0 +1,141 @@
+import pytest
+
+from src.conversations import (
+    CONVERSATIONS,
+    InMemoryConversationStore,
+    PostgresConversationStore,
+    _evict_and_measure,
+    create_conversation_store,
+)
+from src.settings import ConversationSettings
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_memory_store_is_dict_like() -> None:
+    store = InMemoryConversationStore()
+    store[1] = {"url": "https://example.com", "stage": "await_tags"}
+    assert 1 in store
+    assert store[1]["stage"] == "await_tags"
+    del store[1]
+    assert 1 not in store
+    with pytest.raises(KeyError):
+        store[1]
+
+
+def test_memory_store_expires_by_ttl() -> None:
+    clock = FakeClock()
+    store = InMemoryConversationStore(ttl=10, clock=clock)
+    store.set(1, {"stage": "await_tags"})
+    clock.now = 5
+    store.set(2, {"stage": "await_tags"})
+    clock.now = 10
+    assert store.get(1) is None
+    assert store.get(2) is not None
+
+
+def test_memory_store_set_extends_ttl() -> None:
+    clock = FakeClock()
+    store = InMemoryConversationStore(ttl=10, clock=clock)
+    store.set(1, {"stage": "await_tags"})
+    clock.now = 8
+    store.set(1, {"stage": "await_filters"})
+    clock.now = 15
+    assert store.get(1) == {"stage": "await_filters"}
+
+
+def test_memory_store_evicts_expired_and_oldest() -> None:
+    clock = FakeClock()
+    store = InMemoryConversationStore(ttl=10, max_size=2, clock=clock)
+    store.set(1, {})
+    store.set(2, {})
+    store.set(3, {})
+    assert 1 not in store
+    assert len(store) == 2
+    clock.now = 10
+    assert store.evict() == 2
+    assert len(store) == 0
+
+
+def test_create_conversation_store_requires_db_url_for_postgres() -> None:
+    with pytest.raises(ValueError, match="DB_URL"):
+        create_conversation_store(ConversationSettings(backend="postgres"))
+    store = create_conversation_store(ConversationSettings(backend="memory", max_size=5))
+    assert isinstance(store, InMemoryConversationStore)
+    assert store.max_size == 5
+
+
+def test_postgres_store_shares_state(postgres_container) -> None:
+    first = PostgresConversationStore(postgres_container)
+    second = PostgresConversationStore(postgres_container)
+    first.set(10, {"url": "https://example.com", "stage": "await_tags", "tags": ["a"]})
+    assert second.get(10) == {"url": "https://example.com", "stage": "await_tags", "tags": ["a"]}
+    second.delete(10)
+    assert 10 not in first
+
+
+def test_postgres_store_expires_and_evicts(postgres_container) -> None:
+    expired = PostgresConversationStore(postgres_container, ttl=0)
+    expired.set(20, {"stage": "await_tags"})
+    assert expired.get(20) is None
+
+    store = PostgresConversationStore(postgres_container, max_size=1)
+    store.set(21, {"stage": "await_tags"})
+    store.set(22, {"stage": "await_tags"})
+    assert store.evict() >= 2
+    assert store.get(21) is None
+    assert store.get(22) is not None
+
+
+@pytest.mark.asyncio
+async def test_async_access(postgres_container) -> None:
+    for store in (InMemoryConversationStore(), PostgresConversationStore(postgres_container)):
+        await store.aset(30, {"stage": "await_filters"})
+        assert await store.aget(30) == {"stage": "await_filters"}
+        await store.adelete(30)
+        assert await store.aget(30) is None
+
+
+def test_postgres_store_caches_missing_dialogs(postgres_container) -> None:
+    clock = FakeClock()
+    store = PostgresConversationStore(postgres_container, negative_ttl=5, clock=clock)
+    other = PostgresConversationStore(postgres_container)
+    assert store.get(50) is None
+    other.set(50, {"stage": "await_tags"})
+    # Диалог начат на другой реплике: до истечения negative_ttl он здесь не виден.
+    assert store.get(50) is None
+    clock.now = 5
+    assert store.get(50) == {"stage": "await_tags"}
+
+    assert store.get(51) is None
+    store.set(51, {"stage": "await_filters"})
+    assert store.get(51) == {"stage": "await_filters"}
+    store.delete(50)
+    store.delete(51)
+
+
+def test_postgres_store_len_counts_active(postgres_container) -> None:
+    store = PostgresConversationStore(postgres_container)
+    before = len(store)
+    store.set(40, {"stage": "await_tags"})
+    PostgresConversationStore(postgres_container, ttl=0).set(41, {"stage": "await_tags"})
+    assert len(store) == before + 1
+    store.delete(40)
+
+
+def test_evict_updates_conversations_gauge() -> None:
+    clock = FakeClock()
+    store = InMemoryConversationStore(ttl=10, clock=clock)
+    store.set(1, {"stage": "await_tags"})
+    store.set(2, {"stage": "await_tags"})
+    _evict_and_measure(store)
+    assert CONVERSATIONS.value() == 2
+    clock.now = 20
+    _evict_and_measure(store)
+    assert CONVERSATIONS.value() == 0
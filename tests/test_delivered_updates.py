@@ -0,0 +1,31 @@
+from src.delivered_updates import DeliveredUpdates
+
+
+def test_claim_once_per_update_and_chat() -> None:
+    delivered = DeliveredUpdates()
+
+    assert delivered.claim(1, 10) is True
+    assert delivered.claim(1, 10) is False
+    assert delivered.claim(1, 20) is True
+    assert delivered.claim(2, 10) is True
+
+
+def test_release_allows_redelivery() -> None:
+    delivered = DeliveredUpdates()
+    delivered.claim(1, 10)
+
+    delivered.release(1, 10)
+
+    assert delivered.claim(1, 10) is True
+
+
+def test_least_recently_used_updates_are_evicted() -> None:
+    delivered = DeliveredUpdates(max_size=2)
+    delivered.claim(1, 10)
+    delivered.claim(2, 10)
+    delivered.claim(1, 20)
+    delivered.claim(3, 10)
+
+    assert len(delivered) == 2
+    assert delivered.claim(1, 10) is False
+    assert delivered.claim(2, 10) is True
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from src.dispatcher import ChatDispatcher
+
+
+@pytest.mark.asyncio
+async def test_preserves_order_within_chat() -> None:
+    dispatcher = ChatDispatcher(max_workers=4)
+    processed = []
+
+    def job(value: int, delay: float):
+        async def run() -> None:
+            await asyncio.sleep(delay)
+            processed.append(value)
+
+        return run
+
+    await dispatcher.submit(1, job(1, 0.02))
+    await dispatcher.submit(1, job(2, 0.0))
+    await dispatcher.submit(1, job(3, 0.01))
+    await dispatcher.join()
+    assert processed == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_runs_chats_concurrently_up_to_limit() -> None:
+    dispatcher = ChatDispatcher(max_workers=2)
+    running = 0
+    peak = 0
+
+    async def job() -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    for chat_id in range(5):
+        await dispatcher.submit(chat_id, job)
+    await dispatcher.join()
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_submit_waits_when_queue_is_full() -> None:
+    dispatcher = ChatDispatcher(max_workers=1, max_pending=1)
+    release = asyncio.Event()
+
+    async def blocked() -> None:
+        await release.wait()
+
+    async def noop() -> None:
+        return
+
+    await dispatcher.submit(1, blocked)
+    second = asyncio.create_task(dispatcher.submit(2, noop))
+    await asyncio.sleep(0.01)
+    assert not second.done()
+    release.set()
+    await second
+    await dispatcher.join()
+
+
+@pytest.mark.asyncio
+async def test_failed_job_does_not_stop_chat_queue() -> None:
+    dispatcher = ChatDispatcher()
+    processed = []
+
+    async def failing() -> None:
+        raise RuntimeError("boom")
+
+    async def ok() -> None:
+        processed.append("ok")
+
+    await dispatcher.submit(1, failing)
+    await dispatcher.submit(1, ok)
+    await dispatcher.join()
+    assert processed == ["ok"]
+    assert dispatcher.queued == 0
@@ -0,0 +1,52 @@
+from sqlalchemy import make_url, text
+
+from src.engine import DB_QUERIES, POOL_CHECKOUT_SECONDS, InstrumentedQueuePool, get_engine
+from src.metrics import REGISTRY
+from src.scrapper.storage import ScrapperStorage
+from src.settings import DatabaseSettings
+from src.storage import Storage
+
+
+def test_storages_share_one_engine(postgres_container, monkeypatch) -> None:
+    monkeypatch.setenv("ACCESS_TYPE", "SQL")
+    bot_storage = Storage(postgres_container)
+    scrapper_storage = ScrapperStorage(postgres_container)
+    assert bot_storage.impl.engine is scrapper_storage.impl.engine
+    assert bot_storage.impl.engine is get_engine(postgres_container)
+
+
+def test_engine_applies_settings(postgres_container, monkeypatch) -> None:
+    monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "1234")
+    monkeypatch.setenv("DB_LOCK_TIMEOUT_MS", "567")
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    # Отдельный URL, чтобы не получить уже созданный общий Engine.
+    db_url = make_url(postgres_container).update_query_dict({"application_name": "settings_test"})
+    engine = get_engine(db_url.render_as_string(hide_password=False))
+    assert DatabaseSettings().pool_size == 3
+    assert isinstance(engine.pool, InstrumentedQueuePool)
+    assert engine.pool.size() == 3
+    with engine.connect() as conn:
+        assert conn.execute(text("SHOW statement_timeout")).scalar_one() == "1234ms"
+        assert conn.execute(text("SHOW lock_timeout")).scalar_one() == "567ms"
+
+
+def test_pool_metrics_are_exported(postgres_container) -> None:
+    engine = get_engine(postgres_container)
+    database = engine.url.database
+    before = POOL_CHECKOUT_SECONDS.count(database=database)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        rendered = REGISTRY.render()
+    assert POOL_CHECKOUT_SECONDS.count(database=database) > before
+    assert f'db_pool_checked_out{{database="{database}"}}' in rendered
+    assert f'db_pool_utilization{{database="{database}"}}' in rendered
+
+
+def test_queries_are_counted(postgres_container) -> None:
+    engine = get_engine(postgres_container)
+    database = engine.url.database
+    before = DB_QUERIES.value(database=database)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+    assert DB_QUERIES.value(database=database) == before + 2
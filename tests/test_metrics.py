@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from src.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+@pytest.fixture
+def registry() -> MetricsRegistry:
+    return MetricsRegistry()
+
+
+def test_counter_renders_total(registry: MetricsRegistry) -> None:
+    counter = Counter("requests", "Requests", ["host"], registry=registry)
+    counter.inc(host="github.com")
+    counter.inc(2, host="github.com")
+    assert counter.value(host="github.com") == 3
+    assert 'requests_total{host="github.com"} 3' in registry.render()
+
+
+def test_gauge_function_is_evaluated_on_render(registry: MetricsRegistry) -> None:
+    values = {("main",): 1.0}
+    Gauge("in_use", "In use", ["database"], registry=registry, function=lambda: values)
+    values[("main",)] = 0.5
+    assert 'in_use{database="main"} 0.5' in registry.render()
+
+
+def test_histogram_buckets_are_cumulative(registry: MetricsRegistry) -> None:
+    histogram = Histogram("latency", "Latency", registry=registry, buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+    rendered = registry.render()
+    assert 'latency_bucket{le="0.1"} 1' in rendered
+    assert 'latency_bucket{le="1"} 2' in rendered
+    assert 'latency_bucket{le="+Inf"} 3' in rendered
+    assert "latency_count 3" in rendered
+    assert histogram.count() == 3
+
+
+def test_duplicate_metric_name_is_rejected(registry: MetricsRegistry) -> None:
+    Counter("dup", "Dup", registry=registry)
+    with pytest.raises(ValueError, match="already registered"):
+        Gauge("dup", "Dup", registry=registry)
+
+
+def test_wrong_labels_are_rejected(registry: MetricsRegistry) -> None:
+    counter = Counter("labelled", "Labelled", ["host"], registry=registry)
+    with pytest.raises(ValueError, match="expects labels"):
+        counter.inc()
+
+
+def test_concurrent_writes_are_merged(registry: MetricsRegistry) -> None:
+    counter = Counter("events", "Events", registry=registry)
+    histogram = Histogram("work", "Work", registry=registry, buckets=(1.0,))
+
+    def work() -> None:
+        for _ in range(1000):
+            counter.inc()
+            histogram.observe(0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value() == 8000
+    assert histogram.count() == 8000
+    assert "work_count 8000" in registry.render()
@@ -0,0 +1,62 @@
+import pytest
+
+from src.resilience import CircuitBreaker, backoff_delay
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_breaker_opens_after_threshold() -> None:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=FakeClock())
+    breaker.record_failure()
+    assert breaker.allow() is True
+    breaker.record_failure()
+    assert breaker.is_open is True
+    assert breaker.allow() is False
+
+
+def test_breaker_success_resets_failures() -> None:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=FakeClock())
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.allow() is True
+
+
+def test_breaker_half_open_allows_single_trial() -> None:
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+
+    breaker.record_failure()
+    assert breaker.allow() is False
+    clock.now = 20
+    assert breaker.allow() is True
+    breaker.record_success()
+    assert breaker.is_open is False
+    assert breaker.allow() is True
+
+
+def test_breaker_release_frees_trial_slot() -> None:
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.allow() is True
+    breaker.release()
+    assert breaker.is_open is True
+    assert breaker.allow() is True
+
+
+@pytest.mark.parametrize("attempt", [0, 1, 5, 10])
+def test_backoff_delay_is_bounded(attempt: int) -> None:
+    delay = backoff_delay(attempt, base=0.5, cap=2.0)
+    assert 0 <= delay <= min(2.0, 0.5 * 2**attempt)
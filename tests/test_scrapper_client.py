@@ -1,8 +1,13 @@
+import asyncio
+import json
+
 import aiohttp
 import pytest
 from pydantic import HttpUrl
 
+from src.resilience import CircuitOpenError
 from src.scrapper_client import ScrapperClient
+from src.settings import ScrapperClientSettings
 
 
 class FakeRequestContext:
@@ -26,6 +31,9 @@ class FakeResponse:
     async def json(self):
         return self._json
 
+    async def read(self) -> bytes:
+        return json.dumps(self._json).encode()
+
     async def __aenter__(self):
         return self
 
@@ -38,6 +46,7 @@ class FakeClientSession:
         self.fake_post = fake_post
         self.fake_get = fake_get
         self.fake_delete = fake_delete
+        self.closed = False
 
     async def __aenter__(self):
         return self
@@ -45,6 +54,9 @@ class FakeClientSession:
     async def __aexit__(self, exc_type, exc, tb):
         pass
 
+    async def close(self) -> None:
+        self.closed = True
+
     def post(self, url, **kwargs):
         return FakeRequestContext(self.fake_post(url, **kwargs))
 
@@ -60,7 +72,7 @@ async def test_register_chat_success(monkeypatch) -> None:
     async def fake_post(url, **kwargs):
         return FakeResponse(200)
 
-    monkeypatch.setattr(aiohttp, "ClientSession", lambda: FakeClientSession(fake_post=fake_post))
+    monkeypatch.setattr(aiohttp, "ClientSession", lambda **kwargs: FakeClientSession(fake_post=fake_post))
 
     client = ScrapperClient(base_url="http://testserver")
     result = await client.register_chat(123)
@@ -72,7 +84,7 @@ async def test_register_chat_failure(monkeypatch) -> None:
     async def fake_post(url, **kwargs):
         return FakeResponse(400)
 
-    monkeypatch.setattr(aiohttp, "ClientSession", lambda: FakeClientSession(fake_post=fake_post))
+    monkeypatch.setattr(aiohttp, "ClientSession", lambda **kwargs: FakeClientSession(fake_post=fake_post))
 
     client = ScrapperClient(base_url="http://testserver")
     result = await client.register_chat(123)
@@ -91,7 +103,7 @@ async def test_add_link_success(monkeypatch) -> None:
     async def fake_post(url, **kwargs):
         return FakeResponse(200, json_data=fake_link_response)
 
-    monkeypatch.setattr(aiohttp, "ClientSession", lambda: FakeClientSession(fake_post=fake_post))
+    monkeypatch.setattr(aiohttp, "ClientSession", lambda **kwargs: FakeClientSession(fake_post=fake_post))
 
     client = ScrapperClient(base_url="http://testserver")
     result = await client.add_link(123, "https://example.com", ["tag1"], ["filter1"])
@@ -107,7 +119,7 @@ async def test_add_link_failure(monkeypatch) -> None:
     async def fake_post(url, **kwargs):
         return FakeResponse(400)
 
-    monkeypatch.setattr(aiohttp, "ClientSession", lambda: FakeClientSession(fake_post=fake_post))
+    monkeypatch.setattr(aiohttp, "ClientSession", lambda **kwargs: FakeClientSession(fake_post=fake_post))
 
     client = ScrapperClient(base_url="http://testserver")
     result = await client.add_link(123, "https://example.com", ["tag1"], ["filter1"])
@@ -122,7 +134,7 @@ async def test_remove_link_success(monkeypatch) -> None:
         return FakeResponse(200, json_data=fake_link_response)
 
     monkeypatch.setattr(
-        aiohttp, "ClientSession", lambda: FakeClientSession(fake_delete=fake_delete),
+        aiohttp, "ClientSession", lambda **kwargs: FakeClientSession(fake_delete=fake_delete),
     )
 
     client = ScrapperClient(base_url="http://testserver")
@@ -138,7 +150,7 @@ async def test_remove_link_failure(monkeypatch) -> None:
         return FakeResponse(404)
 
     monkeypatch.setattr(
-        aiohttp, "ClientSession", lambda: FakeClientSession(fake_delete=fake_delete),
+        aiohttp, "ClientSession", lambda **kwargs: FakeClientSession(fake_delete=fake_delete),
     )
 
     client = ScrapperClient(base_url="http://testserver")
@@ -156,7 +168,7 @@ async def test_get_links_success(monkeypatch) -> None:
     async def fake_get(url, **kwargs):
         return FakeResponse(200, json_data=fake_list_links_response)
 
-    monkeypatch.setattr(aiohttp, "ClientSession", lambda: FakeClientSession(fake_get=fake_get))
+    monkeypatch.setattr(aiohttp, "ClientSession", lambda **kwargs: FakeClientSession(fake_get=fake_get))
 
     client = ScrapperClient(base_url="http://testserver")
     result = await client.get_links(123)
@@ -174,8 +186,153 @@ async def test_get_links_failure(monkeypatch) -> None:
     async def fake_get(url, **kwargs):
         return FakeResponse(404)
 
-    monkeypatch.setattr(aiohttp, "ClientSession", lambda: FakeClientSession(fake_get=fake_get))
+    monkeypatch.setattr(aiohttp, "ClientSession", lambda **kwargs: FakeClientSession(fake_get=fake_get))
 
     client = ScrapperClient(base_url="http://testserver")
     result = await client.get_links(123)
     assert result == []
+
+
+@pytest.mark.asyncio
+async def test_get_links_follows_cursor(monkeypatch) -> None:
+    pages = {
+        None: {
+            "links": [{"id": 1, "url": "https://example.com/1", "tags": [], "filters": []}],
+            "size": 1,
+            "next_cursor": "next",
+        },
+        "next": {
+            "links": [{"id": 2, "url": "https://example.com/2", "tags": [], "filters": []}],
+            "size": 1,
+        },
+    }
+    requested = []
+
+    async def fake_get(url, **kwargs):
+        params = kwargs["params"]
+        requested.append(params)
+        return FakeResponse(200, json_data=pages[params.get("cursor")])
+
+    monkeypatch.setattr(aiohttp, "ClientSession", lambda **kwargs: FakeClientSession(fake_get=fake_get))
+
+    client = ScrapperClient(base_url="http://testserver")
+    result = await client.get_links(123, tag="work")
+    assert [link.id for link in result] == [1, 2]
+    assert requested == [
+        {"limit": "100", "tag": "work"},
+        {"limit": "100", "cursor": "next", "tag": "work"},
+    ]
+
+
+def fast_settings(**overrides) -> ScrapperClientSettings:
+    values = {"retries": 2, "retry_backoff": 0.0, "breaker_failures": 3, **overrides}
+    return ScrapperClientSettings(**values)
+
+
+@pytest.mark.asyncio
+async def test_client_reuses_single_session(monkeypatch) -> None:
+    sessions = []
+
+    async def fake_post(url, **kwargs):
+        return FakeResponse(200)
+
+    def make_session(**kwargs):
+        session = FakeClientSession(fake_post=fake_post)
+        sessions.append(session)
+        return session
+
+    monkeypatch.setattr(aiohttp, "ClientSession", make_session)
+
+    async with ScrapperClient(base_url="http://testserver") as client:
+        assert await client.register_chat(1) is True
+        assert await client.register_chat(2) is True
+    assert len(sessions) == 1
+    assert sessions[0].closed is True
+
+
+@pytest.mark.asyncio
+async def test_get_links_retries_server_errors(monkeypatch) -> None:
+    statuses = [503, 502, 200]
+
+    async def fake_get(url, **kwargs):
+        return FakeResponse(statuses.pop(0), json_data={"links": [], "size": 0})
+
+    monkeypatch.setattr(
+        aiohttp, "ClientSession", lambda **kwargs: FakeClientSession(fake_get=fake_get),
+    )
+
+    client = ScrapperClient(base_url="http://testserver", settings=fast_settings())
+    assert await client.get_links(123) == []
+    assert statuses == []
+
+
+@pytest.mark.asyncio
+async def test_add_link_is_not_retried(monkeypatch) -> None:
+    calls = []
+
+    async def fake_post(url, **kwargs):
+        calls.append(url)
+        raise aiohttp.ClientConnectionError
+
+    monkeypatch.setattr(
+        aiohttp, "ClientSession", lambda **kwargs: FakeClientSession(fake_post=fake_post),
+    )
+
+    client = ScrapperClient(base_url="http://testserver", settings=fast_settings())
+    with pytest.raises(aiohttp.ClientConnectionError):
+        await client.add_link(123, "https://example.com", [], [])
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_breaker_fails_fast_after_timeouts(monkeypatch) -> None:
+    calls = []
+
+    async def fake_get(url, **kwargs):
+        calls.append(url)
+        raise TimeoutError
+
+    monkeypatch.setattr(
+        aiohttp, "ClientSession", lambda **kwargs: FakeClientSession(fake_get=fake_get),
+    )
+
+    client = ScrapperClient(base_url="http://testserver", settings=fast_settings())
+    with pytest.raises(TimeoutError):
+        await client.get_links(123)
+    assert len(calls) == 3
+    with pytest.raises(CircuitOpenError):
+        await client.get_links(123)
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_cancelled_trial_does_not_keep_breaker_open(monkeypatch) -> None:
+    started = asyncio.Event()
+    calls = []
+
+    async def fake_get(url, **kwargs):
+        calls.append(url)
+        if len(calls) == 1:
+            raise TimeoutError
+        if len(calls) == 2:
+            started.set()
+            await asyncio.Event().wait()
+        return FakeResponse(200, {"links": [], "size": 0})
+
+    monkeypatch.setattr(
+        aiohttp, "ClientSession", lambda **kwargs: FakeClientSession(fake_get=fake_get),
+    )
+    settings = fast_settings(retries=0, breaker_failures=1, breaker_reset_seconds=0.0)
+    client = ScrapperClient(base_url="http://testserver", settings=settings)
+    with pytest.raises(TimeoutError):
+        await client.get_links(123)
+    assert client.breaker.is_open
+
+    trial = asyncio.create_task(client.get_links(123))
+    await started.wait()
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    assert await client.get_links(123) == []
+    assert not client.breaker.is_open
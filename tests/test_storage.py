@@ -1,6 +1,8 @@
+import threading
+
 import pytest
 
-from src.storage import ORMStorage, SQLStorage, Storage, StorageInterface
+from src.storage import AsyncStorage, ORMStorage, SQLStorage, Storage, StorageInterface
 
 
 @pytest.fixture(params=["ORM", "SQL", "WRAPPER"])
@@ -36,3 +38,36 @@ def test_add_duplicate_user(storage: StorageInterface) -> None:
     user = storage.get_user(chat_id)
     assert user is not None
     assert user.chat_id == chat_id
+
+def test_exists(storage: StorageInterface) -> None:
+    storage.add_user(789)
+    assert storage.exists(789) is True
+    assert storage.exists(790) is False
+
+def test_filter_registered(storage: StorageInterface) -> None:
+    storage.add_user(1001)
+    storage.add_user(1002)
+    assert storage.filter_registered([1001, 1002, 1003, 1001]) == {1001, 1002}
+    assert storage.filter_registered([]) == set()
+
+def test_registered_chat_ids(storage: StorageInterface) -> None:
+    storage.add_user(2001)
+    storage.add_user(2002)
+    assert {2001, 2002} <= storage.registered_chat_ids()
+
+@pytest.mark.asyncio
+async def test_async_storage_runs_off_event_loop(storage: StorageInterface) -> None:
+    loop_thread = threading.get_ident()
+    threads = []
+
+    class RecordingStorage:
+        def add_user(self, chat_id: int) -> None:
+            threads.append(threading.get_ident())
+            storage.add_user(chat_id)
+
+    await AsyncStorage(RecordingStorage()).add_user(3001)
+    user = await AsyncStorage(storage).get_user(3001)
+    assert user is not None
+    assert threads
+    assert threads[0] != loop_thread
+    assert await AsyncStorage(storage).filter_registered(iter([3001, 3002])) == {3001}
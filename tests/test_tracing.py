@@ -0,0 +1,125 @@
+import asyncio
+
+import orjson
+import pytest
+
+from src.settings import TracingSettings
+from src.tracing import (
+    TRACEPARENT,
+    JsonlExporter,
+    SpanContext,
+    Tracer,
+    configure_tracing,
+    extract,
+    inject,
+    traced,
+)
+
+
+def read_spans(path):
+    return [orjson.loads(line) for line in path.read_bytes().splitlines()]
+
+
+@pytest.fixture
+def tracer(tmp_path) -> Tracer:
+    return Tracer(sample_rate=1.0, exporter=JsonlExporter(tmp_path / "spans.jsonl"))
+
+
+def test_child_spans_share_trace(tracer: Tracer, tmp_path) -> None:
+    with tracer.span("parent", kind="cycle") as parent, tracer.span("child") as child:
+        assert child.context.trace_id == parent.context.trace_id
+    tracer.shutdown()
+
+    child_span, parent_span = read_spans(tmp_path / "spans.jsonl")
+    assert child_span["name"] == "child"
+    assert child_span["parent_id"] == parent_span["span_id"]
+    assert parent_span["parent_id"] is None
+    assert parent_span["attributes"] == {"kind": "cycle"}
+
+
+def test_new_trace_ignores_current_span(tracer: Tracer) -> None:
+    with tracer.span("cycle") as cycle, tracer.span("resource", new_trace=True) as resource:
+        assert resource.context.trace_id != cycle.context.trace_id
+        assert resource.parent_id is None
+
+
+def test_unsampled_trace_is_not_exported(tmp_path) -> None:
+    tracer = Tracer(sample_rate=0.0, exporter=JsonlExporter(tmp_path / "spans.jsonl"))
+    with tracer.span("parent"), tracer.span("child") as child:
+        assert not child.context.sampled
+    tracer.shutdown()
+    assert not (tmp_path / "spans.jsonl").exists()
+
+
+def test_error_is_recorded(tracer: Tracer, tmp_path) -> None:
+    with pytest.raises(ValueError), tracer.span("failing"):
+        raise ValueError
+    tracer.shutdown()
+    [span] = read_spans(tmp_path / "spans.jsonl")
+    assert span["status"] == "error"
+    assert span["attributes"]["error"] == "ValueError"
+
+
+def test_exporter_writes_in_batches(tmp_path) -> None:
+    path = tmp_path / "spans.jsonl"
+    tracer = Tracer(sample_rate=1.0, exporter=JsonlExporter(path, batch_size=2))
+    with tracer.span("first"):
+        pass
+    assert not path.exists()
+    with tracer.span("second"):
+        pass
+    assert len(read_spans(path)) == 2
+
+
+@pytest.mark.parametrize(
+    "header",
+    [
+        None,
+        "",
+        "garbage",
+        "ff-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01",
+        "00-00000000000000000000000000000000-b7ad6b7169203331-01",
+        "00-0af7651916cd43dd8448eb211c80319c-xyz-01",
+    ],
+)
+def test_invalid_traceparent_is_ignored(header) -> None:
+    assert SpanContext.from_traceparent(header) is None
+
+
+def test_context_propagates_through_headers(tracer: Tracer, tmp_path) -> None:
+    with tracer.span("sender.post") as sender:
+        headers = inject({"Content-Type": "application/json"})
+    assert headers[TRACEPARENT] == sender.context.to_traceparent()
+
+    with tracer.span("bot.process_update", extract(headers)) as bot:
+        assert bot.context.trace_id == sender.context.trace_id
+        assert bot.parent_id == sender.context.span_id
+        assert bot.context.sampled
+
+
+def test_inject_without_span_keeps_headers() -> None:
+    assert inject({"Content-Type": "application/json"}) == {"Content-Type": "application/json"}
+
+
+@pytest.mark.asyncio
+async def test_traced_wraps_sync_and_async_functions(tmp_path, monkeypatch) -> None:
+    tracer = configure_tracing(
+        TracingSettings(sample_rate=1.0, export_path=str(tmp_path / "spans.jsonl")),
+        Tracer(),
+    )
+    monkeypatch.setattr("src.tracing.TRACER", tracer)
+
+    @traced("sync")
+    def sync_call() -> int:
+        return 1
+
+    @traced("async")
+    async def async_call() -> int:
+        await asyncio.sleep(0)
+        return sync_call() + 1
+
+    assert await async_call() == 2
+    tracer.shutdown()
+    sync_span, async_span = read_spans(tmp_path / "spans.jsonl")
+    assert (sync_span["name"], async_span["name"]) == ("sync", "async")
+    assert sync_span["parent_id"] == async_span["span_id"]